@@ -1,6 +1,5 @@
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-from pymongo import MongoClient
 import os
 from dotenv import load_dotenv
 import json
@@ -13,13 +12,21 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# MongoDB Setup
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    print("WARNING: MONGO_URI environment variable not set")
+# MongoDB Setup - one shared connection pool injected into every blueprint
+from database import init_app as init_database
+mongo = init_database(app)
+db = mongo.db  # Database name
 
-client = MongoClient(MONGO_URI)
-db = client["gd"]  # Database name
+# Apply the index registry (idempotent) and optionally verify query plans
+from indexes import ensure_indexes, check_query_plans
+try:
+    ensure_indexes(db)
+    if os.getenv("INDEX_CHECK_ON_STARTUP", "false").lower() == "true":
+        collscans = check_query_plans(db)
+        if collscans:
+            print(f"WARNING: query shapes doing a COLLSCAN: {[c['name'] for c in collscans]}")
+except Exception as e:
+    print(f"WARNING: could not create MongoDB indexes: {e}")
 
 # Import blueprints AFTER defining the app
 from auth import auth_bp
@@ -37,6 +44,32 @@ app.register_blueprint(user_data_bp)
 app.register_blueprint(screenshot_bp)
 # app.register_blueprint(gd_bp)  # Register the new blueprint
 
+# Background evaluation jobs (?async=true on the evaluation endpoints)
+from jobs import init_app as init_jobs
+init_jobs(app)
+
+# Warm LanguageTool pool shared by the grammar endpoints
+from grammar_engine import init_app as init_grammar_engine
+init_grammar_engine(app)
+from grammar_cache import grammar_cache_bp
+app.register_blueprint(grammar_cache_bp)
+
+# Response cache for repeated LLM participant turns
+from llm_cache import llm_cache_bp
+app.register_blueprint(llm_cache_bp)
+
+# Pre-generated topic openers with their audio, refreshed in the background
+from topic_openers import init_app as init_topic_openers
+init_topic_openers(app)
+
+# Two-tier cache of synthesized speech, shared by both voices
+from tts_cache import tts_cache_bp
+app.register_blueprint(tts_cache_bp)
+
+# Long-lived pyttsx3 workers for /api/tts/alt and when gTTS is unreachable
+from offline_tts import init_app as init_offline_tts
+init_offline_tts(app)
+
 # Add CORS headers to all responses
 @app.after_request
 def add_cors_headers(response):
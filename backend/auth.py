@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_cors import CORS
-from pymongo import MongoClient
+from database import get_collection
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
+from datetime import datetime
 import os
 from bson import json_util
 import json
@@ -16,14 +17,6 @@ load_dotenv()
 auth_bp = Blueprint('auth', __name__)
 CORS(auth_bp, resources={r"/*": {"origins": "*"}})  # Enable CORS for frontend communication
 
-# MongoDB Setup
-MONGO_URI = os.getenv("MONGO_URI")
-if not MONGO_URI:
-    print("WARNING: MONGO_URI environment variable not set")
-
-client = MongoClient(MONGO_URI)
-db = client["gd"]  # Database name
-users_collection = db["users"]  # Collection name
 
 # Google OAuth Client ID
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
@@ -51,6 +44,7 @@ def google_signin():
         picture = id_info.get("picture", "")
 
         # Check if user exists in MongoDB
+        users_collection = get_collection("users", "critical")
         user = users_collection.find_one({"user_id": user_id})
 
         if not user:
@@ -60,7 +54,7 @@ def google_signin():
                 "email": user_email,
                 "name": name,
                 "photo_url": picture,
-                "created_at": db.command("serverStatus")["localTime"],  # Timestamp
+                "created_at": datetime.utcnow(),  # Timestamp
             }
             users_collection.insert_one(new_user)
             user = new_user  # Assign new user data
@@ -0,0 +1,179 @@
+"""
+Benchmark the face detection strategies on the same frames and report how
+often they agree.
+
+    python benchmark_detection.py frames/ more.jpg
+    python benchmark_detection.py --user-id u1 --session-id s1 --max-dim 320 --max-dim 640
+    python benchmark_detection.py frames/ --strategy facemesh --strategy tracking
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from screenshoteval import ScreenshotEvaluator, DETECTION_STRATEGIES, FACE_ANALYSIS_MAX_DIM
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def load_frames(paths, user_id=None, session_id=None, limit=None):
+    """Encoded frames from image files/directories, or from a stored session."""
+    frames = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            files = [path]
+        for file_path in files:
+            with open(file_path, "rb") as f:
+                frames.append((file_path, f.read()))
+
+    if user_id:
+        import session_store
+        from blob_store import load_screenshot_bytes
+        session_id = session_store.read_session_id(user_id, session_id)
+        for screenshot in session_store.list_screenshots(user_id, session_id, limit=limit):
+            frames.append((screenshot["screenshot_id"], load_screenshot_bytes(screenshot)))
+
+    return frames[:limit] if limit else frames
+
+
+# "tracking" runs the frames in order through analyze_sequence
+BENCHMARK_STRATEGIES = DETECTION_STRATEGIES + ("tracking",)
+
+
+def run_strategy(strategy, frames, max_dim):
+    if strategy == "tracking":
+        evaluator = ScreenshotEvaluator(max_dim=max_dim)
+        evaluator.analyze_sequence(data for _, data in frames[:1])
+        start = time.perf_counter()
+        analyses = evaluator.analyze_sequence(data for _, data in frames)
+        # Tracking cost depends on the previous frame, so report the sequence average
+        average = (time.perf_counter() - start) * 1000 / len(frames)
+        return analyses, [average] * len(frames)
+
+    evaluator = ScreenshotEvaluator(max_dim=max_dim, strategy=strategy)
+    # Warm up the models so the first frame doesn't skew the timings
+    if frames:
+        evaluator.analyze_face(frames[0][1])
+    analyses, durations = [], []
+    for _, data in frames:
+        start = time.perf_counter()
+        analyses.append(evaluator.analyze_face(data))
+        durations.append((time.perf_counter() - start) * 1000)
+    return analyses, durations
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def timing_summary(durations):
+    return {
+        "frames": len(durations),
+        "mean_ms": round(statistics.mean(durations), 3),
+        "p50_ms": round(_percentile(durations, 0.5), 3),
+        "p95_ms": round(_percentile(durations, 0.95), 3),
+        "fps": round(1000 / statistics.mean(durations), 2),
+    }
+
+
+def _outcome(analysis):
+    return analysis.get("error", "ok")
+
+
+def agreement(baseline, candidate):
+    """Compare two strategies' analyses of the same frames."""
+    total = len(baseline)
+    same_outcome = sum(_outcome(a) == _outcome(b) for a, b in zip(baseline, candidate))
+    same_count = sum(
+        a.get("face_detection", {}).get("total_faces") == b.get("face_detection", {}).get("total_faces")
+        for a, b in zip(baseline, candidate)
+    )
+    both_valid = [(a, b) for a, b in zip(baseline, candidate) if "error" not in a and "error" not in b]
+    report = {
+        "frames": total,
+        "outcome_agreement": round(same_outcome / total, 4) if total else None,
+        "face_count_agreement": round(same_count / total, 4) if total else None,
+        "both_valid": len(both_valid),
+        "disagreements": [
+            {"frame": i, "baseline": _outcome(a), "candidate": _outcome(b)}
+            for i, (a, b) in enumerate(zip(baseline, candidate)) if _outcome(a) != _outcome(b)
+        ],
+    }
+    if both_valid:
+        for key in ("Left Eye Status", "Right Eye Status", "Head Position"):
+            report[f"{key} agreement"] = round(sum(a[key] == b[key] for a, b in both_valid) / len(both_valid), 4)
+        report["mean_abs_ear_diff"] = round(statistics.mean(
+            (abs(a["Left EAR"] - b["Left EAR"]) + abs(a["Right EAR"] - b["Right EAR"])) / 2
+            for a, b in both_valid
+        ), 5)
+    return report
+
+
+def benchmark(frames, strategies=DETECTION_STRATEGIES, max_dims=(FACE_ANALYSIS_MAX_DIM,)):
+    """
+    Run every strategy at every analysis resolution. Agreement is measured
+    against the first strategy at the same resolution.
+    """
+    report = {"frames": len(frames), "runs": []}
+    for max_dim in max_dims:
+        baseline = None
+        for strategy in strategies:
+            analyses, durations = run_strategy(strategy, frames, max_dim)
+            run = {"strategy": strategy, "max_dim": max_dim, "timing": timing_summary(durations)}
+            if baseline is None:
+                baseline = (strategy, analyses)
+            else:
+                run["agreement_with"] = baseline[0]
+                run["agreement"] = agreement(baseline[1], analyses)
+            report["runs"].append(run)
+    return report
+
+
+def print_report(report):
+    print(f"Frames: {report['frames']}")
+    for run in report["runs"]:
+        timing = run["timing"]
+        print(f"\n{run['strategy']} @ max_dim={run['max_dim']}: mean {timing['mean_ms']} ms, "
+              f"p50 {timing['p50_ms']} ms, p95 {timing['p95_ms']} ms, {timing['fps']} fps")
+        if "agreement" in run:
+            result = run["agreement"]
+            print(f"  vs {run['agreement_with']}: outcome {result['outcome_agreement']}, "
+                  f"face count {result['face_count_agreement']}, both valid {result['both_valid']}")
+            for key, value in result.items():
+                if key.endswith(" agreement") or key == "mean_abs_ear_diff":
+                    print(f"    {key}: {value}")
+            for disagreement in result["disagreements"][:10]:
+                print(f"    frame {disagreement['frame']}: {disagreement['baseline']} -> {disagreement['candidate']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare face detection strategies on the same frames")
+    parser.add_argument("paths", nargs="*", help="Image files or directories")
+    parser.add_argument("--user-id", help="Benchmark a stored session's screenshots")
+    parser.add_argument("--session-id", help="Session to load (defaults to the latest)")
+    parser.add_argument("--limit", type=int, help="Maximum number of frames")
+    parser.add_argument("--max-dim", type=int, action="append",
+                        help="Analysis resolution to test; repeat to compare several")
+    parser.add_argument("--strategy", action="append", choices=BENCHMARK_STRATEGIES,
+                        help="Strategies to run; the first is the agreement baseline (default: haar, facemesh)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    frames = load_frames(args.paths, args.user_id, args.session_id, args.limit)
+    if not frames:
+        parser.error("no frames to benchmark")
+    report = benchmark(
+        frames,
+        strategies=args.strategy or ("haar", "facemesh"),
+        max_dims=args.max_dim or (FACE_ANALYSIS_MAX_DIM,),
+    )
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
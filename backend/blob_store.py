@@ -0,0 +1,211 @@
+from abc import ABC, abstractmethod
+import base64
+import binascii
+import hashlib
+import os
+import tempfile
+import threading
+import logging
+import gridfs
+from dotenv import load_dotenv
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+BLOB_BACKEND = os.getenv("SCREENSHOT_BLOB_BACKEND", "gridfs")
+BLOB_DIR = os.getenv(
+    "SCREENSHOT_BLOB_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "blob_storage")
+)
+SCREENSHOT_MAX_BYTES = int(os.getenv("SCREENSHOT_MAX_BYTES", str(5 * 1024 * 1024)))
+
+
+class BlobTooLargeError(ValueError):
+    """Raised when a blob exceeds the configured size limit."""
+
+
+def decode_data_url(image_data):
+    """
+    Decode a base64 image (optionally a data URL) into raw bytes.
+
+    Returns:
+        Tuple[bytes, str]: The decoded bytes and the content type
+    """
+    content_type = "image/jpeg"
+    payload = image_data
+    if image_data.startswith("data:") and "," in image_data:
+        header, payload = image_data.split(",", 1)
+        content_type = header[5:].split(";")[0] or content_type
+    try:
+        return base64.b64decode(payload, validate=False), content_type
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid base64 image data: {e}")
+
+
+def encode_data_url(data, content_type="image/jpeg"):
+    """Encode raw bytes as a data URL, the format the frontend uploads."""
+    return f"data:{content_type};base64," + base64.b64encode(data).decode("ascii")
+
+
+class BlobStore(ABC):
+    """Content-addressed store for binary payloads. Blob ids are sha256 hex digests."""
+
+    name = "base"
+
+    def put(self, data, content_type="application/octet-stream"):
+        """Store data and return its metadata (blob_id, size, sha256, content_type)."""
+        if len(data) > SCREENSHOT_MAX_BYTES:
+            raise BlobTooLargeError(
+                f"Blob of {len(data)} bytes exceeds limit of {SCREENSHOT_MAX_BYTES} bytes"
+            )
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.exists(digest):
+            self._write(digest, data, content_type)
+        return {
+            "blob_id": digest,
+            "sha256": digest,
+            "size": len(data),
+            "content_type": content_type,
+            "backend": self.name,
+        }
+
+    @abstractmethod
+    def get(self, blob_id):
+        """The blob's bytes. Raises KeyError if it does not exist."""
+
+    @abstractmethod
+    def exists(self, blob_id):
+        """Whether a blob with this id is stored."""
+
+    @abstractmethod
+    def delete(self, blob_id):
+        """Remove a blob; deleting a missing blob is not an error."""
+
+    @abstractmethod
+    def _write(self, blob_id, data, content_type):
+        """Store data under blob_id."""
+
+
+class GridFSBlobStore(BlobStore):
+    """Stores blobs in a GridFS bucket, using the content hash as the file id."""
+
+    name = "gridfs"
+
+    def __init__(self, db=None, bucket_name="screenshot_blobs"):
+        self._db = db
+        self.bucket_name = bucket_name
+
+    @property
+    def db(self):
+        if self._db is not None:
+            return self._db
+        from database import get_db
+        return get_db()
+
+    @property
+    def bucket(self):
+        return gridfs.GridFSBucket(self.db, bucket_name=self.bucket_name)
+
+    def exists(self, blob_id):
+        return self.db[f"{self.bucket_name}.files"].find_one({"_id": blob_id}, {"_id": 1}) is not None
+
+    def _write(self, blob_id, data, content_type):
+        try:
+            self.bucket.upload_from_stream_with_id(
+                blob_id, blob_id, data, metadata={"content_type": content_type}
+            )
+        except gridfs.errors.FileExists:
+            # Another request stored the same content concurrently
+            pass
+
+    def get(self, blob_id):
+        try:
+            return self.bucket.open_download_stream(blob_id).read()
+        except gridfs.errors.NoFile:
+            raise KeyError(blob_id)
+
+    def delete(self, blob_id):
+        try:
+            self.bucket.delete(blob_id)
+        except gridfs.errors.NoFile:
+            pass
+
+
+class FileSystemBlobStore(BlobStore):
+    """Stores blobs on the local filesystem under root/<aa>/<bb>/<sha256>."""
+
+    name = "filesystem"
+
+    def __init__(self, root=BLOB_DIR):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, blob_id):
+        if len(blob_id) != 64 or not all(c in "0123456789abcdef" for c in blob_id):
+            raise KeyError(blob_id)
+        return os.path.join(self.root, blob_id[:2], blob_id[2:4], blob_id)
+
+    def exists(self, blob_id):
+        return os.path.isfile(self._path(blob_id))
+
+    def _write(self, blob_id, data, content_type):
+        path = self._path(blob_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, blob_id):
+        try:
+            with open(self._path(blob_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(blob_id)
+
+    def delete(self, blob_id):
+        try:
+            os.remove(self._path(blob_id))
+        except FileNotFoundError:
+            pass
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(backend=None):
+    """Returns the configured blob store (SCREENSHOT_BLOB_BACKEND=gridfs|filesystem)."""
+    backend = backend or BLOB_BACKEND
+    with _stores_lock:
+        if backend not in _stores:
+            if backend == "gridfs":
+                _stores[backend] = GridFSBlobStore()
+            elif backend == "filesystem":
+                _stores[backend] = FileSystemBlobStore()
+            else:
+                raise ValueError(f"Unknown blob store backend: {backend}")
+        return _stores[backend]
+
+
+def load_screenshot_bytes(screenshot):
+    """
+    Return the raw image bytes for a screenshot metadata entry. Entries written
+    before the blob store existed still carry their base64 image_data inline.
+    """
+    if screenshot.get("blob_id"):
+        store = get_blob_store(screenshot.get("backend"))
+        return store.get(screenshot["blob_id"])
+    if screenshot.get("image_data"):
+        return decode_data_url(screenshot["image_data"])[0]
+    raise KeyError("Screenshot has neither blob_id nor image_data")
@@ -0,0 +1,236 @@
+from flask import Blueprint, jsonify, current_app, has_app_context
+from pymongo import MongoClient, monitoring
+from pymongo.write_concern import WriteConcern
+import os
+import threading
+import logging
+from dotenv import load_dotenv
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Blueprint exposing connection pool statistics for monitoring
+database_bp = Blueprint('database', __name__)
+
+DB_NAME = os.getenv("MONGO_DB_NAME", "gd")
+
+
+def _env_int(name, default):
+    """Read an integer setting from the environment, falling back to default."""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid value for {name}: {value!r}, using {default}")
+        return default
+
+
+def _write_concern_from_env(prefix, w, j):
+    """Build a WriteConcern from MONGO_WC_<PREFIX>_W / _J environment variables."""
+    w_value = os.getenv(f"MONGO_WC_{prefix}_W", str(w))
+    j_value = os.getenv(f"MONGO_WC_{prefix}_J", str(j)).lower() in ("1", "true", "yes")
+    if w_value.isdigit():
+        w_value = int(w_value)
+    return WriteConcern(w=w_value, j=j_value)
+
+
+# Write concern per operation class. High-frequency ingestion (speech fragments,
+# screenshots, speaking time) only needs an acknowledged write, while evaluation
+# results and user accounts are worth a majority/journaled write.
+WRITE_CONCERNS = {
+    "default": _write_concern_from_env("DEFAULT", 1, False),
+    "ingest": _write_concern_from_env("INGEST", 1, False),
+    "critical": _write_concern_from_env("CRITICAL", "majority", True),
+}
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Collects connection pool counters from pymongo's CMAP events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {
+                "pools_created": 0,
+                "pools_cleared": 0,
+                "connections_created": 0,
+                "connections_closed": 0,
+                "connections_open": 0,
+                "checked_out": 0,
+                "checkouts_total": 0,
+                "checkout_failures": 0,
+            }
+
+    def _inc(self, key, amount=1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def pool_created(self, event):
+        self._inc("pools_created")
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._inc("pools_cleared")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._inc("connections_created")
+        self._inc("connections_open")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._inc("connections_closed")
+        self._inc("connections_open", -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._inc("checkout_failures")
+
+    def connection_checked_out(self, event):
+        self._inc("checked_out")
+        self._inc("checkouts_total")
+
+    def connection_checked_in(self, event):
+        self._inc("checked_out", -1)
+
+
+class MongoManager:
+    """
+    Owns the single MongoClient (and therefore the single connection pool) of a
+    worker process. The client is created lazily and recreated after a fork so
+    pre-forking servers never share sockets between processes.
+    """
+
+    def __init__(self, uri=None, db_name=DB_NAME):
+        self.uri = uri or os.getenv("MONGO_URI")
+        if not self.uri:
+            print("WARNING: MONGO_URI environment variable not set")
+        self.db_name = db_name
+        self.pool_options = {
+            "maxPoolSize": _env_int("MONGO_MAX_POOL_SIZE", 50),
+            "minPoolSize": _env_int("MONGO_MIN_POOL_SIZE", 0),
+            "maxIdleTimeMS": _env_int("MONGO_MAX_IDLE_TIME_MS", 60000),
+            "waitQueueTimeoutMS": _env_int("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+            "connectTimeoutMS": _env_int("MONGO_CONNECT_TIMEOUT_MS", 10000),
+            "serverSelectionTimeoutMS": _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000),
+            "socketTimeoutMS": _env_int("MONGO_SOCKET_TIMEOUT_MS", 30000),
+        }
+        self.stats_listener = PoolStatsListener()
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    if self._client is not None:
+                        # Inherited from the parent across a fork; never reuse its sockets
+                        logger.info("Process fork detected, creating a new MongoClient")
+                        self.stats_listener.reset()
+                    self._client = MongoClient(
+                        self.uri,
+                        connect=False,
+                        event_listeners=[self.stats_listener],
+                        **self.pool_options
+                    )
+                    self._pid = pid
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
+
+    def get_collection(self, name, op_class="default"):
+        """Returns a collection handle configured with the write concern of op_class."""
+        write_concern = WRITE_CONCERNS.get(op_class, WRITE_CONCERNS["default"])
+        return self.db.get_collection(name, write_concern=write_concern)
+
+    def after_fork(self):
+        """Drop the inherited client so the child process builds its own pool."""
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.stats_listener = PoolStatsListener()
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+    def pool_stats(self):
+        return {
+            "pid": os.getpid(),
+            "connected": self._client is not None and self._pid == os.getpid(),
+            "options": self.pool_options,
+            "write_concerns": {
+                name: wc.document for name, wc in WRITE_CONCERNS.items()
+            },
+            "counters": self.stats_listener.snapshot(),
+        }
+
+
+# Process-wide default manager used outside of an application context
+# (scripts, background threads started before the app).
+mongo = MongoManager()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=mongo.after_fork)
+
+
+def init_app(app):
+    """Inject the shared MongoManager into the Flask app."""
+    app.extensions["mongo"] = mongo
+    app.register_blueprint(database_bp)
+    return mongo
+
+
+def get_manager():
+    if has_app_context():
+        return current_app.extensions.get("mongo", mongo)
+    return mongo
+
+
+def get_db():
+    """Returns the database handle backed by the shared connection pool."""
+    return get_manager().db
+
+
+def get_collection(name, op_class="default"):
+    """Returns a collection from the shared pool with the op_class write concern."""
+    return get_manager().get_collection(name, op_class)
+
+
+@database_bp.route('/api/db/pool-stats', methods=['GET'])
+def pool_stats():
+    """Expose MongoDB connection pool usage for monitoring."""
+    try:
+        return jsonify({"success": True, "stats": get_manager().pool_stats()})
+    except Exception as e:
+        logger.error(f"Error reading pool stats: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -0,0 +1,177 @@
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+import atexit
+import multiprocessing
+import os
+import threading
+import logging
+from dotenv import load_dotenv
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Number of worker processes, each with its own FaceMesh and Haar cascade.
+# 0 runs the evaluator in-process (serialized by a lock).
+EVALUATOR_WORKERS = int(os.getenv("EVALUATOR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# Maximum tasks (single frames or chunks) in flight across all requests; callers block when it is reached
+EVALUATOR_MAX_PENDING = int(os.getenv("EVALUATOR_MAX_PENDING", "64"))
+# "spawn" keeps MediaPipe/OpenCV and the MongoClient out of forked children
+EVALUATOR_START_METHOD = os.getenv("EVALUATOR_START_METHOD", "spawn")
+# Frames per pool task when a session is evaluated; each chunk's metrics are
+# computed in one vectorized pass over its (N, landmarks, 3) tensor
+EVALUATOR_CHUNK_SIZE = int(os.getenv("EVALUATOR_CHUNK_SIZE", "4"))
+
+
+def transient_error(e):
+    """
+    Error analysis for a frame the pool failed to run (broken or shut down
+    pool, missing frame bytes). Unlike a "No face detected" result it says
+    nothing about the frame, so it is never stored and the frame is analyzed
+    again next time.
+    """
+    return {"error": str(e), "retryable": True}
+
+
+# Per-process evaluator, created by the pool initializer
+_worker_evaluator = None
+
+
+def _init_worker():
+    global _worker_evaluator
+    from screenshoteval import ScreenshotEvaluator
+    _worker_evaluator = ScreenshotEvaluator()
+
+
+def _analyze_in_worker(image_data):
+    return _worker_evaluator.analyze_face(image_data)
+
+
+def _analyze_batch_in_worker(frames):
+    return _worker_evaluator.analyze_faces(frames)
+
+
+def _analyze_sequence_in_worker(frames):
+    return _worker_evaluator.analyze_sequence(frames)
+
+
+class EvaluatorEngine:
+    """
+    Process pool of ScreenshotEvaluator workers. Safe to share between request
+    threads; results are always returned in submission order.
+    """
+
+    def __init__(self, workers=EVALUATOR_WORKERS, max_pending=EVALUATOR_MAX_PENDING,
+                 start_method=EVALUATOR_START_METHOD, chunk_size=EVALUATOR_CHUNK_SIZE):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.start_method = start_method
+        self.chunk_size = max(1, chunk_size)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._local_evaluator = None
+        self._local_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker,
+                )
+            return self._executor
+
+    def _reset_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _run_locally(self, method, arg):
+        with self._local_lock:
+            if self._local_evaluator is None:
+                from screenshoteval import ScreenshotEvaluator
+                self._local_evaluator = ScreenshotEvaluator()
+            return getattr(self._local_evaluator, method)(arg)
+
+    def submit(self, image_data):
+        """Queue one frame. Blocks while max_pending frames are already in flight."""
+        return self._submit(_analyze_in_worker, "analyze_face", image_data)
+
+    def submit_batch(self, frames):
+        """Queue a chunk of frames as one task, analyzed with a single metrics pass."""
+        return self._submit(_analyze_batch_in_worker, "analyze_faces", list(frames))
+
+    def submit_sequence(self, frames):
+        """
+        Queue a time-ordered run of frames for tracking-mode analysis. The
+        whole sequence runs on one worker, since tracking state is per process.
+        """
+        return self._submit(_analyze_sequence_in_worker, "analyze_sequence", list(frames))
+
+    def _submit(self, worker_fn, method, arg):
+        self._slots.acquire()
+        try:
+            if self.workers <= 0:
+                future = Future()
+                try:
+                    future.set_result(self._run_locally(method, arg))
+                except Exception as e:
+                    future.set_exception(e)
+            else:
+                try:
+                    future = self._get_executor().submit(worker_fn, arg)
+                except BrokenProcessPool:
+                    logger.error("Evaluator process pool broken, restarting it")
+                    self._reset_executor()
+                    future = self._get_executor().submit(worker_fn, arg)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def analyze(self, image_data):
+        """Analyze one frame and wait for the result."""
+        return self.result(self.submit(image_data))
+
+    @staticmethod
+    def result(future):
+        """Result of a submitted frame, with pool failures turned into a retryable error analysis."""
+        try:
+            return future.result()
+        except Exception as e:
+            return transient_error(e)
+
+    @staticmethod
+    def batch_results(future, count):
+        """Results of a submitted chunk, one retryable error per frame if the task failed."""
+        try:
+            return future.result()
+        except Exception as e:
+            return [transient_error(e) for _ in range(count)]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Returns the process-wide evaluator engine, created on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = EvaluatorEngine()
+            atexit.register(_engine.shutdown)
+        return _engine
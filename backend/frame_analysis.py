@@ -0,0 +1,190 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from datetime import datetime
+import os
+import threading
+import logging
+from dotenv import load_dotenv
+from database import get_collection
+from blob_store import load_screenshot_bytes
+import session_store
+from evaluator_engine import get_engine, transient_error
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Analyze screenshots in the background as soon as they are uploaded
+INGEST_ANALYSIS_ENABLED = os.getenv("INGEST_ANALYSIS_ENABLED", "true").lower() == "true"
+# Threads that persist finished analyses; the analysis itself runs on the
+# evaluator engine's process pool
+FRAME_ANALYSIS_WORKERS = int(os.getenv("FRAME_ANALYSIS_WORKERS", "2"))
+# Frames per tracking run in "sequence" mode; tracking restarts at each run,
+# which bounds memory and lets runs go to different workers
+FRAME_SEQUENCE_WINDOW = int(os.getenv("FRAME_SEQUENCE_WINDOW", "32"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FRAME_ANALYSIS_WORKERS, thread_name_prefix="frame-analysis")
+        return _executor
+
+
+def save_analysis(user_id, screenshot_id, analysis):
+    """
+    Persist an analyze_face result next to its frame. Upserts on
+    (user_id, screenshot_id) so it works even if the write-behind buffer has
+    not flushed the frame's metadata yet. Retryable errors are not stored,
+    so the next evaluation analyzes the frame again.
+    """
+    if analysis.get("retryable"):
+        logger.warning(f"Not storing retryable analysis error for screenshot {screenshot_id}: {analysis['error']}")
+        return
+    get_collection(session_store.SCREENSHOTS, "ingest").update_one(
+        {"user_id": user_id, "screenshot_id": screenshot_id},
+        {"$set": {"analysis": analysis, "analyzed_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def analyze_frame(user_id, screenshot_id, image_data):
+    """Analyze one frame and persist the result. Returns the analysis."""
+    try:
+        analysis = get_engine().analyze(image_data)
+    except Exception as e:
+        analysis = transient_error(e)
+    save_analysis(user_id, screenshot_id, analysis)
+    return analysis
+
+
+def _persist_in_background(user_id, screenshot_id, future):
+    try:
+        save_analysis(user_id, screenshot_id, get_engine().result(future))
+    except Exception as e:
+        # The evaluate endpoint will pick the frame up as unanalyzed
+        logger.error(f"Background analysis failed for screenshot {screenshot_id}: {e}")
+
+
+def submit_frame(user_id, screenshot_id, image_data):
+    """Queue a freshly uploaded frame for background analysis."""
+    if not INGEST_ANALYSIS_ENABLED:
+        return None
+    future = get_engine().submit(image_data)
+    # Persist off the pool's result thread so a slow write can't stall other frames
+    future.add_done_callback(
+        lambda f: _get_executor().submit(_persist_in_background, user_id, screenshot_id, f)
+    )
+    return future
+
+
+def _load_frame(screenshot):
+    """The frame's bytes, or None if its blob is missing (possibly not written yet)."""
+    try:
+        return load_screenshot_bytes(screenshot)
+    except KeyError:
+        return None
+
+
+def _missing_frame(screenshot):
+    return transient_error(f"Screenshot data not found: {screenshot['screenshot_id']}")
+
+
+ANALYSIS_MODES = ("static", "sequence")
+
+
+class _Chunk:
+    """Missing frames sent to the evaluator engine as one task (a batch or a tracking run)."""
+
+    def __init__(self):
+        self.frames = []
+        self.count = 0
+        self.future = None
+        self.results = None
+
+    def submit(self, submit_fn):
+        self.count = len(self.frames)
+        self.future = submit_fn(self.frames)
+        self.frames = None
+
+    def result(self, engine, position):
+        if self.results is None:
+            self.results = engine.batch_results(self.future, self.count)
+        return self.results[position]
+
+
+def session_analyses(user_id, screenshots, mode="static", window=None):
+    """
+    Yield the analysis of every screenshot in order, using the stored result
+    when there is one. Frames that have not been analyzed yet are persisted
+    as they complete.
+
+    mode "static" fans the missing frames out across the evaluator engine's
+    workers in chunks of engine.chunk_size, so each chunk's metrics are
+    computed in one vectorized pass, with at most `window` chunks in flight.
+    "sequence" runs them in timestamp order through a tracking-mode FaceMesh,
+    which is cheaper per frame for a continuous session, in runs of `window`
+    frames with at most one run per worker in flight. Both modes consume
+    `screenshots` lazily so a cursor can be passed in, and yield each chunk's
+    results as soon as it completes.
+    """
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode: {mode}")
+    engine = get_engine()
+
+    if mode == "sequence":
+        chunk_size = max(1, window or FRAME_SEQUENCE_WINDOW)
+        window = max(1, engine.workers)
+        submit_fn = engine.submit_sequence
+    else:
+        chunk_size = engine.chunk_size
+        window = window or max(1, engine.workers * 2)
+        submit_fn = engine.submit_batch
+    # (screenshot_id, chunk and position in it, or None and the stored analysis) in frame order
+    pending = deque()
+    chunk = _Chunk()
+    in_flight = 0
+
+    def submit():
+        nonlocal chunk, in_flight
+        if chunk.frames:
+            chunk.submit(submit_fn)
+            in_flight += 1
+            chunk = _Chunk()
+
+    def finish(item):
+        screenshot_id, item_chunk, value = item
+        if item_chunk is None:
+            return value
+        analysis = item_chunk.result(engine, value)
+        save_analysis(user_id, screenshot_id, analysis)
+        return analysis
+
+    for screenshot in screenshots:
+        if "analysis" in screenshot:
+            pending.append((screenshot["screenshot_id"], None, screenshot["analysis"]))
+        else:
+            image_data = _load_frame(screenshot)
+            if image_data is None:
+                pending.append((screenshot["screenshot_id"], None, _missing_frame(screenshot)))
+            else:
+                pending.append((screenshot["screenshot_id"], chunk, len(chunk.frames)))
+                chunk.frames.append(image_data)
+                if len(chunk.frames) >= chunk_size:
+                    submit()
+        # Release stored results right away and wait on the oldest chunk once the window is full
+        while pending and (pending[0][1] is None or in_flight >= window):
+            item = pending.popleft()
+            if item[1] is not None and item[2] == item[1].count - 1:
+                in_flight -= 1
+            yield finish(item)
+    submit()
+    while pending:
+        yield finish(pending.popleft())
@@ -0,0 +1,142 @@
+import os
+import logging
+from dotenv import load_dotenv
+from grammar_engine import grammar_engine
+from grammar_cache import grammar_cache, normalize_text, serialize_match
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Upper bound on the characters sent to LanguageTool in one batched check
+GRAMMAR_BATCH_MAX_CHARS = int(os.getenv("GRAMMAR_BATCH_MAX_CHARS", "20000"))
+# Entries are separated by a blank line so each one starts a new paragraph
+BATCH_SEPARATOR = "\n\n"
+# Rules that look across sentences or paragraphs and could fire differently
+# once entries share a document. An entry hit by one of them is re-checked on
+# its own so its error count matches the unbatched path exactly.
+CONTEXT_RULES = set(filter(None, os.getenv(
+    "GRAMMAR_BATCH_CONTEXT_RULES",
+    "ENGLISH_WORD_REPEAT_BEGINNING_RULE,PARAGRAPH_REPEAT_BEGINNING_RULE,"
+    "EN_REPEATEDWORDS,STYLE_REPEATED_WORD_RULE,PUNCTUATION_PARAGRAPH_END"
+).split(",")))
+
+
+def build_batches(texts, max_chars=GRAMMAR_BATCH_MAX_CHARS, separator=BATCH_SEPARATOR):
+    """
+    Pack texts into documents of at most max_chars (a longer text gets a
+    document of its own).
+
+    Returns:
+        List[Tuple[str, List[Tuple[int, int, int]]]]: Each document with the
+        (text index, start offset, end offset) of every text in it
+    """
+    batches = []
+    parts, spans, length = [], [], 0
+    for index, text in enumerate(texts):
+        added = len(text) + (len(separator) if parts else 0)
+        if parts and length + added > max_chars:
+            batches.append((separator.join(parts), spans))
+            parts, spans, length = [], [], 0
+            added = len(text)
+        start = length + (len(separator) if parts else 0)
+        parts.append(text)
+        spans.append((index, start, start + len(text)))
+        length += added
+    if parts:
+        batches.append((separator.join(parts), spans))
+    return batches
+
+
+def map_matches(matches, spans, context_rules=CONTEXT_RULES):
+    """
+    Assign a batched document's matches back to the texts it was built from,
+    with offsets relative to each text.
+
+    Args:
+        matches (List[Dict]): Serialized matches for the whole document
+        spans (List[Tuple[int, int, int]]): (text index, start, end) per text
+
+    Returns:
+        Tuple[Dict[int, List[Dict]], Set[int]]: Matches per text index, and the
+        indexes whose result depends on the surrounding texts and must be
+        re-checked alone
+    """
+    per_text = {index: [] for index, _, _ in spans}
+    recheck = set()
+    for match in sorted(matches, key=lambda m: m["offset"]):
+        offset, length = match["offset"], match["length"]
+        owner = None
+        for index, start, end in spans:
+            if start <= offset < end or (offset == end and length == 0):
+                owner = (index, start, end)
+                break
+        if owner is None:
+            # The match sits on a separator: a text boundary effect, so the
+            # neighbouring texts are checked alone
+            for index, start, end in spans:
+                if end <= offset < end + len(BATCH_SEPARATOR) or start == offset + length:
+                    recheck.add(index)
+            continue
+        index, start, end = owner
+        if offset + length > end or match["rule_id"] in context_rules:
+            recheck.add(index)
+            continue
+        per_text[index].append({**match, "offset": offset - start})
+    return per_text, recheck
+
+
+def check_many(texts, use_cache=True, max_chars=GRAMMAR_BATCH_MAX_CHARS):
+    """
+    Grammar matches for many texts with one LanguageTool check per batch.
+    Cached texts are served from the grammar cache; per-text results are
+    identical to checking each (normalized) text on its own.
+
+    Returns:
+        List[List[Dict]]: Serialized matches per text, in input order
+    """
+    normalized = [normalize_text(text) for text in texts]
+    results = [None] * len(texts)
+
+    # Identical texts are checked once
+    pending = {}
+    for index, text in enumerate(normalized):
+        if not text:
+            results[index] = []
+            continue
+        if use_cache and grammar_cache.enabled:
+            cached = grammar_cache.get(text)
+            if cached is not None:
+                results[index] = cached
+                continue
+        pending.setdefault(text, []).append(index)
+
+    unique = list(pending)
+    recheck = set()
+    for document, spans in build_batches(unique, max_chars):
+        matches = [serialize_match(m) for m in grammar_engine.check(document)]
+        per_text, batch_recheck = map_matches(matches, spans)
+        recheck |= batch_recheck
+        for position, text_matches in per_text.items():
+            if position in batch_recheck:
+                continue
+            for index in pending[unique[position]]:
+                results[index] = text_matches
+            if use_cache and grammar_cache.enabled:
+                grammar_cache.put(unique[position], text_matches)
+
+    for position in recheck:
+        text = unique[position]
+        if use_cache:
+            text_matches = grammar_cache.check(text)
+        else:
+            text_matches = [serialize_match(m) for m in grammar_engine.check(text)]
+        for index in pending[text]:
+            results[index] = text_matches
+
+    if unique:
+        logger.info(f"Grammar-checked {len(unique)} texts in batches, {len(recheck)} re-checked alone")
+    return results
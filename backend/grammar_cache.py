@@ -0,0 +1,163 @@
+from flask import Blueprint, jsonify
+from collections import OrderedDict
+from datetime import datetime
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+import logging
+from dotenv import load_dotenv
+from database import get_collection
+from grammar_engine import grammar_engine
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Blueprint exposing grammar cache counters
+grammar_cache_bp = Blueprint('grammar_cache', __name__)
+
+GRAMMAR_CACHE = "grammar_cache"
+GRAMMAR_CACHE_ENABLED = os.getenv("GRAMMAR_CACHE_ENABLED", "true").lower() == "true"
+GRAMMAR_CACHE_LRU_SIZE = int(os.getenv("GRAMMAR_CACHE_LRU_SIZE", "2048"))
+# Persistent entries expire through a TTL index on created_at, after
+# indexes.GRAMMAR_CACHE_TTL_DAYS
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Unicode-normalize and collapse whitespace so near-identical phrases share a key."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def serialize_match(match):
+    """The parts of a LanguageTool match worth caching."""
+    return {
+        "rule_id": match.ruleId,
+        "message": match.message,
+        "offset": match.offset,
+        "length": match.errorLength,
+        "category": getattr(match, "category", None),
+        "issue_type": getattr(match, "ruleIssueType", None),
+        "replacements": list(match.replacements[:5]),
+    }
+
+
+class GrammarCache:
+    """
+    Grammar check results keyed by the hash of the normalized text and the
+    LanguageTool rule-set version, with an in-process LRU in front of a
+    persistent Mongo collection.
+    """
+
+    def __init__(self, lru_size=GRAMMAR_CACHE_LRU_SIZE, enabled=GRAMMAR_CACHE_ENABLED):
+        self.lru_size = lru_size
+        self.enabled = enabled
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"lru_hits": 0, "mongo_hits": 0, "misses": 0, "mongo_errors": 0}
+
+    def _inc(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def key(normalized):
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"{grammar_engine.ruleset_version}:{digest}"
+
+    def _lru_get(self, key):
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+        return None
+
+    def _lru_put(self, key, matches):
+        with self._lock:
+            self._lru[key] = matches
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, normalized):
+        """Cached matches for normalized text, or None."""
+        key = self.key(normalized)
+        matches = self._lru_get(key)
+        if matches is not None:
+            self._inc("lru_hits")
+            return matches
+        try:
+            doc = get_collection(GRAMMAR_CACHE).find_one({"_id": key}, {"matches": 1})
+        except Exception as e:
+            logger.warning(f"Grammar cache lookup failed: {e}")
+            self._inc("mongo_errors")
+            doc = None
+        if doc is not None:
+            self._inc("mongo_hits")
+            self._lru_put(key, doc["matches"])
+            return doc["matches"]
+        self._inc("misses")
+        return None
+
+    def put(self, normalized, matches):
+        key = self.key(normalized)
+        self._lru_put(key, matches)
+        try:
+            get_collection(GRAMMAR_CACHE, "ingest").update_one(
+                {"_id": key},
+                {"$set": {"matches": matches, "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Grammar cache write failed: {e}")
+            self._inc("mongo_errors")
+
+    def check(self, text):
+        """
+        LanguageTool matches for text, served from the cache when possible.
+        The normalized text is what gets checked, so offsets refer to it.
+
+        Returns:
+            List[Dict]: Serialized matches
+        """
+        normalized = normalize_text(text)
+        if not self.enabled:
+            return [serialize_match(m) for m in grammar_engine.check(normalized)]
+        matches = self.get(normalized)
+        if matches is None:
+            matches = [serialize_match(m) for m in grammar_engine.check(normalized)]
+            self.put(normalized, matches)
+        return matches
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._lru)
+        lookups = stats["lru_hits"] + stats["mongo_hits"] + stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "ruleset_version": grammar_engine.ruleset_version,
+            "lru_size": size,
+            "lru_capacity": self.lru_size,
+            **stats,
+            "hit_rate": round((stats["lru_hits"] + stats["mongo_hits"]) / lookups, 4) if lookups else None,
+        }
+
+
+# Process-wide cache used by speech scoring
+grammar_cache = GrammarCache()
+
+
+@grammar_cache_bp.route('/api/grammar/cache/stats', methods=['GET'])
+def grammar_cache_stats():
+    return jsonify(grammar_cache.stats()), 200
@@ -0,0 +1,269 @@
+from flask import Blueprint, jsonify
+from functools import cached_property
+import atexit
+import os
+import threading
+import time
+import logging
+from dotenv import load_dotenv
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Blueprint exposing grammar engine metrics
+grammar_engine_bp = Blueprint('grammar_engine', __name__)
+
+GRAMMAR_LANGUAGE = os.getenv("GRAMMAR_LANGUAGE", "en-US")
+# Warm LanguageTool instances; each one is a local Java server, so keep this small
+GRAMMAR_POOL_SIZE = int(os.getenv("GRAMMAR_POOL_SIZE", "2"))
+# How long a check waits for a free instance before failing
+GRAMMAR_ACQUIRE_TIMEOUT = float(os.getenv("GRAMMAR_ACQUIRE_TIMEOUT", "30"))
+# Instances are restarted after this many checks to cap the JVM's memory growth
+GRAMMAR_MAX_CHECKS_PER_INSTANCE = int(os.getenv("GRAMMAR_MAX_CHECKS_PER_INSTANCE", "5000"))
+# An instance idle for longer than this is health-checked before it is used
+GRAMMAR_HEALTH_CHECK_SECONDS = int(os.getenv("GRAMMAR_HEALTH_CHECK_SECONDS", "60"))
+# Start the pool in the background when the app starts instead of on first use
+GRAMMAR_WARMUP = os.getenv("GRAMMAR_WARMUP", "true").lower() == "true"
+
+HEALTH_CHECK_TEXT = "This is a health check."
+# Identifies the rules a result was produced with, for caching. Defaults to
+# the language plus the installed language_tool_python version, which pins
+# the LanguageTool release it downloads.
+GRAMMAR_RULESET_VERSION = os.getenv("GRAMMAR_RULESET_VERSION")
+
+
+class GrammarEngineBusy(RuntimeError):
+    """No LanguageTool instance became free within GRAMMAR_ACQUIRE_TIMEOUT."""
+
+
+class _PooledTool:
+    def __init__(self, language):
+        import language_tool_python
+        started = time.perf_counter()
+        self.tool = language_tool_python.LanguageTool(language)
+        self.startup_ms = (time.perf_counter() - started) * 1000
+        self.checks = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.tool.close()
+        except Exception as e:
+            logger.warning(f"Error closing LanguageTool instance: {e}")
+
+
+class GrammarEngine:
+    """
+    Pool of warm LanguageTool instances. At most pool_size checks run at
+    once; further callers wait for a free instance. Instances are
+    health-checked after being idle and replaced when they fail or reach
+    max_checks.
+    """
+
+    def __init__(self, language=GRAMMAR_LANGUAGE, pool_size=GRAMMAR_POOL_SIZE,
+                 acquire_timeout=GRAMMAR_ACQUIRE_TIMEOUT, max_checks=GRAMMAR_MAX_CHECKS_PER_INSTANCE,
+                 health_check_seconds=GRAMMAR_HEALTH_CHECK_SECONDS):
+        self.language = language
+        self.pool_size = pool_size
+        self.acquire_timeout = acquire_timeout
+        self.max_checks = max_checks
+        self.health_check_seconds = health_check_seconds
+        # Most recently used last, so busy periods keep reusing the same warm instances
+        self._idle = []
+        self._created = 0
+        self._lock = threading.Lock()
+        # Notified whenever an instance is returned or a pool slot is freed
+        self._available = threading.Condition(self._lock)
+        self._closed = False
+        self._stats = {
+            "instances_created": 0,
+            "instances_recycled": 0,
+            "health_check_failures": 0,
+            "checks": 0,
+            "check_failures": 0,
+            "busy_rejections": 0,
+            "waiting": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "check_ms_total": 0.0,
+            "check_ms_max": 0.0,
+            "startup_ms_last": None,
+        }
+
+    def _new_instance(self):
+        instance = _PooledTool(self.language)
+        with self._lock:
+            self._stats["instances_created"] += 1
+            self._stats["startup_ms_last"] = round(instance.startup_ms, 1)
+        logger.info(f"Started LanguageTool instance in {instance.startup_ms:.0f} ms")
+        return instance
+
+    def _acquire(self):
+        # Reuse an idle instance; create one if the pool isn't full; otherwise
+        # wait until one is returned or a closed instance frees its slot
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._available:
+            while not self._idle and self._created >= self.pool_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["busy_rejections"] += 1
+                    raise GrammarEngineBusy(f"No LanguageTool instance free after {self.acquire_timeout}s")
+                self._available.wait(remaining)
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return self._new_instance()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def _release(self, instance, healthy=True):
+        if not healthy or self._closed or (self.max_checks and instance.checks >= self.max_checks):
+            instance.close()
+            with self._lock:
+                if healthy and not self._closed:
+                    self._stats["instances_recycled"] += 1
+            self._free_slot()
+            return
+        instance.last_used = time.monotonic()
+        with self._available:
+            self._idle.append(instance)
+            self._available.notify()
+
+    def _healthy(self, instance):
+        if time.monotonic() - instance.last_used < self.health_check_seconds:
+            return True
+        try:
+            instance.tool.check(HEALTH_CHECK_TEXT)
+            return True
+        except Exception as e:
+            logger.warning(f"LanguageTool health check failed, replacing instance: {e}")
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    def check(self, text):
+        """Run LanguageTool on text. Returns the list of matches."""
+        wait_start = time.perf_counter()
+        with self._lock:
+            self._stats["waiting"] += 1
+        try:
+            instance = self._acquire()
+            while not self._healthy(instance):
+                self._release(instance, healthy=False)
+                instance = self._acquire()
+        finally:
+            wait_ms = (time.perf_counter() - wait_start) * 1000
+            with self._lock:
+                self._stats["waiting"] -= 1
+                self._stats["wait_ms_total"] += wait_ms
+                self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+
+        check_start = time.perf_counter()
+        healthy = True
+        try:
+            matches = instance.tool.check(text)
+            instance.checks += 1
+            return matches
+        except Exception:
+            # A failed check usually means the Java server died; don't reuse it
+            healthy = False
+            with self._lock:
+                self._stats["check_failures"] += 1
+            raise
+        finally:
+            check_ms = (time.perf_counter() - check_start) * 1000
+            with self._lock:
+                self._stats["checks"] += 1
+                self._stats["check_ms_total"] += check_ms
+                self._stats["check_ms_max"] = max(self._stats["check_ms_max"], check_ms)
+            self._release(instance, healthy)
+
+    def warm_up(self):
+        """Start every instance in the pool ahead of the first request."""
+        instances = []
+        try:
+            for _ in range(self.pool_size):
+                with self._lock:
+                    if self._created >= self.pool_size:
+                        break
+                    self._created += 1
+                try:
+                    instances.append(self._new_instance())
+                except Exception:
+                    self._free_slot()
+                    raise
+        finally:
+            with self._available:
+                self._idle.extend(instances)
+                self._available.notify(len(instances))
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            instances, self._idle = self._idle, []
+        for instance in instances:
+            instance.close()
+            self._free_slot()
+
+    @cached_property
+    def ruleset_version(self):
+        """Part of every cache key, so it is looked up once rather than per check."""
+        if GRAMMAR_RULESET_VERSION:
+            return GRAMMAR_RULESET_VERSION
+        try:
+            from importlib.metadata import version
+            package_version = version("language_tool_python")
+        except Exception:
+            package_version = "unknown"
+        return f"{self.language}:ltp-{package_version}"
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            instances = self._created
+            idle = len(self._idle)
+        checks = stats["checks"]
+        return {
+            "language": self.language,
+            "pool_size": self.pool_size,
+            "instances": instances,
+            "idle": idle,
+            **stats,
+            "wait_ms_avg": round(stats["wait_ms_total"] / checks, 3) if checks else None,
+            "check_ms_avg": round(stats["check_ms_total"] / checks, 3) if checks else None,
+        }
+
+
+# Process-wide engine shared by the grammar endpoints
+grammar_engine = GrammarEngine()
+atexit.register(grammar_engine.close)
+
+
+def init_app(app):
+    """Register the metrics endpoint and warm the pool in the background."""
+    app.register_blueprint(grammar_engine_bp)
+    if GRAMMAR_WARMUP:
+        def warm_up():
+            try:
+                grammar_engine.warm_up()
+            except Exception as e:
+                logger.error(f"Could not warm up LanguageTool: {e}")
+
+        threading.Thread(target=warm_up, name="grammar-warmup", daemon=True).start()
+    return grammar_engine
+
+
+@grammar_engine_bp.route('/api/grammar/engine/stats', methods=['GET'])
+def grammar_engine_stats():
+    return jsonify(grammar_engine.stats()), 200
@@ -0,0 +1,176 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from datetime import datetime
+import argparse
+import os
+import sys
+import logging
+from database import get_db
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Grammar check results expire after this many days (TTL index)
+GRAMMAR_CACHE_TTL_DAYS = int(os.getenv("GRAMMAR_CACHE_TTL_DAYS", "30"))
+
+# Declarative index registry: collection name -> list of IndexModel.
+# Every index has an explicit name so re-applying the registry is idempotent.
+INDEX_REGISTRY = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "gd_sessions": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)],
+                   name="user_session_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING)],
+                   name="user_updated_at"),
+    ],
+    "speech_entries": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("timestamp", ASCENDING)],
+                   name="user_session_timestamp"),
+    ],
+    "screenshots": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING), ("timestamp", ASCENDING)],
+                   name="user_session_timestamp"),
+        IndexModel([("user_id", ASCENDING), ("screenshot_id", ASCENDING)],
+                   name="user_screenshot_id_unique", unique=True),
+    ],
+    "screenshot_evaluations": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)],
+                   name="user_session"),
+    ],
+    "evaluation_jobs": [
+        IndexModel([("user_id", ASCENDING), ("job_type", ASCENDING), ("input_version", ASCENDING)],
+                   name="user_type_version_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)],
+                   name="status_lease"),
+    ],
+    "text_stats": [
+        IndexModel([("user_id", ASCENDING), ("session_id", ASCENDING)],
+                   name="user_session_unique", unique=True),
+    ],
+    "topic_openers": [
+        IndexModel([("participant", ASCENDING), ("topic_key", ASCENDING)],
+                   name="participant_topic"),
+    ],
+    "grammar_cache": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl",
+                   expireAfterSeconds=GRAMMAR_CACHE_TTL_DAYS * 24 * 3600),
+    ],
+}
+
+# Every query shape the blueprints issue, with representative values. Each
+# entry is run through explain() by check_query_plans; a new endpoint must add
+# its query here (and an index to INDEX_REGISTRY if needed).
+QUERY_SHAPES = [
+    {"name": "auth.find_user", "collection": "users",
+     "filter": {"user_id": "u"}},
+    {"name": "sessions.latest_session", "collection": "gd_sessions",
+     "filter": {"user_id": "u"}, "sort": [("updated_at", DESCENDING)]},
+    {"name": "sessions.get_session", "collection": "gd_sessions",
+     "filter": {"user_id": "u", "session_id": "s"}},
+    {"name": "sessions.speech_counts", "collection": "gd_sessions",
+     "filter": {"user_id": "u"}},
+    {"name": "sessions.speaking_times", "collection": "gd_sessions",
+     "filter": {"user_id": "u", "speaking_time": {"$exists": True}}},
+    {"name": "speech_entries.list", "collection": "speech_entries",
+     "filter": {"user_id": "u", "session_id": "s"}, "sort": [("timestamp", ASCENDING)]},
+    {"name": "screenshots.list", "collection": "screenshots",
+     "filter": {"user_id": "u", "session_id": "s"}, "sort": [("timestamp", ASCENDING)]},
+    {"name": "screenshots.list_since", "collection": "screenshots",
+     "filter": {"user_id": "u", "session_id": "s", "timestamp": {"$gt": datetime(2000, 1, 1)}},
+     "sort": [("timestamp", ASCENDING)]},
+    {"name": "screenshots.latest", "collection": "screenshots",
+     "filter": {"user_id": "u", "session_id": "s"}, "sort": [("timestamp", DESCENDING)], "limit": 10},
+    {"name": "screenshots.find_one", "collection": "screenshots",
+     "filter": {"user_id": "u", "screenshot_id": "x"}},
+    {"name": "screenshot_evaluations.find", "collection": "screenshot_evaluations",
+     "filter": {"user_id": "u", "session_id": "s"}},
+    {"name": "text_stats.find", "collection": "text_stats",
+     "filter": {"user_id": "u", "session_id": "s"}},
+    {"name": "text_stats.find_sessions", "collection": "text_stats",
+     "filter": {"user_id": "u", "session_id": {"$in": ["s"]}}},
+    {"name": "topic_openers.find", "collection": "topic_openers",
+     "filter": {"participant": "llm1", "topic_key": "t"}},
+    {"name": "jobs.dedupe", "collection": "evaluation_jobs",
+     "filter": {"user_id": "u", "job_type": "grammar", "input_version": "s:0"}},
+    {"name": "jobs.recover_queued", "collection": "evaluation_jobs",
+     "filter": {"status": "queued"}},
+    {"name": "jobs.recover_expired", "collection": "evaluation_jobs",
+     "filter": {"status": "running", "lease_until": {"$lt": datetime(2000, 1, 1)}}},
+]
+
+
+def ensure_indexes(db=None):
+    """Create every index in INDEX_REGISTRY. Safe to call on every startup."""
+    db = db if db is not None else get_db()
+    created = {}
+    for collection_name, models in INDEX_REGISTRY.items():
+        try:
+            created[collection_name] = db[collection_name].create_indexes(models)
+        except OperationFailure as e:
+            # An index with the same name but different options already exists
+            logger.error(f"Failed to create indexes on {collection_name}: {e}")
+            created[collection_name] = []
+    logger.info(f"Indexes ensured on {len(created)} collections")
+    return created
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan", "innerStage", "outerStage"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def explain_shape(db, shape):
+    cursor = db[shape["collection"]].find(shape["filter"], shape.get("projection"))
+    if shape.get("sort"):
+        cursor = cursor.sort(shape["sort"])
+    if shape.get("limit"):
+        cursor = cursor.limit(shape["limit"])
+    return cursor.explain()
+
+
+def check_query_plans(db=None, shapes=None):
+    """
+    Run explain() on every registered query shape.
+
+    Returns:
+        List[Dict]: One entry per shape whose winning plan contains a COLLSCAN
+    """
+    db = db if db is not None else get_db()
+    failures = []
+    for shape in shapes or QUERY_SHAPES:
+        explain = explain_shape(db, shape)
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        stages = list(_plan_stages(winning_plan))
+        if "COLLSCAN" in stages:
+            failures.append({"name": shape["name"], "collection": shape["collection"], "stages": stages})
+            logger.error(f"COLLSCAN in query shape {shape['name']}: {stages}")
+        else:
+            logger.info(f"Query shape {shape['name']} OK: {stages}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the index registry and check query plans")
+    parser.add_argument("--check", action="store_true", help="Fail if any query shape does a COLLSCAN")
+    args = parser.parse_args()
+
+    ensure_indexes()
+    if args.check:
+        failures = check_query_plans()
+        if failures:
+            print(f"{len(failures)} query shape(s) do a collection scan:")
+            for failure in failures:
+                print(f"  {failure['name']} on {failure['collection']}: {failure['stages']}")
+            sys.exit(1)
+        print("All query shapes use an index ✅")
@@ -0,0 +1,305 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from bson import ObjectId
+import json
+import os
+import socket
+import threading
+import time
+import logging
+from dotenv import load_dotenv
+from database import get_collection
+import session_store
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Blueprint for submitting evaluation jobs and polling their status
+jobs_bp = Blueprint('jobs', __name__)
+
+JOBS = "evaluation_jobs"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A running job whose lease has expired (its process died) is picked up again
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "900"))
+JOB_EVENTS_POLL_MS = int(os.getenv("JOB_EVENTS_POLL_MS", "500"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+TERMINAL_STATUSES = (DONE, FAILED)
+
+# Evaluation type -> the endpoint that computes it and the session counter
+# that versions its input. A job runs its endpoint in a request context, so
+# the synchronous and asynchronous paths share one implementation.
+JOB_TYPES = {
+    "gd_evaluation": {"endpoint": "user_data.evaluate_gd_performance", "version_field": "speech_count"},
+    "grammar": {"endpoint": "user_data.get_grammar_scores", "version_field": "speech_count"},
+    "screenshot_evaluation": {"endpoint": "screenshot.evaluate_user_screenshots",
+                              "version_field": "screenshot_count", "params": ("mode",)},
+}
+
+_app = None
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _owner():
+    """Identifies this worker process on the jobs it claims (pid changes after fork)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="evaluation-job")
+        return _executor
+
+
+def _public(job):
+    """The job document as returned by the API."""
+    if job is None:
+        return None
+    job = dict(job)
+    job["job_id"] = job.pop("_id")
+    job.pop("lease_until", None)
+    job.pop("owner", None)
+    return job
+
+
+def input_version(job_type, user_id, session_id, params):
+    """
+    Identify the input a job evaluates: the session plus the counter of the
+    entries it reads, so new speech or screenshots produce a new version.
+    """
+    # This session's entries still in the write-behind buffer must count towards the version
+    from write_buffer import write_buffer
+    write_buffer.flush(user_id, session_id)
+    session = session_store.get_session(user_id, session_id, {JOB_TYPES[job_type]["version_field"]: 1}) or {}
+    version = f"{session_id}:{session.get(JOB_TYPES[job_type]['version_field'], 0)}"
+    for name in JOB_TYPES[job_type].get("params", ()):
+        if params.get(name):
+            version += f":{name}={params[name]}"
+    return version
+
+
+def submit(job_type, user_id, session_id=None, params=None):
+    """
+    Queue an evaluation, or return the existing job for the same
+    (user, evaluation type, input version). Failed jobs are queued again.
+
+    Returns:
+        Tuple[Dict, bool]: The job and whether it was deduplicated
+    """
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Unknown job type: {job_type}")
+    user_id = str(user_id)
+    session_id = session_store.read_session_id(user_id, session_id)
+    if not session_id:
+        raise LookupError("No session found for this user")
+    params = {name: value for name, value in (params or {}).items()
+              if name in JOB_TYPES[job_type].get("params", ()) and value}
+    version = input_version(job_type, user_id, session_id, params)
+
+    jobs = get_collection(JOBS, "critical")
+    now = datetime.utcnow()
+    new_id = str(ObjectId())
+    key = {"user_id": user_id, "job_type": job_type, "input_version": version}
+    try:
+        job = jobs.find_one_and_update(
+            key,
+            {"$setOnInsert": {
+                "_id": new_id,
+                "session_id": session_id,
+                "params": params,
+                "status": QUEUED,
+                "created_at": now,
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # A concurrent submit inserted the same job first
+        job = jobs.find_one(key)
+    deduplicated = job["_id"] != new_id
+
+    if job["status"] == FAILED:
+        job = jobs.find_one_and_update(
+            {"_id": job["_id"], "status": FAILED},
+            {"$set": {"status": QUEUED, "requeued_at": now}, "$unset": {"error": ""}},
+            return_document=ReturnDocument.AFTER,
+        ) or jobs.find_one({"_id": job["_id"]})
+        deduplicated = False
+
+    if job["status"] == QUEUED:
+        _get_executor().submit(_run, job["_id"])
+    return _public(job), deduplicated
+
+
+def get_job(job_id):
+    return _public(get_collection(JOBS).find_one({"_id": job_id}))
+
+
+def _claim(job_id):
+    """Atomically move a queued (or lease-expired) job to running."""
+    now = datetime.utcnow()
+    return get_collection(JOBS, "critical").find_one_and_update(
+        {"_id": job_id, "$or": [
+            {"status": QUEUED},
+            {"status": RUNNING, "lease_until": {"$lt": now}},
+        ]},
+        {"$set": {
+            "status": RUNNING,
+            "started_at": now,
+            "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            "owner": _owner(),
+        }, "$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _dispatch(job):
+    """Run the job's endpoint and return (status code, JSON body)."""
+    endpoint = JOB_TYPES[job["job_type"]]["endpoint"]
+    with _app.test_request_context():
+        path = url_for(endpoint, user_id=job["user_id"])
+    query = {"session_id": job["session_id"], **job.get("params", {})}
+    with _app.test_request_context(path, method="GET", query_string=query):
+        response = _app.make_response(_app.full_dispatch_request())
+        return response.status_code, response.get_json(silent=True)
+
+
+def _run(job_id):
+    job = _claim(job_id)
+    if job is None:
+        # Already claimed by another worker or process
+        return
+    jobs = get_collection(JOBS, "critical")
+    try:
+        status_code, body = _dispatch(job)
+        if 200 <= status_code < 300:
+            update = {"status": DONE, "result": body}
+        else:
+            error = body.get("error") if isinstance(body, dict) else None
+            update = {"status": FAILED, "status_code": status_code, "result": body,
+                      "error": error or f"Evaluation failed with status {status_code}"}
+    except Exception as e:
+        logger.error(f"Evaluation job {job_id} failed: {e}")
+        update = {"status": FAILED, "error": str(e)}
+    update["finished_at"] = datetime.utcnow()
+    jobs.update_one({"_id": job_id, "owner": _owner()}, {"$set": update, "$unset": {"lease_until": ""}})
+    logger.info(f"Evaluation job {job_id} ({job['job_type']}) {update['status']}")
+
+
+def recover_jobs():
+    """Re-queue jobs left queued or running by a previous process."""
+    now = datetime.utcnow()
+    recovered = 0
+    for job in get_collection(JOBS).find(
+        {"$or": [{"status": QUEUED}, {"status": RUNNING, "lease_until": {"$lt": now}}]},
+        {"_id": 1}
+    ):
+        _get_executor().submit(_run, job["_id"])
+        recovered += 1
+    if recovered:
+        logger.info(f"Recovered {recovered} evaluation jobs")
+    return recovered
+
+
+def init_app(app):
+    """Register the jobs blueprint and resume unfinished jobs in the background."""
+    global _app
+    _app = app
+    app.register_blueprint(jobs_bp)
+
+    def recover():
+        try:
+            recover_jobs()
+        except Exception as e:
+            logger.error(f"Could not recover evaluation jobs: {e}")
+
+    threading.Thread(target=recover, name="job-recovery", daemon=True).start()
+
+
+def accepted_response(job, deduplicated):
+    """202 response pointing at the job's status and event stream."""
+    return jsonify({
+        "success": True,
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "deduplicated": deduplicated,
+        "status_url": url_for("jobs.get_job_status", job_id=job["job_id"]),
+        "events_url": url_for("jobs.job_events", job_id=job["job_id"]),
+    }), 202
+
+
+def wants_async():
+    return request.args.get("async", "false").lower() == "true"
+
+
+def submit_from_request(job_type, user_id):
+    """Handle ?async=true on an evaluation endpoint: queue it as a job instead."""
+    try:
+        job, deduplicated = submit(job_type, user_id, request.args.get("session_id"),
+                                   params=request.args.to_dict())
+    except LookupError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    return accepted_response(job, deduplicated)
+
+
+@jobs_bp.route('/api/jobs', methods=['POST'])
+def create_job():
+    data = request.get_json(silent=True) or {}
+    user_id = data.get("user_id")
+    job_type = data.get("type")
+    if not user_id or job_type not in JOB_TYPES:
+        return jsonify({
+            "success": False,
+            "error": f"user_id and type ({', '.join(JOB_TYPES)}) are required"
+        }), 400
+    try:
+        job, deduplicated = submit(job_type, user_id, data.get("session_id"), data.get("params"))
+    except LookupError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except Exception as e:
+        logger.error(f"Error submitting evaluation job: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    return accepted_response(job, deduplicated)
+
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    return jsonify({"success": True, "job": json.loads(json.dumps(job, default=str))}), 200
+
+
+@jobs_bp.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-sent events with the job's status until it finishes."""
+    if get_job(job_id) is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+
+    def events():
+        last_status = None
+        while True:
+            job = get_job(job_id)
+            if job is None:
+                # Deleted or expired while being watched
+                yield f"event: error\ndata: {json.dumps({'success': False, 'error': 'Job not found'})}\n\n"
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: {last_status}\ndata: {json.dumps(job, default=str)}\n\n"
+            if last_status in TERMINAL_STATUSES:
+                return
+            time.sleep(JOB_EVENTS_POLL_MS / 1000.0)
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
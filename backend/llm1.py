@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_cors import CORS
 from openai import OpenAI
 import io
@@ -8,6 +8,12 @@ import requests
 import logging
 import time
 from dotenv import load_dotenv
+from llm_cache import llm_cache
+import llm_stream
+import speech_pipeline
+import streaming
+from tts_cache import tts_cache, audio_response
+import offline_tts
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -43,8 +49,111 @@ def init_api_keys():
 # Initialize API keys when the blueprint is created
 init_api_keys()
 
+LLM1_MODEL = "google/gemma-3-4b-it:free"
+
+
+class InvalidCompletion(ValueError):
+    """The LLM API answered, but without usable text."""
+
+
+def prompt_class(is_initial, is_user_message):
+    """Cacheability class of a turn (see llm_cache.LLM_CACHE_RULES)."""
+    if is_initial:
+        return "initial"
+    return "reply" if is_user_message else "continuation"
+
+
+def completion_text(completion):
+    """Extract the response text from a completion, whatever its format."""
+    # Check if completion is None
+    if completion is None:
+        logger.error("Received None response from OpenRouter API")
+        raise InvalidCompletion("No response received from LLM API")
+
+    # First try the standard OpenAI format
+    try:
+        return completion.choices[0].message.content.strip()
+    except (AttributeError, IndexError) as e:
+        logger.warning(f"Failed to get response in standard format: {e}")
+    # Try alternative response formats
+    if hasattr(completion, 'text'):
+        return completion.text.strip()
+    if isinstance(completion, dict):
+        if 'choices' in completion and len(completion['choices']) > 0:
+            return completion['choices'][0].get('message', {}).get('content', '').strip()
+        return completion.get('text', '').strip()
+    logger.error("Unable to extract response text from completion")
+    raise InvalidCompletion("Invalid response format from LLM API")
+
+
+def initial_prompt(topic):
+    return f"""You are starting a group discussion about "{topic}". Give a simple introduction in 40-50 words that sets the context and invites others to share their views. Use plain text without any special characters or emojis."""
+
+
+def generate_text(messages):
+    """One completion from OpenRouter, bypassing the response cache."""
+    completion = client.chat.completions.create(
+        model=LLM1_MODEL,
+        messages=messages
+    )
+    # Log the raw response for debugging
+    logger.info(f"Received response from OpenRouter: {completion}")
+    return llm_stream.sanitize(completion_text(completion))
+
+
+def opener_messages(topic):
+    return [{"role": "user", "content": initial_prompt(topic)}]
+
+
+def stream_turn(turn_class, messages, format_name, speak=False):
+    """
+    Stream a reply token by token (?stream=ndjson|sse), serving cached
+    replies whole. With speak, each sentence's audio follows as soon as it
+    is synthesized.
+    """
+    cached = llm_cache.get(turn_class, LLM1_MODEL, messages, {})
+    if cached is not None:
+        events = llm_stream.turn_events([cached], LLM1_MODEL, cached=True)
+    else:
+        stream = client.chat.completions.create(
+            model=LLM1_MODEL,
+            messages=messages,
+            stream=True
+        )
+        events = llm_stream.turn_events(
+            llm_stream.completion_deltas(stream), LLM1_MODEL,
+            on_complete=lambda reply: llm_cache.put(turn_class, LLM1_MODEL, messages, {}, reply),
+            close=getattr(stream, "close", None)
+        )
+    if speak:
+        events = speech_pipeline.speak_events(events, synthesize)
+    return streaming.stream_response(
+        (streaming.encode_event(format_name, event) for event in events), format_name
+    )
+
+
+def _gtts_audio(text):
+    tts = gTTS(text=text, lang='en', tld='com.au')
+    audio_stream = io.BytesIO()
+    tts.write_to_fp(audio_stream)
+    return audio_stream.getvalue()
+
+
+def speech_audio(text):
+    """
+    (cache key, audio) of text in LLM1's voice, synthesized only on a cache
+    miss; the offline engine stands in when gTTS is unreachable.
+    """
+    return offline_tts.speech_audio(text, "gtts", "com.au", _gtts_audio, offline_voice="llm1")
+
+
+def synthesize(text):
+    """Audio bytes of text in LLM1's voice (MP3 unless gTTS was unavailable)."""
+    return speech_audio(text)[1]
+
 @llm_bp.route('/api/llm1/llm', methods=['POST'])
-def get_llm_response():
+@llm_bp.route('/api/llm1/speak', methods=['POST'], defaults={"speak": True})
+def get_llm_response(speak=False):
     try:
         data = request.get_json()
         if not data or not data.get("text"):
@@ -56,7 +165,7 @@ def get_llm_response():
         is_user_message = data.get("is_user_message", False)
 
         if is_initial:
-            prompt = f"""You are starting a group discussion about "{topic}". Give a simple introduction in 40-50 words that sets the context and invites others to share their views. Use plain text without any special characters or emojis."""
+            prompt = initial_prompt(topic)
         elif is_user_message:
             prompt = f"""You are in a group discussion about "{topic}". A participant just said: "{text}". Respond directly to their point in 40-50 words. Use plain text without any special characters or emojis. Keep your response simple and conversational."""
         else:
@@ -64,42 +173,24 @@ def get_llm_response():
 
         # Log the request we're about to make
         logger.info(f"Sending request to OpenRouter with prompt: {prompt}")
-        
+
+        messages = [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+        format_name = streaming.stream_format()
         try:
-            completion = client.chat.completions.create(
-                model="google/gemma-3-4b-it:free",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            # Check if completion is None
-            if completion is None:
-                logger.error("Received None response from OpenRouter API")
-                return jsonify({"success": False, "error": "No response received from LLM API"}), 500
-                
-            # Log the raw response for debugging
-            logger.info(f"Received response from OpenRouter: {completion}")
-            
-            # First try the standard OpenAI format
-            try:
-                response_text = completion.choices[0].message.content.strip()
-            except (AttributeError, IndexError) as e:
-                logger.warning(f"Failed to get response in standard format: {e}")
-                # Try alternative response formats
-                if hasattr(completion, 'text'):
-                    response_text = completion.text.strip()
-                elif isinstance(completion, dict):
-                    if 'choices' in completion and len(completion['choices']) > 0:
-                        response_text = completion['choices'][0].get('message', {}).get('content', '').strip()
-                    else:
-                        response_text = completion.get('text', '').strip()
-                else:
-                    logger.error("Unable to extract response text from completion")
-                    return jsonify({"success": False, "error": "Invalid response format from LLM API"}), 500
+            if format_name or speak:
+                # /speak always streams: text and audio for each sentence
+                return stream_turn(prompt_class(is_initial, is_user_message), messages,
+                                   format_name or "ndjson", speak)
+            response_text, cached = llm_cache.complete(prompt_class(is_initial, is_user_message),
+                                                       LLM1_MODEL, messages, {}, lambda: generate_text(messages))
+        except InvalidCompletion as e:
+            return jsonify({"success": False, "error": str(e)}), 500
         except Exception as api_error:
             logger.error(f"Error calling OpenRouter API: {str(api_error)}", exc_info=True)
             return jsonify({"success": False, "error": f"API call failed: {str(api_error)}"}), 500
@@ -116,28 +207,29 @@ def get_llm_response():
         return jsonify({
             "success": True,
             "response": response_text,
-            "model_used": "google/gemma-3-4b-it:free"
+            "model_used": LLM1_MODEL,
+            "cached": cached
         })
 
     except Exception as e:
         logger.error(f"Error in get_llm_response: {str(e)}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
-@llm_bp.route('/api/llm1/tts', methods=['POST'])
+@llm_bp.route('/api/llm1/tts', methods=['GET', 'POST'])
 def text_to_speech():
+    """
+    Speak text in LLM1's voice. GET ?text= responses support If-None-Match
+    and Range, so an audio element can cache and seek them.
+    """
     try:
-        data = request.get_json()
+        data = request.args if request.method == 'GET' else request.get_json()
         if not data or not data.get("text"):
             return jsonify({"success": False, "error": "No text provided"}), 400
 
         text = data.get("text")
-        tts = gTTS(text=text, lang='en', tld='com.au')
-        
-        audio_stream = io.BytesIO()
-        tts.write_to_fp(audio_stream)
-        audio_stream.seek(0)
+        key, audio = speech_audio(text)
         
-        return send_file(audio_stream, mimetype="audio/mp3")
+        return audio_response(key, audio)
     
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -147,44 +239,23 @@ def text_to_speech():
 def alt_text_to_speech():
     """Alternative TTS using pyttsx3 with a sweet female voice."""
     try:
-        import pyttsx3
-        import tempfile
-        import os
-        
         data = request.get_json()
         text = data.get("text")
 
         if not text:
             return jsonify({"success": False, "error": "No text provided"}), 400
 
-        # Initialize the pyttsx3 engine
-        engine = pyttsx3.init()
-        
-        # Get available voices
-        voices = engine.getProperty('voices')
-        
-        # Select a female voice (index may vary by system)
-        # Usually the second voice (index 1) is female on most systems
-        engine.setProperty('voice', voices[1].id)
-        
-        # Set a higher pitch for a sweeter sound
-        engine.setProperty('rate', 150)  # Speed
-        engine.setProperty('volume', 0.9)  # Volume
-        
-        # Create a temporary file
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        temp_filename = temp_file.name
-        temp_file.close()
-        
-        # Save to the temporary file
-        engine.save_to_file(text, temp_filename)
-        engine.runAndWait()
-        
-        # Return the file
-        return send_file(temp_filename, mimetype="audio/mp3")
+        # Rendered by a long-lived engine in the offline worker pool (see
+        # offline_tts.OFFLINE_VOICES["alt"] for the voice, rate and volume)
+        key, audio = tts_cache.fetch("pyttsx3", "alt", text,
+                                     lambda normalized: offline_tts.offline_tts.synthesize(normalized, "alt"))
+        return audio_response(key, audio)
         
+    except offline_tts.OfflineTTSBusy as e:
+        logger.warning(f"Offline TTS busy: {e}")
+        return jsonify({"success": False, "error": str(e)}), 503
     except Exception as e:
-        print(f"Error in pyttsx3 conversion: {e}")
+        logger.error(f"Error in pyttsx3 conversion: {e}")
         return jsonify({"success": False, "error": f"Alternative TTS failed: {str(e)}"}), 500
 
 @llm_bp.route('/api/llm1/test', methods=['GET'])
@@ -193,7 +264,7 @@ def test_api_connection():
     try:
         # Simple test request
         completion = client.chat.completions.create(
-            model="google/gemma-3-4b-it:free",
+            model=LLM1_MODEL,
             messages=[
                 {
                     "role": "user",
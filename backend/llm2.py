@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify
 from flask_cors import CORS
 import io
 from gtts import gTTS
@@ -8,6 +8,12 @@ import json
 from openai import OpenAI
 import logging
 import time
+from llm_cache import llm_cache
+import llm_stream
+import speech_pipeline
+import streaming
+from tts_cache import audio_response
+import offline_tts
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +44,10 @@ except Exception as e:
     logger.error(f"Failed to configure OpenRouter API: {e}")
     raise
 
+LLM2_MODEL = "meta-llama/llama-3.2-3b-instruct:free"
+SYSTEM_PROMPT = "You are a participant in a group discussion. Provide brief, natural responses that build on the conversation without repeating previous points."
+SAMPLING_PARAMS = {"temperature": 0.7, "max_tokens": 100}
+
 # Global variables to track conversation state
 is_user_speaking = False
 last_message = None
@@ -46,8 +56,163 @@ is_ai_speaking = False
 conversation_started = False
 current_speaker = None  # Track which LLM is currently speaking
 
+def start_conversation():
+    """Mark LLM2 as the speaker opening the discussion."""
+    global is_ai_speaking, conversation_started, current_speaker
+    conversation_started = True
+    is_ai_speaking = True
+    current_speaker = "llm2"
+
+
+def initial_prompt(topic):
+    return f"""
+            You are starting a group discussion about "{topic}". Begin the discussion with a brief introduction 
+            (maximum 40 words) that sets the context and invites others to share their perspectives. Be engaging 
+            and natural, like a real discussion moderator.
+            
+            Topic: {topic}
+            """
+
+
+def opener_messages(topic):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": initial_prompt(topic)},
+    ]
+
+
+def generate_text(messages):
+    """One completion from OpenRouter, bypassing the response cache."""
+    completion = client.chat.completions.create(
+        model=LLM2_MODEL,
+        messages=messages,
+        **SAMPLING_PARAMS
+    )
+    if not completion or not getattr(completion, 'choices', None):
+        raise ValueError("Invalid response from LLM API: missing choices")
+    return llm_stream.sanitize(completion.choices[0].message.content)
+
+
+def _gtts_audio(text):
+    # Add some light formatting to make the speech more expressive
+    formatted_text = text.replace("!", "! ").replace("?", "? ")
+    
+    # Using British English for a deeper male voice
+    tts = gTTS(
+        text=formatted_text, 
+        lang='en',
+        tld='co.uk',  # British English - deeper male voice
+        slow=False     # Normal speed
+    )
+    
+    # Save the audio to a byte stream
+    audio_stream = io.BytesIO()
+    tts.write_to_fp(audio_stream)
+    return audio_stream.getvalue()
+
+
+def speech_audio(text):
+    """
+    (cache key, audio) of text in LLM2's voice, synthesized only on a cache
+    miss; the offline engine stands in when gTTS is unreachable.
+    """
+    return offline_tts.speech_audio(text, "gtts", "co.uk", _gtts_audio, offline_voice="llm2")
+
+
+def synthesize(text):
+    """Audio bytes of text in LLM2's voice (MP3 unless gTTS was unavailable)."""
+    return speech_audio(text)[1]
+
+
+def _forward_to_llm1(llm_reply, topic, conversation_history):
+    """Send LLM2's reply on to LLM1."""
+    try:
+        response = requests.post(
+            'http://localhost:5000/api/llm1/llm',
+            json={
+                "text": llm_reply,
+                "topic": topic,
+                "is_user_message": False,
+                "is_initial_message": False,
+                "from_llm2": True,
+                "conversation_history": conversation_history + [{"role": "assistant", "content": llm_reply}]
+            }
+        )
+        logger.info(f"LLM1 response status: {response.status_code}")
+    except Exception as e:
+        logger.error(f"Error sending response to LLM1: {e}")
+
+
+def _reply(llm_reply, topic, conversation_history, cached=False):
+    """Cap the reply's length, pass it on to LLM1 and build the response."""
+    # Ensure the response is not too long
+    words = llm_reply.split()
+    if len(words) > 55:
+        llm_reply = ' '.join(words[:50]) + '...'
+    
+    logger.info(f"Generated response: {llm_reply[:50]}...")
+    
+    # Send response back to LLM1
+    _forward_to_llm1(llm_reply, topic, conversation_history)
+    
+    # Return the response
+    return jsonify({
+        "success": True, 
+        "response": llm_reply,
+        "model_used": "llama-3.2-3b",
+        "cached": cached
+    })
+
+
+def _create_stream(messages, max_retries=3):
+    """Open a streamed completion, retrying like the buffered endpoint."""
+    for attempt in range(1, max_retries + 1):
+        try:
+            return client.chat.completions.create(
+                model=LLM2_MODEL,
+                messages=messages,
+                stream=True,
+                **SAMPLING_PARAMS
+            )
+        except Exception as e:
+            logger.warning(f"Attempt {attempt} failed: {str(e)}")
+            if attempt == max_retries:
+                raise
+            time.sleep(1)  # Wait before retrying
+
+
+def _stream_turn(turn_class, messages, topic, conversation_history, format_name, speak=False):
+    """
+    Stream a reply token by token (?stream=ndjson|sse), serving cached
+    replies whole. With speak, each sentence's audio follows as soon as it
+    is synthesized.
+    """
+    cached_reply = llm_cache.get(turn_class, LLM2_MODEL, messages, SAMPLING_PARAMS)
+    if cached_reply is not None:
+        events = llm_stream.turn_events(
+            [cached_reply], "llama-3.2-3b", cached=True,
+            on_complete=lambda reply: _forward_to_llm1(reply, topic, conversation_history)
+        )
+    else:
+        stream = _create_stream(messages)
+
+        def on_complete(reply):
+            llm_cache.put(turn_class, LLM2_MODEL, messages, SAMPLING_PARAMS, reply)
+            _forward_to_llm1(reply, topic, conversation_history)
+
+        events = llm_stream.turn_events(
+            llm_stream.completion_deltas(stream), "llama-3.2-3b",
+            on_complete=on_complete, close=getattr(stream, "close", None)
+        )
+    if speak:
+        events = speech_pipeline.speak_events(events, synthesize)
+    return streaming.stream_response(
+        (streaming.encode_event(format_name, event) for event in events), format_name
+    )
+
 @llm_bp.route('/api/llm2/llm', methods=['POST'])
-def get_llm_response():
+@llm_bp.route('/api/llm2/speak', methods=['POST'], defaults={"speak": True})
+def get_llm_response(speak=False):
     global is_user_speaking, last_message, last_topic, is_ai_speaking, conversation_started, current_speaker
     try:
         data = request.get_json()
@@ -78,19 +243,13 @@ def get_llm_response():
 
         # Create appropriate prompt based on context
         if is_initial_message and not conversation_started:
-            conversation_started = True
-            is_ai_speaking = True
-            current_speaker = "llm2"
-            prompt = f"""
-            You are starting a group discussion about "{topic}". Begin the discussion with a brief introduction 
-            (maximum 40 words) that sets the context and invites others to share their perspectives. Be engaging 
-            and natural, like a real discussion moderator.
-            
-            Topic: {topic}
-            """
+            start_conversation()
+            prompt_class = "initial"
+            prompt = initial_prompt(topic)
         elif from_llm1:
             is_ai_speaking = True
             current_speaker = "llm2"
+            prompt_class = "continuation"
             # Create a context-aware prompt using conversation history
             history_context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_history[-3:]])
             prompt = f"""
@@ -108,6 +267,7 @@ def get_llm_response():
             is_user_speaking = False
             is_ai_speaking = True
             current_speaker = "llm2"
+            prompt_class = "reply"
             # Create a context-aware prompt using conversation history
             history_context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_history[-3:]])
             prompt = f"""
@@ -126,6 +286,7 @@ def get_llm_response():
             # This could be a continuation of the conversation
             is_ai_speaking = True
             current_speaker = "llm2"
+            prompt_class = "continuation"
             history_context = "\n".join([f"{msg['role']}: {msg['content']}" for msg in conversation_history[-3:]])
             prompt = f"""
             You are a participant in a group discussion about "{topic}". Continue the discussion in a 
@@ -139,6 +300,31 @@ def get_llm_response():
             Continue the discussion about: {text}
             """
 
+        messages = [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            *[{"role": msg["role"], "content": msg["content"]} for msg in conversation_history[-5:]],
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+        # ?stream=ndjson|sse sends tokens as they arrive
+        format_name = streaming.stream_format()
+        if format_name or speak:
+            # /speak always streams: text and audio for each sentence
+            return _stream_turn(prompt_class, messages, topic, conversation_history,
+                                format_name or "ndjson", speak)
+
+        # Repeated turns (e.g. the topic introduction) skip the upstream call
+        cached_reply = llm_cache.get(prompt_class, LLM2_MODEL, messages, SAMPLING_PARAMS)
+        if cached_reply is not None:
+            logger.info(f"Serving cached response: {cached_reply[:50]}...")
+            return _reply(cached_reply, topic, conversation_history, cached=True)
+
         try:
             # Add retry logic for API calls
             max_retries = 3
@@ -148,20 +334,9 @@ def get_llm_response():
             while retry_count < max_retries:
                 try:
                     completion = client.chat.completions.create(
-                        model="meta-llama/llama-3.2-3b-instruct:free",
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": "You are a participant in a group discussion. Provide brief, natural responses that build on the conversation without repeating previous points."
-                            },
-                            *[{"role": msg["role"], "content": msg["content"]} for msg in conversation_history[-5:]],
-                            {
-                                "role": "user",
-                                "content": prompt
-                            }
-                        ],
-                        temperature=0.7,
-                        max_tokens=100
+                        model=LLM2_MODEL,
+                        messages=messages,
+                        **SAMPLING_PARAMS
                     )
                     
                     # Check if completion and completion.choices exist and have content
@@ -177,38 +352,9 @@ def get_llm_response():
                         logger.error("Invalid completion response: missing content")
                         return jsonify({"success": False, "error": "Invalid response from LLM API: missing content"}), 500
                     
-                    llm_reply = completion.choices[0].message.content.strip()
-                    
-                    # Ensure the response is not too long
-                    words = llm_reply.split()
-                    if len(words) > 55:
-                        llm_reply = ' '.join(words[:50]) + '...'
-                    
-                    logger.info(f"Generated response: {llm_reply[:50]}...")
-                    
-                    # Send response back to LLM1
-                    try:
-                        response = requests.post(
-                            'http://localhost:5000/api/llm1/llm',
-                            json={
-                                "text": llm_reply,
-                                "topic": topic,
-                                "is_user_message": False,
-                                "is_initial_message": False,
-                                "from_llm2": True,
-                                "conversation_history": conversation_history + [{"role": "assistant", "content": llm_reply}]
-                            }
-                        )
-                        logger.info(f"LLM1 response status: {response.status_code}")
-                    except Exception as e:
-                        logger.error(f"Error sending response to LLM1: {e}")
-                    
-                    # Return the response
-                    return jsonify({
-                        "success": True, 
-                        "response": llm_reply,
-                        "model_used": "llama-3.2-3b"
-                    })
+                    llm_reply = llm_stream.sanitize(completion.choices[0].message.content)
+                    llm_cache.put(prompt_class, LLM2_MODEL, messages, SAMPLING_PARAMS, llm_reply)
+                    return _reply(llm_reply, topic, conversation_history)
                     
                 except Exception as e:
                     last_error = e
@@ -250,36 +396,25 @@ def user_finished_speaking():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@llm_bp.route('/api/llm2/tts', methods=['POST'])
+@llm_bp.route('/api/llm2/tts', methods=['GET', 'POST'])
 def text_to_speech():
-    """Converts text to speech using gTTS with a deep male voice."""
+    """
+    Converts text to speech using gTTS with a deep male voice. GET ?text=
+    responses support If-None-Match and Range.
+    """
     try:
-        data = request.get_json()
+        data = request.args if request.method == 'GET' else request.get_json()
         text = data.get("text")
 
         if not text:
             return jsonify({"success": False, "error": "No text provided"}), 400
 
-        # Add some light formatting to make the speech more expressive
-        formatted_text = text.replace("!", "! ").replace("?", "? ")
-        
-        # Using British English for a deeper male voice
-        tts = gTTS(
-            text=formatted_text, 
-            lang='en',
-            tld='co.uk',  # British English - deeper male voice
-            slow=False     # Normal speed
-        )
-        
-        # Save the audio to a byte stream
-        audio_stream = io.BytesIO()
-        tts.write_to_fp(audio_stream)
-        audio_stream.seek(0)
+        key, audio = speech_audio(text)
         
         # Log success
         logger.info(f"Successfully generated speech for text: {text[:30]}...")
         
-        return send_file(audio_stream, mimetype="audio/mp3")
+        return audio_response(key, audio)
     
     except Exception as e:
         logger.error(f"Error in gTTS conversion: {e}")
@@ -0,0 +1,180 @@
+from flask import Blueprint, jsonify
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import logging
+from dotenv import load_dotenv
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Blueprint exposing LLM response cache counters
+llm_cache_bp = Blueprint('llm_cache', __name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+# Number of keys kept in memory; least recently used keys are evicted first
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "512"))
+
+# Cacheability per prompt class: how long a response stays valid and how many
+# different responses are collected per key before the cache starts serving
+# them (at random). A TTL of 0 makes the class uncacheable.
+#   initial:      topic introduction, identical for every user of a topic
+#   continuation: a reply built only from the previous turn's text
+#   reply:        a reply to the user's own words, rarely repeated verbatim
+LLM_CACHE_RULES = {
+    "initial": {
+        "ttl": int(os.getenv("LLM_CACHE_INITIAL_TTL", str(24 * 3600))),
+        "variants": int(os.getenv("LLM_CACHE_INITIAL_VARIANTS", "3")),
+    },
+    "continuation": {
+        "ttl": int(os.getenv("LLM_CACHE_CONTINUATION_TTL", "3600")),
+        "variants": int(os.getenv("LLM_CACHE_CONTINUATION_VARIANTS", "2")),
+    },
+    "reply": {
+        "ttl": int(os.getenv("LLM_CACHE_REPLY_TTL", "0")),
+        "variants": int(os.getenv("LLM_CACHE_REPLY_VARIANTS", "1")),
+    },
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text):
+    """Collapse whitespace (and the indentation of triple-quoted prompts)."""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+class LLMResponseCache:
+    """
+    Completions keyed by (model, normalized messages, sampling params). Each
+    key holds a pool of up to `variants` distinct responses; until `variants`
+    responses have been generated for it a lookup misses so the caller asks
+    upstream for another one. A repeated response counts as a fill without
+    being stored twice, so a model that always answers the same still gets
+    served from the cache.
+    """
+
+    def __init__(self, size=LLM_CACHE_SIZE, rules=None, enabled=LLM_CACHE_ENABLED):
+        self.size = size
+        self.rules = rules if rules is not None else LLM_CACHE_RULES
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> {"responses": [...], "fills": int, "expires_at": float}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "fills": 0, "expired": 0, "evicted": 0, "uncacheable": 0}
+
+    def _inc(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def rule(self, prompt_class):
+        rule = self.rules.get(prompt_class)
+        if not self.enabled or not rule or rule["ttl"] <= 0:
+            return None
+        return rule
+
+    @staticmethod
+    def key(model, messages, params=None):
+        payload = {
+            "model": model,
+            "messages": [
+                {"role": message["role"], "content": normalize_prompt(message["content"])}
+                for message in messages
+            ],
+            "params": params or {},
+        }
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, prompt_class, model, messages, params=None):
+        """A cached response for the request, or None on a miss."""
+        rule = self.rule(prompt_class)
+        if rule is None:
+            self._inc("uncacheable")
+            return None
+        key = self.key(model, messages, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] <= time.monotonic():
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None or entry["fills"] < rule["variants"]:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return random.choice(entry["responses"])
+
+    def put(self, prompt_class, model, messages, params, response):
+        rule = self.rule(prompt_class)
+        if rule is None or not response:
+            return
+        key = self.key(model, messages, params)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires_at"] <= now:
+                # The pool's TTL starts with its first response
+                entry = {"responses": [], "fills": 0, "expires_at": now + rule["ttl"]}
+                self._entries[key] = entry
+            if entry["fills"] < rule["variants"]:
+                entry["fills"] += 1
+                self._stats["fills"] += 1
+                if response not in entry["responses"]:
+                    entry["responses"].append(response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self._stats["evicted"] += 1
+
+    def complete(self, prompt_class, model, messages, params, generate):
+        """
+        Serve a cached response or call generate() and cache its result.
+
+        Returns:
+            Tuple[str, bool]: The response text and whether it came from the cache
+        """
+        cached = self.get(prompt_class, model, messages, params)
+        if cached is not None:
+            return cached, True
+        response = generate()
+        self.put(prompt_class, model, messages, params, response)
+        return response, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._entries)
+            responses = sum(len(entry["responses"]) for entry in self._entries.values())
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "keys": size,
+            "responses": responses,
+            "capacity": self.size,
+            "rules": self.rules,
+            **stats,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else None,
+        }
+
+
+# Process-wide cache shared by the llm1 and llm2 participants
+llm_cache = LLMResponseCache()
+
+
+@llm_cache_bp.route('/api/llm/cache/stats', methods=['GET'])
+def llm_cache_stats():
+    return jsonify(llm_cache.stats()), 200
@@ -0,0 +1,175 @@
+import re
+import unicodedata
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Same cap as the buffered endpoints: a reply over MAX_WORDS is cut to KEEP_WORDS + '...'
+KEEP_WORDS = 50
+MAX_WORDS = 55
+
+_WORD = re.compile(r"\S+")
+
+# Markdown markup and other symbols the voice would read out or stumble on
+_MARKUP = set("*_#`~|^\\<>[]{}")
+# Emoji, pictographs and the joiners / variation selectors that combine them
+_SYMBOL_CATEGORIES = ("So", "Sk", "Cs", "Co", "Cn")
+_EMOJI_JOINERS = {"\u200d", "\ufe0e", "\ufe0f"}
+
+
+def _dropped(char):
+    return char in _MARKUP or char in _EMOJI_JOINERS or unicodedata.category(char) in _SYMBOL_CATEGORIES
+
+
+class Sanitizer:
+    """
+    Strips markdown markup, emoji and special characters from text arriving
+    in pieces, and collapses whitespace runs to one space. It works a
+    character at a time and only emits a space once the next kept character
+    arrives, so where the pieces are cut never changes the result.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.space = False
+
+    def feed(self, delta):
+        """Add a piece of the reply. Returns its sanitized text."""
+        kept = []
+        for char in delta:
+            if char.isspace():
+                self.space = self.started
+            elif not _dropped(char):
+                if self.space:
+                    kept.append(" ")
+                    self.space = False
+                kept.append(char)
+                self.started = True
+        return "".join(kept)
+
+
+def sanitize(text):
+    """Plain text of a whole reply, identical to streaming it through a Sanitizer."""
+    return Sanitizer().feed(text or "")
+
+
+class WordCap:
+    """
+    Applies the participants' word cap to text arriving in pieces. Text is
+    released as soon as it can no longer be affected by the cap: up to
+    KEEP_WORDS words right away, the words after that only once the reply
+    turns out to stay within MAX_WORDS.
+    """
+
+    def __init__(self, keep=KEEP_WORDS, limit=MAX_WORDS):
+        self.keep = keep
+        self.limit = limit
+        self.text = ""
+        self.sent = 0
+        self.output = ""
+        self.truncated = False
+
+    def _release(self, end, suffix=""):
+        released = self.text[self.sent:end] + suffix
+        self.sent = max(self.sent, end)
+        self.output += released
+        return released
+
+    def feed(self, delta):
+        """Add a piece of the reply. Returns the text that is safe to emit now."""
+        if self.truncated:
+            return ""
+        self.text = (self.text + delta).lstrip()
+        words = list(_WORD.finditer(self.text))
+        # The last word may still be growing unless whitespace follows it
+        complete = len(words) if words and words[-1].end() < len(self.text) else max(len(words) - 1, 0)
+        if len(words) > self.limit:
+            self.truncated = True
+            return self._release(words[self.keep - 1].end(), "...")
+        if complete and complete <= self.keep:
+            return self._release(words[complete - 1].end())
+        if complete > self.keep:
+            return self._release(words[self.keep - 1].end())
+        return ""
+
+    def finish(self):
+        """The rest of the reply once the upstream stream has ended."""
+        if self.truncated:
+            return ""
+        return self._release(len(self.text.rstrip()))
+
+
+def completion_deltas(stream):
+    """The text pieces of a streamed chat completion."""
+    for chunk in stream:
+        choices = getattr(chunk, "choices", None)
+        if not choices:
+            continue
+        delta = getattr(choices[0], "delta", None)
+        content = getattr(delta, "content", None) if delta is not None else None
+        if content:
+            yield content
+
+
+def turn_events(deltas, model_used, cached=False, on_complete=None, close=None):
+    """
+    Events for one streamed participant turn: a "token" event per released
+    piece of sanitized text, then "done" with the full capped reply (or "error").
+
+    Args:
+        deltas (Iterable[str]): Text pieces from upstream (or a cached reply)
+        model_used (str): Reported in the "done" event
+        cached (bool): Whether the reply came from the response cache
+        on_complete (Optional[Callable[[str], None]]): Called with the reply
+            once "done" has been handed out, even if the client stops reading
+            there (caching, forwarding to the other LLM)
+        close (Optional[Callable[[], None]]): Closes the upstream stream, so a
+            capped reply stops generating
+    """
+    sanitizer = Sanitizer()
+    cap = WordCap()
+    try:
+        for delta in deltas:
+            released = cap.feed(sanitizer.feed(delta))
+            if released:
+                yield {"type": "token", "text": released}
+            if cap.truncated:
+                break
+        released = cap.finish()
+        if released:
+            yield {"type": "token", "text": released}
+    except Exception as e:
+        logger.error(f"Error streaming LLM response: {e}", exc_info=True)
+        yield {"type": "error", "success": False, "error": f"API call failed: {str(e)}"}
+        return
+    finally:
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                logger.warning(f"Error closing LLM stream: {e}")
+
+    if not cap.output:
+        logger.error("Empty response text from LLM API")
+        yield {"type": "error", "success": False, "error": "Empty response from LLM API"}
+        return
+
+    logger.info(f"Streamed response text: {cap.output}")
+    try:
+        yield {
+            "type": "done",
+            "success": True,
+            "response": cap.output,
+            "model_used": model_used,
+            "truncated": cap.truncated,
+            "cached": cached,
+        }
+    finally:
+        # Also runs when the generator is closed right after "done"
+        if on_complete is not None:
+            try:
+                on_complete(cap.output)
+            except Exception as e:
+                logger.error(f"Error completing streamed turn: {e}")
@@ -0,0 +1,191 @@
+"""
+Migrate monolithic user_speech documents to the per-session schema.
+
+Each legacy document (one per user, holding speech_entries, screenshots and
+gd_evaluation arrays) becomes one gd_sessions document plus one document per
+entry in speech_entries / screenshots. Legacy speaking-time documents keyed by
+(user_id, session_id) are folded into their gd_sessions document.
+
+The migration is batched and resumable: progress is checkpointed in the
+`migrations` collection after every batch and all writes are idempotent
+upserts, so an interrupted run can simply be started again.
+
+Usage:
+    python migrate_sessions.py [--batch-size 100] [--dry-run] [--restart]
+"""
+import argparse
+from datetime import datetime
+from pymongo import UpdateOne
+from database import get_collection
+from blob_store import get_blob_store, decode_data_url
+from indexes import ensure_indexes
+import session_store
+
+MIGRATION_ID = "user_speech_to_sessions"
+
+
+def legacy_session_id(doc):
+    return f"legacy-{doc['_id']}"
+
+
+def _screenshot_entry(doc, index, screenshot):
+    """Convert a legacy screenshot entry, moving inline image data to the blob store."""
+    entry = {k: v for k, v in screenshot.items() if k != "image_data"}
+    if not entry.get("blob_id") and screenshot.get("image_data"):
+        image_bytes, content_type = decode_data_url(screenshot["image_data"])
+        entry.update(get_blob_store().put(image_bytes, content_type))
+    entry.setdefault("screenshot_id", f"{doc['_id']}-{index}")
+    return entry
+
+
+def migrate_document(doc, dry_run=False):
+    """Migrate one legacy user_speech document. Returns (speech, screenshots) counts."""
+    user_id = doc["user_id"]
+
+    # Speaking-time documents already carry their own session id
+    if "session_id" in doc and "speech_entries" not in doc and "screenshots" not in doc:
+        session_id = str(doc["session_id"])
+        speaking_time = {
+            key: doc[key]
+            for key in ("timestamp", "speaking_duration", "total_duration", "percentage")
+            if key in doc
+        }
+        if not dry_run:
+            get_collection(session_store.SESSIONS).update_one(
+                {"user_id": user_id, "session_id": session_id},
+                {
+                    "$set": {"speaking_time": speaking_time},
+                    "$setOnInsert": {
+                        "topic": "",
+                        "started_at": doc.get("timestamp", datetime.utcnow()),
+                        "updated_at": doc.get("timestamp", datetime.utcnow()),
+                    },
+                },
+                upsert=True,
+            )
+        return 0, 0
+
+    session_id = legacy_session_id(doc)
+    speech_entries = [e for e in doc.get("speech_entries", []) if isinstance(e, dict)]
+    screenshots = [s for s in doc.get("screenshots", []) if isinstance(s, dict)]
+
+    timestamps = [e["timestamp"] for e in speech_entries + screenshots if e.get("timestamp")]
+    started_at = min(timestamps) if timestamps else datetime.utcnow()
+    updated_at = max(timestamps) if timestamps else started_at
+
+    if dry_run:
+        return len(speech_entries), len(screenshots)
+
+    # Deterministic _ids make re-running a partially migrated document a no-op
+    speech_ops = [
+        UpdateOne(
+            {"_id": f"{doc['_id']}-speech-{i}"},
+            {"$setOnInsert": {
+                "user_id": user_id,
+                "session_id": session_id,
+                "timestamp": entry.get("timestamp", started_at),
+                "text": entry.get("text", ""),
+            }},
+            upsert=True,
+        )
+        for i, entry in enumerate(speech_entries)
+    ]
+    if speech_ops:
+        get_collection(session_store.SPEECH_ENTRIES, "ingest").bulk_write(speech_ops, ordered=False)
+
+    screenshot_ops = [
+        UpdateOne(
+            {"_id": f"{doc['_id']}-screenshot-{i}"},
+            {"$setOnInsert": {
+                "user_id": user_id,
+                "session_id": session_id,
+                "timestamp": screenshot.get("timestamp", started_at),
+                **_screenshot_entry(doc, i, screenshot),
+            }},
+            upsert=True,
+        )
+        for i, screenshot in enumerate(screenshots)
+    ]
+    if screenshot_ops:
+        get_collection(session_store.SCREENSHOTS, "ingest").bulk_write(screenshot_ops, ordered=False)
+
+    session_fields = {
+        "topic": doc.get("topic", ""),
+        "speech_count": len(speech_entries),
+        "screenshot_count": len(screenshots),
+        "started_at": started_at,
+        "updated_at": updated_at,
+        "migrated_from": doc["_id"],
+    }
+    if "gd_evaluation" in doc:
+        session_fields["gd_evaluation"] = doc["gd_evaluation"]
+    get_collection(session_store.SESSIONS, "critical").update_one(
+        {"user_id": user_id, "session_id": session_id},
+        {"$set": session_fields},
+        upsert=True,
+    )
+    return len(speech_entries), len(screenshots)
+
+
+def run_migration(batch_size=100, dry_run=False, restart=False):
+    legacy = get_collection("user_speech")
+    migrations = get_collection("migrations", "critical")
+
+    if restart and not dry_run:
+        migrations.delete_one({"_id": MIGRATION_ID})
+    state = migrations.find_one({"_id": MIGRATION_ID}) or {}
+    if state.get("done") and not dry_run:
+        print("Migration already completed. Use --restart to run it again.")
+        return state
+
+    last_id = state.get("last_id")
+    totals = {
+        "documents": state.get("documents", 0),
+        "speech_entries": state.get("speech_entries", 0),
+        "screenshots": state.get("screenshots", 0),
+    }
+
+    if not dry_run:
+        ensure_indexes()
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        # Read one batch of legacy documents at a time
+        batch = list(legacy.find(query).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        for doc in batch:
+            speech_count, screenshot_count = migrate_document(doc, dry_run)
+            totals["documents"] += 1
+            totals["speech_entries"] += speech_count
+            totals["screenshots"] += screenshot_count
+
+        last_id = batch[-1]["_id"]
+        if not dry_run:
+            migrations.update_one(
+                {"_id": MIGRATION_ID},
+                {"$set": {"last_id": last_id, "updated_at": datetime.utcnow(), **totals}},
+                upsert=True,
+            )
+        print(f"Migrated {totals['documents']} documents "
+              f"({totals['speech_entries']} speech entries, {totals['screenshots']} screenshots)")
+
+    if not dry_run:
+        migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"done": True, "finished_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate user_speech documents to per-session collections")
+    parser.add_argument("--batch-size", type=int, default=100, help="Legacy documents per batch")
+    parser.add_argument("--dry-run", action="store_true", help="Count what would be migrated without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint and start over")
+    args = parser.parse_args()
+
+    result = run_migration(args.batch_size, args.dry_run, args.restart)
+    print(f"Migration finished: {result}")
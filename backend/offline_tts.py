@@ -0,0 +1,413 @@
+from flask import Blueprint, jsonify
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import atexit
+import multiprocessing
+import multiprocessing.util
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import logging
+from dotenv import load_dotenv
+from tts_cache import tts_cache, normalize_text
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Blueprint exposing offline TTS pool metrics
+offline_tts_bp = Blueprint('offline_tts', __name__)
+
+# Worker processes, each holding one long-lived pyttsx3 engine. This is also
+# the number of syntheses running at once.
+OFFLINE_TTS_WORKERS = int(os.getenv("OFFLINE_TTS_WORKERS", "2"))
+# Jobs queued or running across all requests; beyond this callers wait
+OFFLINE_TTS_MAX_PENDING = int(os.getenv("OFFLINE_TTS_MAX_PENDING", "16"))
+# How long a caller waits for a queue slot before getting a busy error
+OFFLINE_TTS_ACQUIRE_TIMEOUT = float(os.getenv("OFFLINE_TTS_ACQUIRE_TIMEOUT", "10"))
+# A synthesis running longer than this (queueing excluded) is treated as a hung
+# engine; that job fails and its worker process is replaced
+OFFLINE_TTS_JOB_TIMEOUT = float(os.getenv("OFFLINE_TTS_JOB_TIMEOUT", "30"))
+OFFLINE_TTS_START_METHOD = os.getenv("OFFLINE_TTS_START_METHOD", "spawn")
+# Each worker renders into its own directory under this root, removed on exit
+OFFLINE_TTS_TEMP_DIR = os.getenv(
+    "OFFLINE_TTS_TEMP_DIR", os.path.join(tempfile.gettempdir(), "gd-offline-tts")
+)
+# Worker directories older than this are leftovers of crashed workers
+OFFLINE_TTS_STALE_SECONDS = int(os.getenv("OFFLINE_TTS_STALE_SECONDS", "3600"))
+# Speak with the offline engine when gTTS (network) fails
+OFFLINE_TTS_FALLBACK = os.getenv("OFFLINE_TTS_FALLBACK", "true").lower() == "true"
+# After a gTTS failure, go straight to the offline engine for this long
+OFFLINE_TTS_RETRY_ONLINE_SECONDS = int(os.getenv("OFFLINE_TTS_RETRY_ONLINE_SECONDS", "60"))
+# Start the worker processes when the app starts instead of on first use
+OFFLINE_TTS_WARMUP = os.getenv("OFFLINE_TTS_WARMUP", "false").lower() == "true"
+
+# Voice profiles. Installed voices differ per system, so a profile names
+# substrings to look for in a voice's id, name or languages (first match
+# wins) and falls back to the voice at voice_index.
+OFFLINE_VOICES = {
+    # /api/tts/alt: usually a female voice at index 1
+    "alt": {"match": (), "voice_index": 1, "rate": 150, "volume": 0.9},
+    # Stand-ins for the gTTS voices of the two participants
+    "llm1": {"match": ("en-au", "australia", "karen"), "voice_index": 1, "rate": 160, "volume": 1.0},
+    "llm2": {"match": ("en-gb", "british", "daniel", "george"), "voice_index": 0, "rate": 150, "volume": 1.0},
+}
+
+
+class OfflineTTSBusy(RuntimeError):
+    """No queue slot became free within OFFLINE_TTS_ACQUIRE_TIMEOUT."""
+
+
+def _resolve_voice(voices, profile):
+    for term in profile["match"]:
+        for voice in voices:
+            described = f"{voice.id} {voice.name} {getattr(voice, 'languages', '')}".lower()
+            if term in described:
+                return voice.id
+    index = profile["voice_index"]
+    return voices[index].id if 0 <= index < len(voices) else None
+
+
+# Per-process engine, voice ids and scratch directory, set by the pool initializer
+_worker_engine = None
+_worker_voices = {}
+_worker_dir = None
+
+
+def _init_worker(temp_root):
+    global _worker_engine, _worker_voices, _worker_dir
+    import pyttsx3
+    _worker_engine = pyttsx3.init()
+    # Voices are enumerated once per worker, not per request
+    voices = _worker_engine.getProperty('voices') or []
+    _worker_voices = {name: _resolve_voice(voices, profile) for name, profile in OFFLINE_VOICES.items()}
+    os.makedirs(temp_root, exist_ok=True)
+    _worker_dir = tempfile.mkdtemp(prefix=f"worker-{os.getpid()}-", dir=temp_root)
+    # Worker processes leave through os._exit, which skips atexit but runs these finalizers
+    multiprocessing.util.Finalize(None, shutil.rmtree, args=(_worker_dir, True), exitpriority=10)
+
+
+def _synthesize_in_worker(text, voice):
+    profile = OFFLINE_VOICES[voice]
+    if _worker_voices.get(voice):
+        _worker_engine.setProperty('voice', _worker_voices[voice])
+    _worker_engine.setProperty('rate', profile["rate"])
+    _worker_engine.setProperty('volume', profile["volume"])
+    # pyttsx3 can only render to a file; it is read back and removed right away
+    path = os.path.join(_worker_dir, f"{uuid.uuid4().hex}.wav")
+    try:
+        _worker_engine.save_to_file(text, path)
+        _worker_engine.runAndWait()
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def sweep_temp_dir(temp_root=OFFLINE_TTS_TEMP_DIR, max_age=OFFLINE_TTS_STALE_SECONDS):
+    """Remove scratch directories left behind by workers that did not exit cleanly."""
+    if not os.path.isdir(temp_root):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age
+    for name in os.listdir(temp_root):
+        path = os.path.join(temp_root, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def _worker_main(conn, temp_root):
+    """Worker process: one engine, rendering the jobs received on conn until None arrives."""
+    try:
+        _init_worker(temp_root)
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready", os.getpid()))
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        try:
+            conn.send(("ok", _synthesize_in_worker(*job)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _WorkerProcess:
+    """One worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, temp_root, start_timeout):
+        self.temp_root = temp_root
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, temp_root),
+                                       name="offline-tts-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        status, value = self.receive(start_timeout)
+        if status != "ready":
+            self.kill()
+            raise RuntimeError(f"Offline TTS worker failed to start: {value}")
+
+    def receive(self, timeout):
+        """(status, value) of the worker's next message. Raises FutureTimeout, or EOFError if it died."""
+        if not self.conn.poll(timeout):
+            raise FutureTimeout(f"No reply from offline TTS worker {self.process.pid} within {timeout}s")
+        return self.conn.recv()
+
+    def run(self, text, voice, timeout):
+        self.conn.send((text, voice))
+        return self.receive(timeout)
+
+    def stop(self, timeout=5):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(5)
+        self.conn.close()
+        # A terminated worker skips its own cleanup, so remove its scratch directory here
+        prefix = f"worker-{self.process.pid}-"
+        if os.path.isdir(self.temp_root):
+            for name in os.listdir(self.temp_root):
+                if name.startswith(prefix):
+                    shutil.rmtree(os.path.join(self.temp_root, name), ignore_errors=True)
+
+
+class OfflineTTSEngine:
+    """
+    Pool of long-lived pyttsx3 worker processes. Audio comes back as bytes
+    (WAV, or AIFF on macOS); at most max_pending jobs are queued or running.
+    Each worker is driven by its own dispatcher thread, which times a job from
+    the moment the worker starts on it, so queueing never counts against
+    job_timeout, and replaces only that worker when it hangs or dies.
+    """
+
+    def __init__(self, workers=OFFLINE_TTS_WORKERS, max_pending=OFFLINE_TTS_MAX_PENDING,
+                 acquire_timeout=OFFLINE_TTS_ACQUIRE_TIMEOUT, job_timeout=OFFLINE_TTS_JOB_TIMEOUT,
+                 start_method=OFFLINE_TTS_START_METHOD, temp_root=OFFLINE_TTS_TEMP_DIR):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.acquire_timeout = acquire_timeout
+        self.job_timeout = job_timeout
+        self.start_method = start_method
+        self.temp_root = temp_root
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._dispatchers = []
+        self._alive = 0
+        self._stats = {"jobs": 0, "failures": 0, "timeouts": 0, "busy_rejections": 0,
+                       "worker_restarts": 0, "pending": 0, "synth_ms_total": 0.0, "synth_ms_max": 0.0}
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._dispatchers:
+                return
+            sweep_temp_dir(self.temp_root)
+            self._dispatchers = [
+                threading.Thread(target=self._dispatch, name=f"offline-tts-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._dispatchers:
+                thread.start()
+
+    def _inc(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _start_worker(self):
+        worker = _WorkerProcess(multiprocessing.get_context(self.start_method), self.temp_root, self.job_timeout)
+        self._inc_alive(1)
+        return worker
+
+    def _inc_alive(self, amount):
+        with self._lock:
+            self._alive += amount
+
+    def _dispatch(self):
+        """Feed queued jobs to one worker process, replacing it when it hangs or dies."""
+        worker = None
+        try:
+            worker = self._start_worker()
+        except Exception as e:
+            logger.error(f"Could not start an offline TTS worker: {e}")
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, text, voice = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if worker is None:
+                    worker = self._start_worker()
+            except Exception as e:
+                self._inc("failures")
+                future.set_exception(e)
+                continue
+            started = time.perf_counter()
+            try:
+                status, value = worker.run(text, voice, self.job_timeout)
+            except (FutureTimeout, EOFError, OSError) as e:
+                # A hung or crashed engine: only this worker is replaced
+                if isinstance(e, FutureTimeout):
+                    logger.error(f"Offline TTS job exceeded {self.job_timeout}s, restarting its worker")
+                    self._inc("timeouts")
+                else:
+                    logger.error(f"Offline TTS worker died, restarting it: {e!r}")
+                    self._inc("failures")
+                    e = RuntimeError(f"Offline TTS worker died: {e!r}")
+                worker.kill()
+                worker = None
+                self._inc_alive(-1)
+                self._inc("worker_restarts")
+                future.set_exception(e)
+                continue
+            if status != "ok":
+                self._inc("failures")
+                future.set_exception(RuntimeError(value))
+                continue
+            synth_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._stats["jobs"] += 1
+                self._stats["synth_ms_total"] += synth_ms
+                self._stats["synth_ms_max"] = max(self._stats["synth_ms_max"], synth_ms)
+            future.set_result(value)
+        if worker is not None:
+            worker.stop()
+            self._inc_alive(-1)
+
+    def _release(self, _future):
+        with self._lock:
+            self._stats["pending"] -= 1
+        self._slots.release()
+
+    def submit(self, text, voice="alt"):
+        """Queue a synthesis. Raises OfflineTTSBusy when the queue stays full."""
+        if voice not in OFFLINE_VOICES:
+            raise ValueError(f"Unknown offline voice: {voice}")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            self._inc("busy_rejections")
+            raise OfflineTTSBusy(f"Offline TTS queue full after {self.acquire_timeout}s")
+        try:
+            self._ensure_started()
+        except Exception:
+            self._slots.release()
+            raise
+        future = Future()
+        self._inc("pending")
+        future.add_done_callback(self._release)
+        self._jobs.put((future, text, voice))
+        return future
+
+    def synthesize(self, text, voice="alt"):
+        """Audio bytes of text in one of OFFLINE_VOICES."""
+        # The dispatcher bounds the running time, so waiting here needs no timeout
+        return self.submit(text, voice).result()
+
+    def warm_up(self):
+        """Start the worker processes (and their engines) ahead of the first request."""
+        self._ensure_started()
+        logger.info(f"Offline TTS pool starting {self.workers} worker(s)")
+
+    def shutdown(self):
+        with self._lock:
+            dispatchers, self._dispatchers = self._dispatchers, []
+        # Queued jobs are cancelled; running ones finish first
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                job[0].cancel()
+        for _ in dispatchers:
+            self._jobs.put(None)
+        for thread in dispatchers:
+            thread.join(self.job_timeout + 5)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            alive = self._alive
+        jobs = stats["jobs"]
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "alive_workers": alive,
+            **stats,
+            "synth_ms_avg": round(stats["synth_ms_total"] / jobs, 3) if jobs else None,
+        }
+
+
+# Process-wide pool shared by /api/tts/alt and the gTTS fallback
+offline_tts = OfflineTTSEngine()
+atexit.register(offline_tts.shutdown)
+
+_online_retry_at = 0.0
+
+
+def speech_audio(text, engine, voice, synthesize, offline_voice):
+    """
+    (cache key, audio) of text from an online engine through the TTS cache,
+    falling back to the offline pool in the matching voice when the online
+    engine fails. After a failure the online engine is skipped for
+    OFFLINE_TTS_RETRY_ONLINE_SECONDS, except for audio it already cached.
+    """
+    global _online_retry_at
+    if OFFLINE_TTS_FALLBACK and time.monotonic() < _online_retry_at:
+        key = tts_cache.key(engine, voice, normalize_text(text))
+        audio = tts_cache.get(key)
+        if audio is not None:
+            return key, audio
+    else:
+        try:
+            return tts_cache.fetch(engine, voice, text, synthesize)
+        except Exception as e:
+            if not OFFLINE_TTS_FALLBACK:
+                raise
+            logger.warning(f"{engine} failed, using the offline voice {offline_voice!r}: {e}")
+            _online_retry_at = time.monotonic() + OFFLINE_TTS_RETRY_ONLINE_SECONDS
+    return tts_cache.fetch("pyttsx3", offline_voice, text,
+                           lambda normalized: offline_tts.synthesize(normalized, offline_voice))
+
+
+def init_app(app):
+    """Register the metrics endpoint and optionally start the workers in the background."""
+    app.register_blueprint(offline_tts_bp)
+    if OFFLINE_TTS_WARMUP:
+        def warm_up():
+            try:
+                offline_tts.warm_up()
+            except Exception as e:
+                logger.error(f"Could not warm up the offline TTS pool: {e}")
+
+        threading.Thread(target=warm_up, name="offline-tts-warmup", daemon=True).start()
+    return offline_tts
+
+
+@offline_tts_bp.route('/api/tts/offline/stats', methods=['GET'])
+def offline_tts_stats():
+    return jsonify(offline_tts.stats()), 200
@@ -1,49 +1,107 @@
 from flask import Blueprint, jsonify, request
-from screenshoteval import ScreenshotEvaluator
+from screenshoteval import ScreenshotEvaluator, EvaluationSummary
 import os
-from pymongo import MongoClient
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# MongoDB Setup
-MONGO_URI = os.getenv("MONGO_URI")
-client = MongoClient(MONGO_URI)
-db = client["gd"]
+from database import get_db
+import session_store
+import frame_analysis
+import jobs
+import streaming
 
 # Create blueprint
 screenshot_bp = Blueprint('screenshot', __name__)
 
-# Initialize evaluator
-evaluator = ScreenshotEvaluator()
+# Streaming evaluations emit the running summary after every N frames
+STREAM_SUMMARY_EVERY = int(os.getenv("STREAM_SUMMARY_EVERY", "5"))
+
+
+def _store_evaluation(session_id, evaluation_results):
+    """
+    Store an evaluation without its per-frame "screenshots" list; those
+    results already live on each screenshot, and leaving them out keeps the
+    document small however long the session is.
+    """
+    stored = {key: value for key, value in evaluation_results.items() if key != "screenshots"}
+    get_db().screenshot_evaluations.update_one(
+        {"user_id": stored["user_id"], "session_id": session_id},
+        {"$set": stored, "$unset": {"screenshots": ""}},
+        upsert=True
+    )
+
+
+def _stream_evaluation(user_id, session_id, screenshots, mode, stream_format):
+    """
+    Yield one event per frame as its analysis is ready, the running summary
+    every STREAM_SUMMARY_EVERY frames, then the final result. Only the running
+    counters and the frames in flight are held in memory.
+    """
+    summary = EvaluationSummary(user_id, keep_screenshots=False)
+    try:
+        for index, analysis in enumerate(frame_analysis.session_analyses(user_id, screenshots, mode)):
+            yield streaming.encode_event(stream_format, {"type": "frame", "index": index, **summary.add(analysis)})
+            if (index + 1) % STREAM_SUMMARY_EVERY == 0:
+                yield streaming.encode_event(stream_format, {"type": "summary", "summary": summary.summary()})
+
+        evaluation_results = summary.result()
+        evaluation_results["session_id"] = session_id
+        # Nothing was kept in the "screenshots" list while streaming
+        evaluation_results.pop("screenshots")
+        _store_evaluation(session_id, evaluation_results)
+        yield streaming.encode_event(stream_format, {"type": "result", **evaluation_results})
+    except Exception as e:
+        yield streaming.encode_event(stream_format, {"type": "error", "error": str(e), "user_id": user_id})
 
 @screenshot_bp.route('/api/screenshots/evaluate/<user_id>', methods=['GET'])
 def evaluate_user_screenshots(user_id):
     """
-    Evaluate all screenshots for a specific user and return the analysis results.
+    Aggregate the stored per-frame analyses of a user's session, analyzing
+    only the frames that have not been analyzed yet.
+
+    ?mode=sequence analyzes those frames in tracking mode instead of one by one.
+    ?stream=ndjson|sse (or an Accept header of application/x-ndjson or
+    text/event-stream) streams each frame's analysis as soon as it is ready.
+    ?async=true queues the evaluation as a job and returns 202.
     """
+    mode = request.args.get("mode", "static")
+    if mode not in frame_analysis.ANALYSIS_MODES:
+        return jsonify({
+            "error": f"mode must be one of {', '.join(frame_analysis.ANALYSIS_MODES)}",
+            "user_id": user_id
+        }), 400
+    if jobs.wants_async():
+        return jobs.submit_from_request("screenshot_evaluation", user_id)
     try:
-        # Get the user's screenshots from MongoDB
-        user_data = db.user_speech.find_one({"user_id": user_id})
-        if not user_data or "screenshots" not in user_data:
+        # Get the session's screenshot metadata from MongoDB
+        session_id = session_store.read_session_id(user_id, request.args.get("session_id"))
+        stream_format = streaming.stream_format()
+        if stream_format and session_id:
+            screenshots = session_store.iter_screenshots(user_id, session_id)
+            first = next(screenshots, None)
+        else:
+            screenshots = session_store.list_screenshots(user_id, session_id) if session_id else []
+            first = screenshots[0] if screenshots else None
+        if first is None:
             return jsonify({
                 "error": "No screenshots found for this user",
                 "user_id": user_id
             }), 404
 
-        # Get the image data of all screenshots
-        screenshot_data = [screenshot["image_data"] for screenshot in user_data["screenshots"]]
+        if stream_format:
+            def frames():
+                yield first
+                yield from screenshots
+            return streaming.stream_response(
+                _stream_evaluation(user_id, session_id, frames(), mode, stream_format), stream_format
+            )
+
+        # Stored results are reused; new frames are fanned out across the evaluator engine
+        analyses = frame_analysis.session_analyses(user_id, screenshots, mode)
         
-        # Evaluate the screenshots
-        evaluation_results = evaluator.evaluate_screenshots(user_id, screenshot_data)
+        # Aggregate the per-frame results
+        evaluation_results = ScreenshotEvaluator.summarize(user_id, analyses)
+        evaluation_results["session_id"] = session_id
         
         # Store the evaluation results in MongoDB
-        db.screenshot_evaluations.update_one(
-            {"user_id": user_id},
-            {"$set": evaluation_results},
-            upsert=True
-        )
+        _store_evaluation(session_id, evaluation_results)
         
         return jsonify(evaluation_results), 200
         
@@ -59,7 +117,9 @@ def get_evaluation_results(user_id):
     Get the stored evaluation results for a specific user.
     """
     try:
-        evaluation = db.screenshot_evaluations.find_one({"user_id": user_id})
+        db = get_db()
+        session_id = session_store.read_session_id(user_id, request.args.get("session_id"))
+        evaluation = db.screenshot_evaluations.find_one({"user_id": user_id, "session_id": session_id})
         if not evaluation:
             return jsonify({
                 "error": "No evaluation results found for this user",
@@ -2,185 +2,599 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import os
-from typing import Dict, List, Optional, Tuple, Union
+import struct
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 import base64
 
+# Frames are analyzed at most this many pixels on their longest side (0 keeps
+# the full resolution). Landmarks are normalized, so metrics keep their scale.
+FACE_ANALYSIS_MAX_DIM = int(os.getenv("FACE_ANALYSIS_MAX_DIM", "640"))
+# Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of decoding and resizing
+FACE_ANALYSIS_REDUCED_DECODE = os.getenv("FACE_ANALYSIS_REDUCED_DECODE", "true").lower() == "true"
+# How faces are counted before landmarks are extracted:
+#   "facemesh": one FaceMesh pass returns both the face count (up to
+#               FACE_MESH_MAX_FACES) and the landmarks
+#   "haar":     a Haar cascade pass counts faces, then FaceMesh runs for landmarks
+FACE_DETECTION_STRATEGY = os.getenv("FACE_DETECTION_STRATEGY", "facemesh")
+FACE_MESH_MAX_FACES = int(os.getenv("FACE_MESH_MAX_FACES", "2"))
+DETECTION_STRATEGIES = ("facemesh", "haar")
+# Attach per-stage timings (milliseconds) to every analysis
+FACE_ANALYSIS_TIMINGS = os.getenv("FACE_ANALYSIS_TIMINGS", "false").lower() == "true"
+# Sequence (tracking) mode: FaceMesh keeps following the face between frames
+# and only re-runs detection when tracking confidence drops below this
+SEQUENCE_MIN_TRACKING_CONFIDENCE = float(os.getenv("SEQUENCE_MIN_TRACKING_CONFIDENCE", "0.5"))
+# The tracker follows a single face, so every Nth frame is re-checked with the
+# static detection strategy to catch a second person (0 disables the check)
+SEQUENCE_RECOUNT_EVERY = int(os.getenv("SEQUENCE_RECOUNT_EVERY", "10"))
+
+_REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Landmark indices used by the attention metrics (MediaPipe FaceMesh topology)
+LEFT_EYE_INDICES = np.array([33, 160, 158, 133, 153, 144])
+RIGHT_EYE_INDICES = np.array([362, 385, 387, 263, 373, 380])
+NOSE, CHIN, LEFT_CHEEK, RIGHT_CHEEK = 1, 152, 234, 454
+
+EAR_THRESHOLD = 0.25
+HEAD_OFFSET_THRESHOLD = 0.03
+
+
+def eye_aspect_ratio(landmarks: np.ndarray, eye_indices: np.ndarray) -> np.ndarray:
+    """
+    Eye aspect ratio for every frame at once.
+    
+    Args:
+        landmarks (np.ndarray): (N, num_landmarks, 3) float32 landmark tensor
+        eye_indices (np.ndarray): The six eye landmark indices, corner to corner
+        
+    Returns:
+        np.ndarray: (N,) EAR per frame
+    """
+    eye = landmarks[:, eye_indices, :2]
+    A = np.linalg.norm(eye[:, 1] - eye[:, 5], axis=-1)
+    B = np.linalg.norm(eye[:, 2] - eye[:, 4], axis=-1)
+    C = np.linalg.norm(eye[:, 0] - eye[:, 3], axis=-1)
+    return (A + B) / (2.0 * C)
+
+
+def head_offset(landmarks: np.ndarray) -> np.ndarray:
+    """
+    Offset of the nose from the face centre for every frame.
+    
+    Returns:
+        np.ndarray: (N, 2) x/y offsets, positive x is right and positive y is down
+    """
+    nose = landmarks[:, NOSE, :2]
+    head_x = (landmarks[:, LEFT_CHEEK, 0] + landmarks[:, RIGHT_CHEEK, 0]) / 2.0
+    head_y = (landmarks[:, NOSE, 1] + landmarks[:, CHIN, 1]) / 2.0
+    return np.stack([nose[:, 0] - head_x, nose[:, 1] - head_y], axis=-1)
+
+
+# Per-frame metrics computed over the whole (N, num_landmarks, 3) tensor in one
+# pass each. A new metric is one entry here mapping its name to a function that
+# returns an (N,) or (N, k) array.
+LANDMARK_METRICS = {
+    "left_ear": lambda lm: eye_aspect_ratio(lm, LEFT_EYE_INDICES),
+    "right_ear": lambda lm: eye_aspect_ratio(lm, RIGHT_EYE_INDICES),
+    "head_offset": head_offset,
+}
+
+
+def compute_metrics(landmarks: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute every registered metric for a stack of frames.
+    
+    Args:
+        landmarks (np.ndarray): (N, num_landmarks, 3) or a single (num_landmarks, 3) frame
+        
+    Returns:
+        Dict[str, np.ndarray]: Metric name to per-frame values
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    if landmarks.ndim == 2:
+        landmarks = landmarks[np.newaxis]
+    return {name: metric(landmarks) for name, metric in LANDMARK_METRICS.items()}
+
+
+def head_positions(offsets: np.ndarray) -> np.ndarray:
+    """Classify (N, 2) head offsets into Straight/Left/Right/Up/Down. Vertical turns win."""
+    dx, dy = offsets[:, 0], offsets[:, 1]
+    position = np.full(len(offsets), "Straight", dtype=object)
+    horizontal = np.abs(dx) > HEAD_OFFSET_THRESHOLD
+    position[horizontal] = np.where(dx[horizontal] < 0, "Left", "Right")
+    vertical = np.abs(dy) > HEAD_OFFSET_THRESHOLD
+    position[vertical] = np.where(dy[vertical] > 0, "Down", "Up")
+    return position
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from a PNG or JPEG header without decoding the image.
+    
+    Returns:
+        Optional[Tuple[int, int]]: The size, or None for other or malformed formats
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            i += 1 if marker == 0xFF else 2
+            continue
+        length = struct.unpack(">H", data[i + 2:i + 4])[0]
+        # SOF0-SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+
+def frame_bytes(image_data: Union[str, bytes]) -> Union[bytes, memoryview]:
+    """Encoded image bytes from raw bytes, a base64 string / data URL or a file path."""
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        return image_data
+    if os.path.isfile(image_data):
+        with open(image_data, "rb") as f:
+            return f.read()
+    # Remove data URL prefix if present, without splitting the whole payload
+    return base64.b64decode(image_data[image_data.find(",") + 1:])
+
+
 class ScreenshotEvaluator:
-    def __init__(self):
+    def __init__(self, max_dim: int = FACE_ANALYSIS_MAX_DIM, reduced_decode: bool = FACE_ANALYSIS_REDUCED_DECODE,
+                 strategy: str = FACE_DETECTION_STRATEGY):
+        if strategy not in DETECTION_STRATEGIES:
+            raise ValueError(f"Unknown face detection strategy: {strategy}")
+        self.strategy = strategy
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=True,
-            max_num_faces=1,
+            # Looking for a second face is what lets FaceMesh replace the Haar pass
+            max_num_faces=max(2, FACE_MESH_MAX_FACES) if strategy == "facemesh" else 1,
             refine_landmarks=True
         )
-        # Load Haar cascade for frontal face detection
-        self.frontal_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        # Haar cascade for frontal face detection, only loaded when it is used
+        self.frontal_cascade = None
+        if strategy == "haar":
+            self.frontal_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        self.max_dim = max_dim
+        self.reduced_decode = reduced_decode
+        # Tracking-mode FaceMesh for sequence evaluation, created on first use
+        self._tracker = None
+        # Reusable output planes, reallocated only when the frame size changes
+        self._resized = None
+        self._gray = None
+        self._rgb = None
+    
+    def _plane(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        buffer = getattr(self, name)
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+            setattr(self, name, buffer)
+        return buffer
+    
+    def decode_frame(self, image_data: Union[str, bytes]) -> Optional[np.ndarray]:
+        """
+        Decode a frame at (or just above) the analysis resolution.
+        
+        Uses a reduced-resolution JPEG decode when the header shows the image is
+        at least twice the target size, then a bounded INTER_AREA resize into a
+        reusable buffer.
+        
+        Returns:
+            Optional[np.ndarray]: BGR image, or None if it could not be decoded
+        """
+        data = frame_bytes(image_data)
+        nparr = np.frombuffer(data, np.uint8)
+        flags = cv2.IMREAD_COLOR
+        if self.max_dim and self.reduced_decode:
+            size = image_size(bytes(data[:65536]))
+            if size:
+                longest = max(size)
+                for factor, reduced_flag in _REDUCED_DECODE_FLAGS:
+                    if longest // factor >= self.max_dim:
+                        flags = reduced_flag
+                        break
+        image = cv2.imdecode(nparr, flags)
+        if image is None or not self.max_dim:
+            return image
         
-    def detect_faces(self, image: np.ndarray) -> Dict:
+        h, w = image.shape[:2]
+        scale = self.max_dim / max(h, w)
+        if scale >= 1:
+            return image
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        resized = self._plane("_resized", (size[1], size[0], 3))
+        cv2.resize(image, size, dst=resized, interpolation=cv2.INTER_AREA)
+        return resized
+        
+    def detect_faces(self, image: np.ndarray, gray: Optional[np.ndarray] = None) -> Dict:
         """
         Detects frontal faces in an image.
         
         Args:
             image (np.ndarray): Input image
+            gray (Optional[np.ndarray]): Grayscale plane of the image, if already converted
             
         Returns:
             Dict: Dictionary containing face detection results
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        if self.frontal_cascade is None:
+            self.frontal_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        if gray is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
         # Detect frontal faces
         faces = self.frontal_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-        
+        return self._face_detection(len(faces))
+    
+    def _face_detection(self, total_faces: int) -> Dict:
         return {
-            "total_faces": len(faces),
-            "frame_status": "Your frame looks good" if len(faces) == 1 else "Multiple people detected in frame"
+            "total_faces": total_faces,
+            "frame_status": "Your frame looks good" if total_faces == 1 else "Multiple people detected in frame",
+            "strategy": self.strategy
         }
         
-    def analyze_face(self, image_data: Union[str, bytes]) -> Dict:
+    def mesh_faces(self, image_rgb: np.ndarray, face_mesh=None) -> List[np.ndarray]:
         """
-        Analyze a face in the given image data (either base64 string or file path) and return various metrics.
+        Run FaceMesh (the static one unless another is given) on an RGB image.
+        
+        Returns:
+            List[np.ndarray]: One (num_landmarks, 3) float32 array of normalized
+            landmark coordinates per face found
+        """
+        results = (face_mesh or self.face_mesh).process(image_rgb)
+        # Converted once; every metric works on these arrays
+        return [
+            np.array([(p.x, p.y, p.z) for p in face.landmark], dtype=np.float32)
+            for face in results.multi_face_landmarks or []
+        ]
+    
+    def extract_landmarks(self, image_rgb: np.ndarray) -> Optional[np.ndarray]:
+        """Landmarks of the first face FaceMesh finds, or None if there is no face."""
+        faces = self.mesh_faces(image_rgb)
+        return faces[0] if faces else None
+    
+    @staticmethod
+    def analyze_landmarks(landmarks: np.ndarray) -> List[Dict]:
+        """
+        Attention metrics for a stack of frames in vectorized passes.
+        
+        Args:
+            landmarks (np.ndarray): (N, num_landmarks, 3) landmark tensor
+            
+        Returns:
+            List[Dict]: One analysis per frame, in the analyze_face format
+        """
+        metrics = compute_metrics(landmarks)
+        left_ear = metrics["left_ear"]
+        right_ear = metrics["right_ear"]
+        left_open = left_ear > EAR_THRESHOLD
+        right_open = right_ear > EAR_THRESHOLD
+        positions = head_positions(metrics["head_offset"])
+        
+        analyses = []
+        for i in range(len(left_ear)):
+            analyses.append({
+                "Left Eye Status": "Open" if left_open[i] else "Closed",
+                "Right Eye Status": "Open" if right_open[i] else "Closed",
+                "Head Position": positions[i],
+                "Left EAR": float(left_ear[i]),
+                "Right EAR": float(right_ear[i]),
+            })
+        return analyses
+    
+    def tracker(self):
+        """The tracking-mode FaceMesh used by analyze_sequence."""
+        if self._tracker is None:
+            self._tracker = self.mp_face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_tracking_confidence=SEQUENCE_MIN_TRACKING_CONFIDENCE
+            )
+        return self._tracker
+    
+    def frame_landmarks(self, image_data: Union[str, bytes], tracking: bool = False) -> Tuple[Optional[np.ndarray], Dict]:
+        """
+        Decode a frame, check the face count and extract its landmarks.
         
         Args:
             image_data (Union[str, bytes]): Either base64 encoded image data or file path
+            tracking (bool): Use the tracking FaceMesh, which continues from the
+                previous frame of the sequence instead of detecting from scratch
             
         Returns:
-            Dict: Dictionary containing analysis results
+            Tuple[Optional[np.ndarray], Dict]: The (num_landmarks, 3) landmarks and
+            {"face_detection": ...}, or None and an error analysis
         """
+        timings = {}
+        start = time.perf_counter()
+        
+        def lap(stage):
+            nonlocal start
+            now = time.perf_counter()
+            timings[stage] = (now - start) * 1000
+            start = now
+        
         try:
-            # Handle both base64 and file path inputs
-            if isinstance(image_data, str):
-                if os.path.isfile(image_data):
-                    # Handle file path
-                    image = cv2.imread(image_data)
-                else:
-                    # Handle base64
-                    image_bytes = base64.b64decode(image_data.split(',')[-1])  # Remove data URL prefix if present
-                    nparr = np.frombuffer(image_bytes, np.uint8)
-                    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            else:
-                # Handle raw bytes
-                nparr = np.frombuffer(image_data, np.uint8)
-                image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
+            image = self.decode_frame(image_data)
+            lap("decode")
             if image is None:
-                return {"error": "Unable to decode image"}
-            
-            # First check for multiple faces
-            face_detection = self.detect_faces(image)
-            if face_detection["total_faces"] != 1:
-                return {
-                    "error": "Multiple people detected in frame",
-                    "face_detection": face_detection
-                }
-            
-            h, w, _ = image.shape
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            results = self.face_mesh.process(image_rgb)
+                return None, self._with_timings({"error": "Unable to decode image"}, timings)
             
-            if not results.multi_face_landmarks:
-                return {"error": "No face detected"}
+            h, w = image.shape[:2]
+            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._plane("_rgb", (h, w, 3)))
             
-            face_landmarks = results.multi_face_landmarks[0].landmark
-            
-            # Eye aspect ratio (EAR) calculation
-            def eye_aspect_ratio(eye_points):
-                A = np.linalg.norm(np.array([eye_points[1].x, eye_points[1].y]) - np.array([eye_points[5].x, eye_points[5].y]))
-                B = np.linalg.norm(np.array([eye_points[2].x, eye_points[2].y]) - np.array([eye_points[4].x, eye_points[4].y]))
-                C = np.linalg.norm(np.array([eye_points[0].x, eye_points[0].y]) - np.array([eye_points[3].x, eye_points[3].y]))
-                return (A + B) / (2.0 * C)
-            
-            left_eye_indices = [33, 160, 158, 133, 153, 144]
-            right_eye_indices = [362, 385, 387, 263, 373, 380]
-            
-            left_eye = [face_landmarks[i] for i in left_eye_indices]
-            right_eye = [face_landmarks[i] for i in right_eye_indices]
-            
-            left_ear = eye_aspect_ratio(left_eye)
-            right_ear = eye_aspect_ratio(right_eye)
-            
-            left_eye_status = "Open" if left_ear > 0.25 else "Closed"
-            right_eye_status = "Open" if right_ear > 0.25 else "Closed"
-            
-            # Head position detection
-            nose = face_landmarks[1]
-            chin = face_landmarks[152]
-            left_cheek = face_landmarks[234]
-            right_cheek = face_landmarks[454]
+            if tracking:
+                lap("convert")
+                faces = self.mesh_faces(image_rgb, self.tracker())
+                lap("landmarks")
+                face_detection = self._face_detection(len(faces))
+                face_detection["strategy"] = "tracking"
+                if not faces:
+                    return None, self._with_timings({
+                        "error": "No face detected",
+                        "face_detection": face_detection
+                    }, timings)
+                landmarks = faces[0]
+            elif self.strategy == "facemesh":
+                lap("convert")
+                # A single FaceMesh pass gives the face count and the landmarks
+                faces = self.mesh_faces(image_rgb)
+                lap("landmarks")
+                face_detection = self._face_detection(len(faces))
+                if not faces:
+                    return None, self._with_timings({
+                        "error": "No face detected",
+                        "face_detection": face_detection
+                    }, timings)
+                if len(faces) > 1:
+                    return None, self._with_timings({
+                        "error": "Multiple people detected in frame",
+                        "face_detection": face_detection
+                    }, timings)
+                landmarks = faces[0]
+            else:
+                # Both planes are converted once, into reusable buffers, and shared
+                # by face detection and the landmark model
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self._plane("_gray", (h, w)))
+                lap("convert")
+                
+                # First check for multiple faces
+                face_detection = self.detect_faces(image, gray)
+                lap("detect")
+                if face_detection["total_faces"] != 1:
+                    return None, self._with_timings({
+                        "error": "Multiple people detected in frame",
+                        "face_detection": face_detection
+                    }, timings)
+                
+                landmarks = self.extract_landmarks(image_rgb)
+                lap("landmarks")
+                
+                if landmarks is None:
+                    return None, self._with_timings({"error": "No face detected"}, timings)
+            return landmarks, self._with_timings({"face_detection": face_detection}, timings, (w, h))
+        except Exception as e:
+            return None, {"error": str(e)}
+    
+    @staticmethod
+    def _with_timings(analysis: Dict, timings: Dict, size: Optional[Tuple[int, int]] = None) -> Dict:
+        if FACE_ANALYSIS_TIMINGS:
+            analysis["timings_ms"] = {stage: round(ms, 3) for stage, ms in timings.items()}
+            if size:
+                analysis["analysis_size"] = list(size)
+        return analysis
+    
+    def analyze_face(self, image_data: Union[str, bytes]) -> Dict:
+        """
+        Analyze a face in the given image data (either base64 string or file path) and return various metrics.
+        
+        Args:
+            image_data (Union[str, bytes]): Either base64 encoded image data or file path
             
-            head_x = (left_cheek.x + right_cheek.x) / 2.0
-            head_y = (nose.y + chin.y) / 2.0
+        Returns:
+            Dict: Dictionary containing analysis results
+        """
+        return self.analyze_faces([image_data])[0]
+    
+    def analyze_faces(self, screenshot_data: Iterable[Union[str, bytes]]) -> List[Dict]:
+        """
+        Analyze several frames: landmarks are extracted frame by frame, then the
+        metrics for all of them are computed in one vectorized pass.
+        
+        Args:
+            screenshot_data (Iterable[Union[str, bytes]]): Base64 encoded or raw image data
             
-            head_position = "Straight"
-            if abs(nose.x - head_x) > 0.03:
-                head_position = "Left" if nose.x < head_x else "Right"
-            if abs(nose.y - head_y) > 0.03:
-                head_position = "Down" if nose.y > head_y else "Up"
+        Returns:
+            List[Dict]: One analyze_face result per frame, in order
+        """
+        return self._with_metrics(self.frame_landmarks(image_data) for image_data in screenshot_data)
+    
+    def analyze_sequence(self, screenshot_data: Iterable[Union[str, bytes]],
+                         recount_every: int = SEQUENCE_RECOUNT_EVERY) -> List[Dict]:
+        """
+        Analyze a session's frames as a time-ordered stream of the same person.
+        
+        Frames go through a tracking-mode FaceMesh, which re-runs face detection
+        only when tracking is lost. Every `recount_every`th frame uses the static
+        detection strategy instead, so a second person in frame is still caught.
+        
+        Args:
+            screenshot_data (Iterable[Union[str, bytes]]): Frames in timestamp order
+            recount_every (int): Static face-count interval, 0 to track every frame
             
-            return {
-                "Left Eye Status": left_eye_status,
-                "Right Eye Status": right_eye_status,
-                "Head Position": head_position,
-                "Left EAR": left_ear,
-                "Right EAR": right_ear,
-                "face_detection": face_detection
-            }
-        except Exception as e:
-            return {"error": str(e)}
+        Returns:
+            List[Dict]: One analyze_face result per frame, in order
+        """
+        # A new sequence must not continue tracking from the previous one
+        self.tracker().reset()
+        
+        def frames():
+            for i, image_data in enumerate(screenshot_data):
+                recount = recount_every > 0 and i % recount_every == 0
+                yield self.frame_landmarks(image_data, tracking=not recount)
+        
+        return self._with_metrics(frames())
+    
+    def _with_metrics(self, frames: Iterable[Tuple[Optional[np.ndarray], Dict]]) -> List[Dict]:
+        """Merge one vectorized metrics pass into (landmarks, analysis) pairs."""
+        analyses, landmarks, valid = [], [], []
+        for frame_landmarks, analysis in frames:
+            if frame_landmarks is not None:
+                valid.append(len(analyses))
+                landmarks.append(frame_landmarks)
+            analyses.append(analysis)
+        
+        if landmarks:
+            start = time.perf_counter()
+            try:
+                results = self.analyze_landmarks(np.stack(landmarks))
+            except Exception as e:
+                for i in valid:
+                    analyses[i] = {"error": str(e)}
+                return analyses
+            # The vectorized pass is shared, so each frame is charged its share
+            metrics_ms = (time.perf_counter() - start) * 1000 / len(valid)
+            for i, metrics in zip(valid, results):
+                analyses[i] = {**metrics, **analyses[i]}
+                if "timings_ms" in analyses[i]:
+                    analyses[i]["timings_ms"]["metrics"] = round(metrics_ms, 3)
+        return analyses
     
-    def evaluate_screenshots(self, user_id: str, screenshot_data: List[str]) -> Dict:
+    def evaluate_screenshots(self, user_id: str, screenshot_data: Iterable[Union[str, bytes]]) -> Dict:
         """
         Evaluate multiple screenshots for a user.
         
         Args:
             user_id (str): The ID of the user
-            screenshot_data (List[str]): List of base64 encoded image data
+            screenshot_data (Iterable[Union[str, bytes]]): Base64 encoded or raw image data.
+                May be a lazy iterator so frames are fetched and decoded one at a time.
             
         Returns:
             Dict: Dictionary containing evaluation results for all screenshots
         """
-        results = {
-            "user_id": user_id,
-            "screenshots": [],
-            "summary": {
-                "total_screenshots": len(screenshot_data),
-                "valid_screenshots": 0,
-                "attention_metrics": {
-                    "eyes_closed_count": 0,
-                    "head_turned_count": 0
-                }
-            }
-        }
+        return self.summarize(user_id, self.analyze_faces(screenshot_data))
+    
+    def evaluate_sequence(self, user_id: str, screenshot_data: Iterable[Union[str, bytes]]) -> Dict:
+        """
+        Evaluate a session's frames in tracking mode. Returns the same structure
+        as evaluate_screenshots.
         
-        for image_data in screenshot_data:
-            analysis = self.analyze_face(image_data)
+        Args:
+            user_id (str): The ID of the user
+            screenshot_data (Iterable[Union[str, bytes]]): Frames in timestamp order
             
-            if "error" in analysis:
-                results["screenshots"].append({
-                    "error": analysis["error"]
-                })
-                continue
-                
-            results["summary"]["valid_screenshots"] += 1
+        Returns:
+            Dict: Dictionary containing evaluation results for all screenshots
+        """
+        return self.summarize(user_id, self.analyze_sequence(screenshot_data))
+    
+    @staticmethod
+    def summarize(user_id: str, analyses: Iterable[Dict]) -> Dict:
+        """
+        Aggregate per-frame analyze_face results into the evaluation summary.
+        
+        Args:
+            user_id (str): The ID of the user
+            analyses (Iterable[Dict]): analyze_face results, in frame order
             
+        Returns:
+            Dict: Dictionary containing evaluation results for all screenshots
+        """
+        summary = EvaluationSummary(user_id)
+        for analysis in analyses:
+            summary.add(analysis)
+        return summary.result()
+
+
+class EvaluationSummary:
+    """
+    Running aggregate of per-frame analyses, so a summary can be reported
+    while frames are still being analyzed.
+    
+    Args:
+        user_id (str): The ID of the user
+        keep_screenshots (bool): Keep every frame's result for the "screenshots"
+            list. Streaming callers pass False so memory doesn't grow with the session.
+    """
+    
+    def __init__(self, user_id: str, keep_screenshots: bool = True):
+        self.user_id = user_id
+        self.keep_screenshots = keep_screenshots
+        self.screenshots = []
+        self.total_screenshots = 0
+        self.valid_screenshots = 0
+        self.eyes_closed_count = 0
+        self.head_turned_count = 0
+        self.stage_totals = {}
+    
+    def add(self, analysis: Dict) -> Dict:
+        """Add one analyze_face result. Returns its entry for the "screenshots" list."""
+        self.total_screenshots += 1
+        for stage, ms in analysis.get("timings_ms", {}).items():
+            total, count = self.stage_totals.get(stage, (0.0, 0))
+            self.stage_totals[stage] = (total + ms, count + 1)
+        
+        if "error" in analysis:
+            entry = {"error": analysis["error"]}
+        else:
+            self.valid_screenshots += 1
             # Update attention metrics
             if analysis["Left Eye Status"] == "Closed" or analysis["Right Eye Status"] == "Closed":
-                results["summary"]["attention_metrics"]["eyes_closed_count"] += 1
+                self.eyes_closed_count += 1
             if analysis["Head Position"] != "Straight":
-                results["summary"]["attention_metrics"]["head_turned_count"] += 1
-            
-            results["screenshots"].append({
-                "analysis": analysis
-            })
+                self.head_turned_count += 1
+            entry = {"analysis": analysis}
+        
+        if self.keep_screenshots:
+            self.screenshots.append(entry)
+        return entry
+    
+    def summary(self) -> Dict:
+        """The summary so far, with the attention score once a frame is valid."""
+        summary = {
+            "total_screenshots": self.total_screenshots,
+            "valid_screenshots": self.valid_screenshots,
+            "attention_metrics": {
+                "eyes_closed_count": self.eyes_closed_count,
+                "head_turned_count": self.head_turned_count
+            }
+        }
         
         # Calculate attention scores
-        if results["summary"]["valid_screenshots"] > 0:
-            results["summary"]["attention_score"] = {
-                "eyes_closed_ratio": results["summary"]["attention_metrics"]["eyes_closed_count"] / results["summary"]["valid_screenshots"],
-                "head_turned_ratio": results["summary"]["attention_metrics"]["head_turned_count"] / results["summary"]["valid_screenshots"]
+        if self.valid_screenshots > 0:
+            summary["attention_score"] = {
+                "eyes_closed_ratio": self.eyes_closed_count / self.valid_screenshots,
+                "head_turned_ratio": self.head_turned_count / self.valid_screenshots
             }
         
-        return results
+        # Mean milliseconds per stage, when FACE_ANALYSIS_TIMINGS is enabled
+        if self.stage_totals:
+            summary["timings_ms"] = {
+                stage: round(total / count, 3) for stage, (total, count) in self.stage_totals.items()
+            }
+        return summary
+    
+    def result(self) -> Dict:
+        """The evaluation in the evaluate_screenshots format."""
+        return {
+            "user_id": self.user_id,
+            "screenshots": self.screenshots,
+            "summary": self.summary()
+        }
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+import os
+import threading
+import logging
+from database import get_collection
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Session-scoped collections. One document per (user_id, session_id) in
+# SESSIONS, and one document per entry in the child collections.
+SESSIONS = "gd_sessions"
+SPEECH_ENTRIES = "speech_entries"
+SCREENSHOTS = "screenshots"
+
+# A request without a session_id continues the user's latest session if it
+# was active within this window, otherwise a new session is started.
+SESSION_IDLE_MINUTES = int(os.getenv("SESSION_IDLE_MINUTES", "30"))
+
+
+# In-process cache of each user's active session so ingestion requests can
+# resolve their session without a database read.
+_active_sessions = {}
+_active_sessions_lock = threading.Lock()
+
+
+def new_session_id():
+    return str(ObjectId())
+
+
+def latest_session(user_id, projection=None):
+    """Returns the most recently active session document for a user, or None."""
+    return get_collection(SESSIONS).find_one(
+        {"user_id": user_id},
+        projection,
+        sort=[("updated_at", DESCENDING)]
+    )
+
+
+def resolve_session_id(user_id, session_id=None):
+    """
+    Returns the session a write belongs to: the explicit session_id if given,
+    otherwise the user's active session, otherwise a freshly generated id.
+    """
+    now = datetime.utcnow()
+    idle = timedelta(minutes=SESSION_IDLE_MINUTES)
+    if session_id:
+        resolved = str(session_id)
+    else:
+        with _active_sessions_lock:
+            cached = _active_sessions.get(user_id)
+        if cached and now - cached[1] < idle:
+            resolved = cached[0]
+        else:
+            session = latest_session(user_id, {"session_id": 1, "updated_at": 1})
+            if session and session.get("updated_at") and now - session["updated_at"] < idle:
+                resolved = session["session_id"]
+            else:
+                resolved = new_session_id()
+    with _active_sessions_lock:
+        _active_sessions[user_id] = (resolved, now)
+    return resolved
+
+
+def read_session_id(user_id, session_id=None):
+    """Returns the session a read targets: the explicit one or the latest session."""
+    if session_id:
+        return str(session_id)
+    with _active_sessions_lock:
+        cached = _active_sessions.get(user_id)
+    if cached and datetime.utcnow() - cached[1] < timedelta(minutes=SESSION_IDLE_MINUTES):
+        return cached[0]
+    session = latest_session(user_id, {"session_id": 1})
+    return session["session_id"] if session else None
+
+
+def session_update(topic=None, inc=None, set_fields=None):
+    """Build the upsert document that bumps a session's updated_at and counters."""
+    now = datetime.utcnow()
+    update = {
+        "$set": {"updated_at": now, **(set_fields or {})},
+        "$setOnInsert": {"started_at": now},
+    }
+    if topic:
+        update["$set"]["topic"] = topic
+    else:
+        update["$setOnInsert"]["topic"] = ""
+    if inc:
+        update["$inc"] = dict(inc)
+    return update
+
+
+def touch_session(user_id, session_id, topic=None, inc=None, set_fields=None, op_class="ingest"):
+    """Upsert the session document, bumping updated_at and any counters."""
+    return get_collection(SESSIONS, op_class).find_one_and_update(
+        {"user_id": user_id, "session_id": session_id},
+        session_update(topic, inc, set_fields),
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def get_session(user_id, session_id, projection=None):
+    return get_collection(SESSIONS).find_one({"user_id": user_id, "session_id": session_id}, projection)
+
+
+def list_speech_counts(user_id):
+    """Returns {session_id: speech_count} for every session of the user."""
+    return {
+        session["session_id"]: session.get("speech_count", 0)
+        for session in get_collection(SESSIONS).find({"user_id": user_id}, {"_id": 0, "session_id": 1, "speech_count": 1})
+    }
+
+
+def add_speech_entry(user_id, session_id, text, topic=None, timestamp=None):
+    """Insert one speech entry and return the updated session document."""
+    get_collection(SPEECH_ENTRIES, "ingest").insert_one({
+        "user_id": user_id,
+        "session_id": session_id,
+        "timestamp": timestamp or datetime.utcnow(),
+        "text": text,
+    })
+    return touch_session(user_id, session_id, topic, inc={"speech_count": 1})
+
+
+def list_speech_entries(user_id, session_id, projection=None):
+    return list(get_collection(SPEECH_ENTRIES).find(
+        {"user_id": user_id, "session_id": session_id},
+        projection or {"_id": 0, "timestamp": 1, "text": 1}
+    ).sort("timestamp", ASCENDING))
+
+
+def list_screenshots(user_id, session_id, projection=None, since=None, limit=None):
+    query = {"user_id": user_id, "session_id": session_id}
+    if since:
+        query["timestamp"] = {"$gt": since}
+    cursor = get_collection(SCREENSHOTS).find(query, projection or {"_id": 0})
+    if limit:
+        # Latest N frames, returned in timestamp order
+        return list(reversed(list(cursor.sort("timestamp", DESCENDING).limit(limit))))
+    return list(cursor.sort("timestamp", ASCENDING))
+
+
+def iter_screenshots(user_id, session_id, projection=None):
+    """Cursor over a session's screenshots in timestamp order, for callers that stream."""
+    return get_collection(SCREENSHOTS).find(
+        {"user_id": user_id, "session_id": session_id}, projection or {"_id": 0}
+    ).sort("timestamp", ASCENDING)
+
+
+def find_screenshot(user_id, screenshot_id):
+    return get_collection(SCREENSHOTS).find_one(
+        {"user_id": user_id, "screenshot_id": screenshot_id}, {"_id": 0}
+    )
+
+
+def list_speaking_times(user_id):
+    """Returns the speaking-time totals of every session that has them."""
+    speaking_times = []
+    for session in get_collection(SESSIONS).find(
+        {"user_id": user_id, "speaking_time": {"$exists": True}},
+        {"_id": 0, "speaking_time": 1}
+    ):
+        speaking_time = session["speaking_time"]
+        total_duration = speaking_time.get("total_duration", 0)
+        # Batched samples accumulate durations, so derive the percentage from the totals
+        speaking_time["percentage"] = (
+            speaking_time.get("speaking_duration", 0) / total_duration * 100
+        ) if total_duration > 0 else 0
+        speaking_times.append(speaking_time)
+    return speaking_times
+
+
+def save_gd_evaluation(user_id, session_id, evaluation):
+    return touch_session(
+        user_id, session_id,
+        set_fields={"gd_evaluation": {"timestamp": datetime.utcnow(), "evaluation": evaluation}},
+        op_class="critical"
+    )
+
@@ -0,0 +1,110 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import base64
+import os
+import re
+import logging
+from dotenv import load_dotenv
+from tts_cache import audio_mimetype
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Sentences synthesized at once across all spoken turns (gTTS is network-bound)
+SPEECH_TTS_WORKERS = int(os.getenv("SPEECH_TTS_WORKERS", "4"))
+# Shorter sentences are merged with the next one to save a synthesis round trip
+SPEECH_MIN_SENTENCE_CHARS = int(os.getenv("SPEECH_MIN_SENTENCE_CHARS", "30"))
+
+# End punctuation (and any closing quotes or brackets) followed by whitespace
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+
+_executor = ThreadPoolExecutor(max_workers=SPEECH_TTS_WORKERS, thread_name_prefix="speech-tts")
+
+
+class SentenceSplitter:
+    """Cuts text arriving in pieces into sentences as soon as each one ends."""
+
+    def __init__(self, min_chars=SPEECH_MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        """Add text. Returns the sentences completed by it."""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self.buffer):
+            sentence = self.buffer[start:match.end()].strip()
+            if len(sentence) >= self.min_chars:
+                sentences.append(sentence)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def finish(self):
+        """The unterminated remainder, once the text is complete."""
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def speak_events(events, synthesize, executor=None):
+    """
+    Add synthesized audio to a streamed turn (llm_stream.turn_events). Each
+    sentence is sent to TTS as soon as it is complete, while the rest of the
+    reply is still being generated, and an "audio" event is emitted per
+    sentence in order. The turn's "done" event is held back until every
+    sentence's audio has been sent.
+
+    Args:
+        events (Iterable[Dict]): token / done / error events of the turn
+        synthesize (Callable[[str], bytes]): The participant's voice (MP3)
+    """
+    executor = executor or _executor
+    splitter = SentenceSplitter()
+    pending = deque()
+    segments = 0
+
+    def submit(sentences):
+        nonlocal segments
+        for sentence in sentences:
+            pending.append((segments, sentence, executor.submit(synthesize, sentence)))
+            segments += 1
+
+    def ready(block):
+        # Audio is released strictly in sentence order
+        while pending and (block or pending[0][2].done()):
+            index, sentence, future = pending.popleft()
+            try:
+                audio = future.result()
+            except Exception as e:
+                logger.error(f"Speech synthesis failed for segment {index}: {e}")
+                yield {"type": "audio_error", "index": index, "text": sentence, "error": str(e)}
+                continue
+            yield {
+                "type": "audio",
+                "index": index,
+                "text": sentence,
+                "mimetype": audio_mimetype(audio),
+                "audio": base64.b64encode(audio).decode("ascii"),
+            }
+
+    try:
+        for event in events:
+            if event["type"] == "token":
+                submit(splitter.feed(event["text"]))
+                yield event
+                yield from ready(block=False)
+            elif event["type"] == "done":
+                submit(splitter.finish())
+                yield from ready(block=True)
+                yield {**event, "segments": segments}
+            else:
+                yield event
+    finally:
+        # The client went away or the turn failed: skip the unsent sentences
+        for _, _, future in pending:
+            future.cancel()
@@ -0,0 +1,153 @@
+from pymongo import UpdateOne
+from collections import Counter
+from datetime import datetime
+import logging
+import textstat
+from database import get_collection
+from grammar_cache import grammar_cache
+import grammar_batch
+import session_store
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when the scoring rules change so stored per-entry scores are recomputed
+SCORING_VERSION = 2
+
+
+def readability_bucket(readability):
+    # Readability Score (Flesch-Kincaid Index)
+    if readability > 70:
+        return 100
+    elif 50 <= readability <= 70:
+        return 70
+    return 40
+
+
+def grammar_bucket(num_errors):
+    if num_errors == 0:
+        return 100
+    elif num_errors <= 5:
+        return 80
+    elif num_errors <= 10:
+        return 60
+    return 40
+
+
+def repetitiveness_bucket(repetitiveness):
+    if repetitiveness == 0:
+        return 100
+    elif repetitiveness <= 3:
+        return 80
+    elif repetitiveness <= 6:
+        return 60
+    return 40
+
+
+def repeated_word_count(text):
+    """Number of distinct words used more than three times in text."""
+    word_counts = Counter(text.lower().split())
+    return sum(1 for count in word_counts.values() if count > 3)
+
+
+def score_text(text, grammar_errors=None):
+    """
+    Readability, grammar and repetitiveness scores for one speech entry.
+
+    Args:
+        text (str): The entry's text
+        grammar_errors (Optional[int]): Error count from a batched check, if
+            already known; otherwise the text is checked (through the cache)
+
+    Returns:
+        Dict: Raw measurements and their 40-100 bucket scores
+    """
+    if not text.strip():  # Empty text scores zero everywhere
+        return {
+            "version": SCORING_VERSION,
+            "readability": None,
+            "grammar_errors": 0,
+            "repeated_words": 0,
+            "readability_score": 0,
+            "grammar_score": 0,
+            "repetitiveness_score": 0,
+        }
+
+    readability = textstat.flesch_reading_ease(text)
+    # Grammar & Spelling Check, cached by normalized text
+    num_errors = grammar_errors if grammar_errors is not None else len(grammar_cache.check(text))
+    # Repetitiveness Detection
+    repetitiveness = repeated_word_count(text)
+    return {
+        "version": SCORING_VERSION,
+        "readability": readability,
+        "grammar_errors": num_errors,
+        "repeated_words": repetitiveness,
+        "readability_score": readability_bucket(readability),
+        "grammar_score": grammar_bucket(num_errors),
+        "repetitiveness_score": repetitiveness_bucket(repetitiveness),
+    }
+
+
+def score_texts(texts):
+    """Score many entries, grammar-checking them in batches."""
+    texts = list(texts)
+    matches = grammar_batch.check_many(texts)
+    return [score_text(text, len(text_matches)) for text, text_matches in zip(texts, matches)]
+
+
+def aggregate_scores(entry_scores):
+    """Average per-entry scores into the /api/grammar response."""
+    entry_scores = list(entry_scores)
+    if not entry_scores:
+        return {
+            "final_readability_score": 0,
+            "final_grammar_score": 0,
+            "final_repetitiveness_score": 0
+        }
+    # Final Percentage Scores
+    return {
+        "final_readability_score": sum(s["readability_score"] for s in entry_scores) / len(entry_scores),
+        "final_grammar_score": sum(s["grammar_score"] for s in entry_scores) / len(entry_scores),
+        "final_repetitiveness_score": sum(s["repetitiveness_score"] for s in entry_scores) / len(entry_scores),
+    }
+
+
+def _is_current(scores):
+    return isinstance(scores, dict) and scores.get("version") == SCORING_VERSION
+
+
+def session_entry_scores(user_id, session_id):
+    """
+    Per-entry scores of a session's speech, computing and storing only the
+    ones that are missing or were computed by an older SCORING_VERSION.
+
+    Returns:
+        List[Dict]: Scores in entry order
+    """
+    entries = session_store.list_speech_entries(user_id, session_id, {"_id": 1, "text": 1, "scores": 1})
+    entries = [entry for entry in entries if "text" in entry]
+
+    missing = [entry for entry in entries if not _is_current(entry.get("scores"))]
+    updates = []
+    for entry, scores in zip(missing, score_texts(entry["text"] for entry in missing)):
+        entry["scores"] = scores
+        updates.append(UpdateOne(
+            {"_id": entry["_id"]},
+            {"$set": {"scores": entry["scores"], "scored_at": datetime.utcnow()}}
+        ))
+
+    if updates:
+        try:
+            get_collection(session_store.SPEECH_ENTRIES, "ingest").bulk_write(updates, ordered=False)
+        except Exception as e:
+            # Scores are recomputed next time; the response doesn't depend on the write
+            logger.error(f"Failed to store speech entry scores: {e}")
+        logger.info(f"Scored {len(updates)} of {len(entries)} speech entries for session {session_id}")
+    return [entry["scores"] for entry in entries]
+
+
+def session_scores(user_id, session_id):
+    """Aggregate scores of a session, scoring only entries not scored yet."""
+    return aggregate_scores(session_entry_scores(user_id, session_id))
@@ -0,0 +1,33 @@
+from flask import Response, request, stream_with_context
+import json
+
+# Streamed responses are newline-delimited JSON or server-sent events
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def stream_format():
+    """The requested streaming format from ?stream= or the Accept header, or None."""
+    stream = request.args.get("stream")
+    if stream:
+        return stream if stream in STREAM_FORMATS else None
+    accept = request.headers.get("Accept", "")
+    for format_name, mimetype in STREAM_FORMATS.items():
+        if mimetype in accept:
+            return format_name
+    return None
+
+
+def encode_event(format_name, event):
+    data = json.dumps(event, default=str)
+    if format_name == "sse":
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def stream_response(chunks, format_name):
+    """Unbuffered streaming response for already-encoded chunks."""
+    return Response(
+        stream_with_context(chunks),
+        mimetype=STREAM_FORMATS[format_name],
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,105 @@
+from dotenv import load_dotenv
+from grammar_batch import build_batches, map_matches, check_many, BATCH_SEPARATOR
+from grammar_cache import normalize_text, serialize_match
+from grammar_engine import grammar_engine
+
+# Load environment variables
+load_dotenv()
+
+# Speech-recognition style phrases, with repeats, errors and edge cases
+SAMPLE_TEXTS = [
+    "i think artificial intelligence will change the job market",
+    "There is many reasons why people loses there jobs.",
+    "Automation is good. Automation is fast. Automation is cheap. Automation is everywhere.",
+    "",
+    "we should focus on reskilling workers",
+    "i think artificial intelligence will change the job market",
+    "This sentence has  two spaces and a a repeated word.",
+    "Electric vehicles is the future",
+    "Its important to consider they're impact on the enviroment.",
+    "ok",
+    "On the other hand, many people argue that remote work improves productivity, "
+    "while others believe that collaboration suffers when teams are not in the same office.",
+    "Data privacy matters",
+]
+
+
+def test_offset_mapping():
+    """Matches in a batched document map back to the right text and offset."""
+    print("Checking batch offset mapping...")
+    texts = ["alpha beta", "gamma", "delta epsilon"]
+    (document, spans), = build_batches(texts, max_chars=1000)
+    assert document == BATCH_SEPARATOR.join(texts)
+
+    def match(text_index, local_offset, length, rule_id="TEST_RULE"):
+        start = spans[text_index][1]
+        return {"rule_id": rule_id, "offset": start + local_offset, "length": length}
+
+    per_text, recheck = map_matches([
+        match(0, 6, 4),                         # "beta"
+        match(2, 0, 5),                         # "delta"
+        match(2, 6, 7),                         # "epsilon"
+        match(1, 0, 5, "PARAGRAPH_REPEAT_BEGINNING_RULE"),
+    ], spans)
+
+    assert [m["offset"] for m in per_text[0]] == [6]
+    assert [m["offset"] for m in per_text[2]] == [0, 6]
+    assert recheck == {1}, recheck
+
+    # A match straddling the separator sends both neighbours to a recheck
+    per_text, recheck = map_matches([
+        {"rule_id": "TEST_RULE", "offset": spans[0][2] - 1, "length": 4},
+    ], spans)
+    assert 0 in recheck
+
+    # Size-bounded batches never exceed max_chars unless a text is longer on its own
+    batches = build_batches(["x" * 30, "y" * 30, "z" * 80, "w" * 10], max_chars=64)
+    assert [len(spans) for _, spans in batches] == [2, 1, 1]
+    for document, spans in batches:
+        for index, start, end in spans:
+            assert document[start:end] == ["x" * 30, "y" * 30, "z" * 80, "w" * 10][index]
+
+
+def _require_language_tool():
+    """Under pytest, skip when LanguageTool (Java plus its server) can't start here."""
+    try:
+        import pytest
+    except ImportError:
+        # Run as a script: let the check fail loudly instead
+        return
+    pytest.importorskip("language_tool_python")
+    try:
+        grammar_engine.check("This is a test.")
+    except Exception as e:
+        pytest.skip(f"LanguageTool unavailable: {e}")
+
+
+def test_batched_counts_match_unbatched():
+    """Per-text error counts are identical with and without batching (needs LanguageTool)."""
+    _require_language_tool()
+    print("Comparing batched and unbatched grammar checks...")
+    unbatched = [
+        [serialize_match(m) for m in grammar_engine.check(normalize_text(text))] if normalize_text(text) else []
+        for text in SAMPLE_TEXTS
+    ]
+    # A small batch size forces several batches as well as one large one
+    for max_chars in (120, 20000):
+        batched = check_many(SAMPLE_TEXTS, use_cache=False, max_chars=max_chars)
+        for text, expected, actual in zip(SAMPLE_TEXTS, unbatched, batched):
+            assert len(actual) == len(expected), (
+                f"max_chars={max_chars}: {text!r} has {len(actual)} errors batched, {len(expected)} unbatched"
+            )
+            assert [(m["rule_id"], m["offset"]) for m in actual] == \
+                [(m["rule_id"], m["offset"]) for m in expected], text
+
+
+if __name__ == "__main__":
+    try:
+        test_offset_mapping()
+        print("Offset mapping check SUCCESSFUL! ✅")
+        test_batched_counts_match_unbatched()
+        print("Batched grammar check SUCCESSFUL! ✅")
+    except AssertionError as e:
+        print(f"Batched grammar check FAILED! ❌ {e}")
+    finally:
+        grammar_engine.close()
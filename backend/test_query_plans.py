@@ -0,0 +1,39 @@
+from dotenv import load_dotenv
+from pymongo.errors import ServerSelectionTimeoutError
+from database import mongo
+from indexes import ensure_indexes, check_query_plans
+
+# Load environment variables
+load_dotenv()
+
+def _require_mongodb():
+    """Under pytest, skip when no MongoDB server is reachable."""
+    try:
+        import pytest
+    except ImportError:
+        # Run as a script: let the check fail loudly instead
+        return
+    try:
+        mongo.client.admin.command("ping")
+    except ServerSelectionTimeoutError as e:
+        pytest.skip(f"MongoDB unavailable: {e}")
+
+def test_query_plans():
+    """Apply the index registry and check no blueprint query shape does a COLLSCAN."""
+    _require_mongodb()
+    print("Checking query plans...")
+    
+    ensure_indexes()
+    failures = check_query_plans()
+    
+    for failure in failures:
+        print(f"COLLSCAN: {failure['name']} on {failure['collection']} -> {failure['stages']}")
+    
+    assert not failures, f"{len(failures)} query shape(s) do a collection scan"
+
+if __name__ == "__main__":
+    try:
+        test_query_plans()
+        print("Query plan check SUCCESSFUL! ✅")
+    except AssertionError as e:
+        print(f"Query plan check FAILED! ❌ {e}")
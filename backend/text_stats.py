@@ -0,0 +1,173 @@
+from pymongo import UpdateOne
+from collections import Counter
+from datetime import datetime
+import logging
+import re
+import textstat
+from database import get_collection
+from speech_scoring import readability_bucket, repetitiveness_bucket
+import session_store
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# One document per (user_id, session_id) with running counts, plus one per
+# user (session_id None) that merges all of the user's sessions
+TEXT_STATS = "text_stats"
+
+# A word counts as repeated once it is used more than this many times
+REPEAT_THRESHOLD = 3
+
+
+def _field(word):
+    """Escape a word for use as a Mongo field name."""
+    return word.replace("\\", "\\\\").replace(".", "\\u002e").replace("$", "\\u0024")
+
+
+_ESCAPES = {"\\": "\\", "u002e": ".", "u0024": "$"}
+_ESCAPED = re.compile(r"\\(\\|u002e|u0024)")
+
+
+def _word(field):
+    return _ESCAPED.sub(lambda m: _ESCAPES[m.group(1)], field)
+
+
+def entry_stats(text):
+    """Word, sentence and syllable counts plus word frequencies for one entry."""
+    if not text.strip():
+        return {"entries": 1, "words": 0, "sentences": 0, "syllables": 0, "freq": Counter()}
+    return {
+        "entries": 1,
+        "words": textstat.lexicon_count(text),
+        "sentences": textstat.sentence_count(text),
+        "syllables": textstat.syllable_count(text),
+        "freq": Counter(text.lower().split()),
+    }
+
+
+def merge(stats_list):
+    """Merge running statistics without re-tokenizing any text."""
+    merged = {"entries": 0, "words": 0, "sentences": 0, "syllables": 0, "freq": Counter()}
+    for stats in stats_list:
+        for key in ("entries", "words", "sentences", "syllables"):
+            merged[key] += stats.get(key, 0)
+        merged["freq"].update(stats.get("freq", {}))
+    return merged
+
+
+def _inc_document(stats):
+    inc = {key: stats[key] for key in ("entries", "words", "sentences", "syllables")}
+    inc.update({f"freq.{_field(word)}": count for word, count in stats["freq"].items()})
+    return inc
+
+
+def record_ops(user_id, session_id, texts):
+    """
+    Upserts that add the stats of newly ingested texts to the session's and
+    the user's running totals. Returns [] when there is nothing to add.
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    inc = _inc_document(merge(entry_stats(text) for text in texts))
+    now = datetime.utcnow()
+    return [
+        UpdateOne({"user_id": user_id, "session_id": scope}, {"$inc": inc, "$set": {"updated_at": now}}, upsert=True)
+        for scope in (session_id, None)
+    ]
+
+
+def _from_document(doc):
+    return {
+        "entries": doc.get("entries", 0),
+        "words": doc.get("words", 0),
+        "sentences": doc.get("sentences", 0),
+        "syllables": doc.get("syllables", 0),
+        "freq": Counter({_word(field): count for field, count in doc.get("freq", {}).items()}),
+    }
+
+
+def _store(user_id, session_id, stats):
+    document = {key: stats[key] for key in ("entries", "words", "sentences", "syllables")}
+    document["freq"] = {_field(word): count for word, count in stats["freq"].items()}
+    document["updated_at"] = datetime.utcnow()
+    get_collection(TEXT_STATS, "ingest").update_one(
+        {"user_id": user_id, "session_id": session_id}, {"$set": document}, upsert=True
+    )
+
+
+def rebuild(user_id, session_id):
+    """Recompute a session's stats from its stored entries (legacy or missing data)."""
+    texts = [entry.get("text", "") for entry in session_store.list_speech_entries(user_id, session_id)]
+    stats = merge(entry_stats(text) for text in texts)
+    _store(user_id, session_id, stats)
+    return stats
+
+
+def rebuild_user(user_id, speech_counts=None):
+    """
+    Recompute a user's totals by merging their session documents. Sessions
+    whose document is missing or behind the session's entry counter are
+    rebuilt from their entries first.
+    """
+    if speech_counts is None:
+        speech_counts = session_store.list_speech_counts(user_id)
+    docs = {
+        doc["session_id"]: doc for doc in get_collection(TEXT_STATS).find(
+            {"user_id": user_id, "session_id": {"$in": list(speech_counts)}}, {"_id": 0}
+        )
+    }
+    stats = merge(
+        _from_document(docs[session_id])
+        if session_id in docs and docs[session_id].get("entries", 0) >= count
+        else rebuild(user_id, session_id)
+        for session_id, count in speech_counts.items()
+    )
+    _store(user_id, None, stats)
+    return stats
+
+
+def get_stats(user_id, session_id=None, rebuild_missing=True):
+    """
+    Running statistics for a session, or for all of a user's sessions when
+    session_id is None. A document is rebuilt when it is missing or its entry
+    count disagrees with the speech_count of its session, or with the sum over
+    the user's sessions (legacy data, entries ingested without stats).
+    """
+    doc = get_collection(TEXT_STATS).find_one({"user_id": user_id, "session_id": session_id}, {"_id": 0})
+    if session_id is None:
+        speech_counts = session_store.list_speech_counts(user_id)
+        if doc is not None and doc.get("entries", 0) == sum(speech_counts.values()):
+            return _from_document(doc)
+        if rebuild_missing and speech_counts:
+            return rebuild_user(user_id, speech_counts)
+        return _from_document(doc) if doc is not None else merge([])
+    session = session_store.get_session(user_id, session_id, {"_id": 0, "speech_count": 1})
+    speech_count = session.get("speech_count", 0) if session else 0
+    if doc is not None and doc.get("entries", 0) == speech_count:
+        return _from_document(doc)
+    if rebuild_missing:
+        return rebuild(user_id, session_id)
+    return _from_document(doc) if doc is not None else merge([])
+
+
+def scores(stats):
+    """Readability and repetition computed from running counts in O(1) of the text length."""
+    words, sentences, syllables = stats["words"], stats["sentences"], stats["syllables"]
+    readability = None
+    if words and sentences:
+        # Flesch reading ease, from the same counts textstat uses
+        readability = 206.835 - 1.015 * (words / sentences) - 84.6 * (syllables / words)
+    repeated = {word: count for word, count in stats["freq"].items() if count > REPEAT_THRESHOLD}
+    return {
+        "entries": stats["entries"],
+        "words": words,
+        "sentences": sentences,
+        "syllables": syllables,
+        "flesch_reading_ease": round(readability, 2) if readability is not None else None,
+        "readability_score": readability_bucket(readability) if readability is not None else 0,
+        "repeated_words": len(repeated),
+        "top_repeated_words": dict(Counter(repeated).most_common(10)),
+        "repetitiveness_score": repetitiveness_bucket(len(repeated)) if words else 0,
+    }
@@ -0,0 +1,341 @@
+from flask import Blueprint, request, jsonify, url_for
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta
+import hashlib
+import os
+import random
+import socket
+import threading
+import time
+import logging
+from dotenv import load_dotenv
+from database import get_collection
+from blob_store import GridFSBlobStore
+from tts_cache import AUDIO_MIMETYPE, audio_mimetype, audio_response
+import llm1
+import llm2
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Blueprint serving pre-generated discussion openers
+topic_openers_bp = Blueprint('topic_openers', __name__)
+
+TOPIC_OPENERS = "topic_openers"
+# Lease documents, so only one process runs the refresher
+LEASES = "leases"
+REFRESHER_LEASE_ID = "topic_openers.refresher"
+
+# Keep in sync with the topics in frontend/src/components/Topic/TopicPage.tsx
+TOPIC_CATALOG = [
+    "Impact of Artificial Intelligence on Job Markets",
+    "Cryptocurrencies: Future of Finance or Bubble?",
+    "Role of Social Media in Shaping Public Opinion",
+    "The Rise of Electric Vehicles: Opportunities and Challenges",
+    "Sustainability in Fashion: Necessity or Trend?",
+    "The Influence of ChatGPT on Education and Learning",
+    "Work from Home vs. Office: The Future of Work",
+    "Data Privacy in the Age of Surveillance Capitalism",
+    "Climate Change and Its Impact on Global Economies",
+    "Space Exploration: Should We Prioritize Mars Colonization?",
+    "Gaming and Mental Health: Boon or Bane?",
+    "India's Role in Shaping the Global Economy in 2025",
+]
+
+# Each participant opens with its own model, prompt and voice
+PARTICIPANTS = {
+    "llm1": llm1,
+    "llm2": llm2,
+}
+
+# Off by default: a full warm-up costs topics x participants x variants LLM
+# calls per refresh, which counts against the same free-tier quota as live sessions.
+# Without it a catalog topic's openers are generated the first time one is requested.
+TOPIC_OPENER_WARMUP = os.getenv("TOPIC_OPENER_WARMUP", "false").lower() == "true"
+# Opener variants kept per (participant, topic); one is picked at random
+TOPIC_OPENER_VARIANTS = int(os.getenv("TOPIC_OPENER_VARIANTS", "1"))
+# Variants older than this are regenerated by the background refresher
+TOPIC_OPENER_MAX_AGE_HOURS = int(os.getenv("TOPIC_OPENER_MAX_AGE_HOURS", "24"))
+# How often the refresher looks for missing or stale variants
+TOPIC_OPENER_REFRESH_SECONDS = int(os.getenv("TOPIC_OPENER_REFRESH_SECONDS", "3600"))
+# Pause between generations so warm-up stays under the free-tier rate limits
+TOPIC_OPENER_REQUEST_DELAY = float(os.getenv("TOPIC_OPENER_REQUEST_DELAY", "2"))
+# Served openers are re-read from MongoDB after this long (picks up other processes' refreshes)
+TOPIC_OPENER_RELOAD_SECONDS = int(os.getenv("TOPIC_OPENER_RELOAD_SECONDS", "300"))
+# The refresher's lease is renewed before each topic; a process that dies
+# holding it is replaced once it expires
+TOPIC_OPENER_LEASE_SECONDS = int(os.getenv("TOPIC_OPENER_LEASE_SECONDS", "600"))
+
+audio_store = GridFSBlobStore(bucket_name="opener_audio")
+
+
+def topic_key(topic):
+    return hashlib.sha256(topic.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+def _owner():
+    """Identifies this process on the refresher lease (pid changes after fork)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_refresher_lease():
+    """Take or renew the refresher lease. Returns False while another process holds it."""
+    now = datetime.utcnow()
+    try:
+        get_collection(LEASES, "critical").find_one_and_update(
+            {"_id": REFRESHER_LEASE_ID, "$or": [{"owner": _owner()}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"owner": _owner(), "lease_until": now + timedelta(seconds=TOPIC_OPENER_LEASE_SECONDS)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The lease exists and is held by another live process
+        return False
+    return True
+
+
+def release_refresher_lease():
+    """Give up the refresher lease if this process holds it."""
+    get_collection(LEASES, "critical").delete_one({"_id": REFRESHER_LEASE_ID, "owner": _owner()})
+
+
+class TopicOpeners:
+    """
+    Pre-generated opening turns per (participant, topic), each with its
+    synthesized audio. Variants live in MongoDB (text) and GridFS (audio)
+    and are held in memory once served, so a session starts without waiting
+    on an LLM call or a TTS synthesis.
+    """
+
+    def __init__(self, variants=TOPIC_OPENER_VARIANTS, max_age_hours=TOPIC_OPENER_MAX_AGE_HOURS):
+        self.variants = variants
+        self.max_age = timedelta(hours=max_age_hours)
+        self._loaded = {}  # (participant, topic key) -> (loaded_at, [opener])
+        self._audio = {}   # blob id -> bytes; content-addressed, so never stale
+        self._pending = set()
+        self._refreshing = False  # the refresher loop runs in this process
+        self._warming = False     # an on-demand warm-up thread is running
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stats = {"hits": 0, "misses": 0, "generated": 0, "failures": 0}
+
+    def _inc(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _stored(self, participant, topic):
+        return list(get_collection(TOPIC_OPENERS).find(
+            {"participant": participant, "topic_key": topic_key(topic)},
+            {"_id": 1, "text": 1, "audio_blob_id": 1, "variant": 1, "created_at": 1}
+        ))
+
+    def openers(self, participant, topic):
+        key = (participant, topic_key(topic))
+        with self._lock:
+            loaded = self._loaded.get(key)
+        if loaded is not None and time.monotonic() - loaded[0] < TOPIC_OPENER_RELOAD_SECONDS:
+            return loaded[1]
+        openers = self._stored(participant, topic)
+        with self._lock:
+            self._loaded[key] = (time.monotonic(), openers)
+        return openers
+
+    def pick(self, participant, topic):
+        """A random stored opener for the topic, or None (a catalog topic is then warmed right away)."""
+        openers = self.openers(participant, topic)
+        if not openers:
+            self._inc("misses")
+            if topic in TOPIC_CATALOG:
+                self.request_warmup(topic)
+            return None
+        self._inc("hits")
+        return random.choice(openers)
+
+    def audio(self, blob_id):
+        with self._lock:
+            data = self._audio.get(blob_id)
+        if data is None:
+            data = audio_store.get(blob_id)
+            with self._lock:
+                self._audio[blob_id] = data
+        return data
+
+    def generate(self, participant, topic, variant, previous=None):
+        """Generate, synthesize and store one opener variant, replacing previous."""
+        module = PARTICIPANTS[participant]
+        text = module.generate_text(module.opener_messages(topic))
+        words = text.split()
+        if len(words) > 55:
+            text = ' '.join(words[:50]) + '...'
+        audio = module.synthesize(text)
+        mimetype = audio_mimetype(audio)
+        if mimetype != AUDIO_MIMETYPE:
+            # The offline voice stood in for gTTS; don't keep it as a long-lived opener
+            raise RuntimeError(f"Online TTS unavailable (got {mimetype})")
+        blob = audio_store.put(audio, mimetype)
+        opener = {
+            "_id": f"{participant}:{topic_key(topic)}:{variant}",
+            "participant": participant,
+            "topic": topic,
+            "topic_key": topic_key(topic),
+            "variant": variant,
+            "text": text,
+            "audio_blob_id": blob["blob_id"],
+            "audio_size": blob["size"],
+            "created_at": datetime.utcnow(),
+        }
+        get_collection(TOPIC_OPENERS, "ingest").replace_one({"_id": opener["_id"]}, opener, upsert=True)
+        with self._lock:
+            self._audio[blob["blob_id"]] = audio
+            self._loaded.pop((participant, topic_key(topic)), None)
+        if previous is not None and previous.get("audio_blob_id") != blob["blob_id"]:
+            with self._lock:
+                self._audio.pop(previous["audio_blob_id"], None)
+            audio_store.delete(previous["audio_blob_id"])
+        self._inc("generated")
+        return opener
+
+    def warm_topic(self, topic):
+        """Fill missing variants of a topic and regenerate stale ones."""
+        cutoff = datetime.utcnow() - self.max_age
+        for participant in PARTICIPANTS:
+            stored = {opener["variant"]: opener for opener in self._stored(participant, topic)}
+            for variant in range(self.variants):
+                opener = stored.get(variant)
+                if opener is not None and opener["created_at"] > cutoff:
+                    continue
+                try:
+                    self.generate(participant, topic, variant, previous=opener)
+                except Exception as e:
+                    self._inc("failures")
+                    logger.warning(f"Could not generate {participant} opener for {topic!r}: {e}")
+                    break  # Likely rate limited; try this topic again next cycle
+                time.sleep(TOPIC_OPENER_REQUEST_DELAY)
+
+    def request_warmup(self, topic):
+        """
+        Move a topic to the front of the next refresh and start it now. A
+        process without the refresher warms it in a one-shot background thread.
+        """
+        with self._lock:
+            self._pending.add(topic)
+            start = not self._refreshing and not self._warming
+            if start:
+                self._warming = True
+        if start:
+            threading.Thread(target=self._warm_pending, name="topic-openers-on-demand", daemon=True).start()
+        self._wake.set()
+
+    def _warm_pending(self):
+        """Warm the requested topics under the refresher lease, then exit."""
+        while True:
+            give_up = False
+            try:
+                while True:
+                    with self._lock:
+                        topic = self._pending.pop() if self._pending else None
+                    if topic is None:
+                        break
+                    if not acquire_refresher_lease():
+                        # The other process warms it; a later miss asks again
+                        logger.info("Topic opener refresher lease held by another process")
+                        give_up = True
+                        break
+                    self.warm_topic(topic)
+                release_refresher_lease()
+            except Exception as e:
+                logger.error(f"On-demand topic opener warm-up failed: {e}")
+                give_up = True
+            with self._lock:
+                if give_up:
+                    self._pending.clear()
+                # Topics requested while the lease was being released
+                if not self._pending:
+                    self._warming = False
+                    return
+
+    def refresh(self):
+        """Warm requested topics first, then the catalog, while this process holds the lease."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        for topic in list(pending) + [t for t in TOPIC_CATALOG if t not in pending]:
+            if not acquire_refresher_lease():
+                logger.info("Topic opener refresher lease held by another process")
+                return
+            self.warm_topic(topic)
+
+    def run(self):
+        """Refresher loop: warm the catalog now, then every TOPIC_OPENER_REFRESH_SECONDS."""
+        with self._lock:
+            self._refreshing = True
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Topic opener refresh failed: {e}")
+            self._wake.wait(TOPIC_OPENER_REFRESH_SECONDS)
+            self._wake.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            loaded = sum(len(openers) for _, openers in self._loaded.values())
+            audio_bytes = sum(len(data) for data in self._audio.values())
+            pending = len(self._pending)
+        return {"loaded_openers": loaded, "audio_bytes": audio_bytes, "pending_topics": pending, **stats}
+
+
+# Process-wide opener store
+topic_openers = TopicOpeners()
+
+
+def init_app(app):
+    """Register the openers blueprint and start the background refresher."""
+    app.register_blueprint(topic_openers_bp)
+    if TOPIC_OPENER_WARMUP:
+        threading.Thread(target=topic_openers.run, name="topic-openers", daemon=True).start()
+    return topic_openers
+
+
+@topic_openers_bp.route('/api/openers/<participant>', methods=['GET'])
+def get_opener(participant):
+    """A ready opener (text plus audio URL) for the start of a discussion."""
+    if participant not in PARTICIPANTS:
+        return jsonify({"success": False, "error": f"Unknown participant: {participant}"}), 404
+    topic = request.args.get("topic", "").strip()
+    if not topic:
+        return jsonify({"success": False, "error": "No topic provided"}), 400
+    try:
+        opener = topic_openers.pick(participant, topic)
+    except Exception as e:
+        logger.error(f"Error loading opener: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    if opener is None:
+        return jsonify({"success": False, "error": "No opener ready for this topic"}), 404
+
+    if participant == "llm2":
+        llm2.start_conversation()
+    return jsonify({
+        "success": True,
+        "response": opener["text"],
+        "audio_url": url_for("topic_openers.get_opener_audio", blob_id=opener["audio_blob_id"]),
+        "cached": True
+    })
+
+
+@topic_openers_bp.route('/api/openers/audio/<blob_id>', methods=['GET'])
+def get_opener_audio(blob_id):
+    try:
+        data = topic_openers.audio(blob_id)
+    except KeyError:
+        return jsonify({"success": False, "error": "Audio not found"}), 404
+    # The URL is the content hash, so the browser may keep it indefinitely
+    return audio_response(blob_id, data, max_age=31536000, immutable=True)
+
+
+@topic_openers_bp.route('/api/openers/stats', methods=['GET'])
+def opener_stats():
+    return jsonify(topic_openers.stats()), 200
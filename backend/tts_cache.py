@@ -0,0 +1,273 @@
+from flask import Blueprint, Response, jsonify, request
+from collections import OrderedDict
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import logging
+from dotenv import load_dotenv
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Blueprint serving cached audio by key, plus cache counters
+tts_cache_bp = Blueprint('tts_cache', __name__)
+
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_DIR = os.getenv(
+    "TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache")
+)
+# Size bounds of the two tiers; least recently used audio is evicted first
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+# Browsers may reuse audio for this long without revalidating
+TTS_CACHE_MAX_AGE = int(os.getenv("TTS_CACHE_MAX_AGE", "86400"))
+
+AUDIO_MIMETYPE = "audio/mp3"
+# Offline engines render WAV (AIFF on macOS) rather than MP3
+_CONTAINER_MIMETYPES = {b"RIFF": "audio/wav", b"FORM": "audio/aiff"}
+
+_WHITESPACE = re.compile(r"\s+")
+_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+def normalize_text(text):
+    """Collapse whitespace; the voice sounds the same either way."""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def audio_mimetype(data):
+    """Content type of synthesized audio, from its container header."""
+    return _CONTAINER_MIMETYPES.get(data[:4], AUDIO_MIMETYPE)
+
+
+class TTSCache:
+    """
+    Synthesized audio keyed by the hash of (engine, voice, normalized text).
+    A byte-bounded in-memory LRU sits in front of a byte-bounded on-disk LRU;
+    concurrent requests for the same audio share one synthesis.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, disk_bytes=TTS_CACHE_DISK_BYTES,
+                 memory_bytes=TTS_CACHE_MEMORY_BYTES, enabled=TTS_CACHE_ENABLED):
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        self.memory_bytes = memory_bytes
+        self.enabled = enabled
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_size = 0
+        self._disk = None  # key -> size, oldest first; loaded on first use
+        self._disk_size = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "syntheses": 0,
+                       "evicted_memory": 0, "evicted_disk": 0, "disk_errors": 0}
+
+    def _inc(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def key(engine, voice, text):
+        return hashlib.sha256(f"{engine}\0{voice}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.audio")
+
+    def _load_disk_index(self):
+        # Called with the lock held. Existing files are ordered by mtime, which
+        # each hit refreshes, so the index survives restarts in LRU order.
+        if self._disk is not None:
+            return
+        entries = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    key = name[:-len(".audio")]
+                    if name.endswith(".audio") and _KEY.match(key):
+                        try:
+                            stat = os.stat(os.path.join(root, name))
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, key, stat.st_size))
+        self._disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._disk_size = sum(self._disk.values())
+
+    def _remember(self, key, data):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            if len(data) > self.memory_bytes:
+                return
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+                self._stats["evicted_memory"] += 1
+
+    def get(self, key):
+        """Cached audio for a key, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return data
+            self._load_disk_index()
+            on_disk = key in self._disk
+        if on_disk:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+            except OSError:
+                # Evicted by another process
+                with self._lock:
+                    self._disk_size -= self._disk.pop(key, 0)
+                data = None
+            if data is not None:
+                with self._lock:
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._stats["disk_hits"] += 1
+                self._remember(key, data)
+                return data
+        self._inc("misses")
+        return None
+
+    def put(self, key, data):
+        self._remember(key, data)
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see partial audio
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"TTS cache write failed: {e}")
+            self._inc("disk_errors")
+            return
+
+        evicted = []
+        with self._lock:
+            self._load_disk_index()
+            self._disk_size += len(data) - self._disk.pop(key, 0)
+            self._disk[key] = len(data)
+            while self._disk_size > self.disk_bytes and len(self._disk) > 1:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_size -= size
+                self._stats["evicted_disk"] += 1
+                evicted.append(old_key)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def fetch(self, engine, voice, text, synthesize):
+        """
+        Audio for text in the given voice, synthesized only on a cache miss.
+
+        Args:
+            synthesize (Callable[[str], bytes]): Produces the audio for the
+                normalized text
+
+        Returns:
+            Tuple[str, bytes]: The cache key (also the ETag) and the audio
+        """
+        normalized = normalize_text(text)
+        key = self.key(engine, voice, normalized)
+        if not self.enabled:
+            self._inc("syntheses")
+            return key, synthesize(normalized)
+        data = self.get(key)
+        if data is not None:
+            return key, data
+        with self._lock:
+            inflight = self._inflight.setdefault(key, threading.Lock())
+        try:
+            with inflight:
+                # Another request may have synthesized it while we waited
+                with self._lock:
+                    data = self._memory.get(key)
+                if data is None:
+                    data = synthesize(normalized)
+                    self._inc("syntheses")
+                    self.put(key, data)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return key, data
+
+    def stats(self):
+        with self._lock:
+            self._load_disk_index()
+            stats = dict(self._stats)
+            memory = {"entries": len(self._memory), "bytes": self._memory_size, "capacity": self.memory_bytes}
+            disk = {"entries": len(self._disk), "bytes": self._disk_size, "capacity": self.disk_bytes}
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "memory": memory,
+            "disk": disk,
+            **stats,
+            "hit_rate": round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else None,
+        }
+
+
+# Process-wide cache shared by every voice
+tts_cache = TTSCache()
+
+
+def audio_response(etag, data, max_age=TTS_CACHE_MAX_AGE, immutable=False):
+    """
+    Serve audio with an ETag. GET and HEAD requests get If-None-Match (304)
+    and Range (206) handling so browsers can reuse and seek audio; POST
+    requests are answered with 304 when If-None-Match names the same audio.
+    """
+    response = Response(data, mimetype=audio_mimetype(data))
+    response.set_etag(etag)
+    cache_control = f"public, max-age={max_age}"
+    if immutable:
+        cache_control += ", immutable"
+    response.headers["Cache-Control"] = cache_control
+    if request.method in ("GET", "HEAD"):
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    if etag in request.if_none_match:
+        not_modified = Response(status=304)
+        not_modified.set_etag(etag)
+        not_modified.headers["Cache-Control"] = cache_control
+        return not_modified
+    return response
+
+
+@tts_cache_bp.route('/api/tts/audio/<key>', methods=['GET'])
+def get_cached_audio(key):
+    """Audio previously synthesized for any voice, by its cache key."""
+    if not _KEY.match(key):
+        return jsonify({"success": False, "error": "Invalid audio key"}), 400
+    data = tts_cache.get(key)
+    if data is None:
+        return jsonify({"success": False, "error": "Audio not found"}), 404
+    return audio_response(key, data, immutable=True)
+
+
+@tts_cache_bp.route('/api/tts/cache/stats', methods=['GET'])
+def tts_cache_stats():
+    return jsonify(tts_cache.stats()), 200
@@ -1,16 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file
 from bson import ObjectId
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 import base64
+import io
 import traceback
 import logging
 import requests
 import os
 from dotenv import load_dotenv
-import textstat
-import language_tool_python
-from collections import Counter
+from database import get_db, WRITE_CONCERNS
+import session_store
+from write_buffer import write_buffer
+import frame_analysis
+import jobs
+from grammar_engine import GrammarEngineBusy
+import speech_scoring
+import text_stats
+from blob_store import (
+    get_blob_store, decode_data_url, encode_data_url, load_screenshot_bytes, BlobTooLargeError
+)
 
 # Create a Blueprint for user data routes
 user_data_bp = Blueprint('user_data', __name__)
@@ -27,9 +36,31 @@ OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 SITE_URL = os.getenv("SITE_URL", "http://localhost:5173")
 SITE_NAME = os.getenv("SITE_NAME", "Interactive-GD")
 
-def get_user_speech_collection(db):
-    """Returns the user_speech collection from the database."""
-    return db["user_speech"]
+# Maximum transcript chunks accepted by the batch ingestion endpoint
+SPEECH_BATCH_MAX_ENTRIES = int(os.getenv("SPEECH_BATCH_MAX_ENTRIES", "500"))
+
+def get_user_speech_collection(db, op_class="default"):
+    """Returns the user_speech collection using the write concern of op_class."""
+    return db.get_collection("user_speech", write_concern=WRITE_CONCERNS[op_class])
+
+def build_speaking_time_entry(speaking_duration, total_duration, timestamp=None):
+    """Build the speaking-time sample stored on a session document."""
+    return {
+        "timestamp": timestamp or datetime.utcnow(),
+        "speaking_duration": speaking_duration,
+        "total_duration": total_duration,
+        "percentage": (speaking_duration / total_duration * 100) if total_duration > 0 else 0
+    }
+
+def parse_timestamp(value):
+    """Parse an optional ISO-8601 timestamp from a request, defaulting to now."""
+    if not value:
+        return datetime.utcnow()
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        # Stored timestamps are naive UTC
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
 
 def get_qwen_evaluation(prompt):
     """Get evaluation from Qwen model via OpenRouter API."""
@@ -95,13 +126,6 @@ def store_speech():
     try:
         logger.info("Speech storage request received")
         
-        try:
-            from auth import db
-            logger.info("Successfully imported db from auth")
-        except ImportError as ie:
-            logger.error(f"Failed to import db from auth: {ie}")
-            return jsonify({"success": False, "error": "Server configuration error"}), 500
-        
         data = request.get_json()
         logger.info(f"Received data: {data}")
         
@@ -115,63 +139,22 @@ def store_speech():
             logger.error("Missing required data")
             return jsonify({"success": False, "error": "Missing required data"}), 400
             
-        collection = get_user_speech_collection(db)
-        logger.info(f"Retrieved collection: {collection.name}")
-        
-        # Create speech entry with timestamp
-        speech_entry = {
-            "timestamp": datetime.utcnow(),
-            "text": speech_text
-        }
-        
         try:
-            # Find user's document
-            user_speech_doc = collection.find_one({"user_id": user_id})
-            logger.info(f"Found existing user document: {bool(user_speech_doc)}")
-            
-            if user_speech_doc:
-                # Update existing document
-                logger.info("Updating existing document")
-                result = collection.update_one(
-                    {"user_id": user_id},
-                    {
-                        "$set": {"topic": topic},
-                        "$push": {"speech_entries": speech_entry}
-                    }
-                )
-                logger.info(f"Update result: matched={result.matched_count}, modified={result.modified_count}")
-                
-                if result.modified_count == 0:
-                    logger.error("Failed to update document")
-                    return jsonify({"success": False, "error": "Failed to update document"}), 500
-            else:
-                # Create new document
-                logger.info("Creating new document")
-                result = collection.insert_one({
-                    "user_id": user_id,
-                    "topic": topic,
-                    "speech_entries": [speech_entry],
-                    "screenshots": []
-                })
-                logger.info(f"Insert result: inserted_id={result.inserted_id}")
-                
-                if not result.inserted_id:
-                    logger.error("Failed to insert document")
-                    return jsonify({"success": False, "error": "Failed to insert document"}), 500
+            session_id = session_store.resolve_session_id(user_id, data.get("session_id"))
             
-            # Verify the update/insert
-            updated_doc = collection.find_one({"user_id": user_id})
-            if not updated_doc:
-                logger.error("Failed to verify document update")
-                return jsonify({"success": False, "error": "Failed to verify document update"}), 500
-            
-            speech_entries_count = len(updated_doc.get('speech_entries', []))
-            logger.info(f"Successfully stored speech entry. Total entries: {speech_entries_count}")
+            # Queue the entry; the write-behind buffer inserts it into the
+            # session's speech collection and bumps the entry counter
+            flushed = write_buffer.add(
+                user_id, session_id, topic,
+                speech=[{"timestamp": datetime.utcnow(), "text": speech_text}]
+            )
+            logger.info(f"Successfully queued speech entry for session {session_id}")
             
             return jsonify({
                 "success": True, 
                 "message": "Speech stored successfully",
-                "entries_count": speech_entries_count
+                "session_id": session_id,
+                "queued": flushed is None
             })
             
         except Exception as db_error:
@@ -183,6 +166,80 @@ def store_speech():
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+@user_data_bp.route('/api/user/speech/batch', methods=['POST'])
+def store_speech_batch():
+    """
+    Store many transcript chunks, and optionally a speaking-time sample, in
+    one request. They are coalesced by the write-behind buffer and written
+    with bulk writes.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"success": False, "error": "No JSON data provided"}), 400
+        
+        user_id = data.get("user_id")
+        topic = data.get("topic", "").strip()
+        chunks = data.get("entries", [])
+        speaking_time = data.get("speaking_time")
+        
+        if not user_id or not isinstance(chunks, list) or (not chunks and not speaking_time):
+            logger.error("Missing required data")
+            return jsonify({"success": False, "error": "Missing required data"}), 400
+            
+        if len(chunks) > SPEECH_BATCH_MAX_ENTRIES:
+            return jsonify({
+                "success": False,
+                "error": f"Batch exceeds {SPEECH_BATCH_MAX_ENTRIES} entries"
+            }), 413
+        
+        # Normalize the chunks, dropping empty transcripts
+        try:
+            entries = [
+                {"text": chunk.get("text", "").strip(), "timestamp": parse_timestamp(chunk.get("timestamp"))}
+                for chunk in chunks
+                if isinstance(chunk, dict) and chunk.get("text", "").strip()
+            ]
+            speaking_time_entry = None
+            if isinstance(speaking_time, dict):
+                speaking_time_entry = build_speaking_time_entry(
+                    speaking_time.get("speaking_duration", 0),
+                    speaking_time.get("total_duration", 0),
+                    parse_timestamp(speaking_time.get("timestamp"))
+                )
+        except (TypeError, ValueError) as parse_error:
+            return jsonify({"success": False, "error": f"Invalid batch data: {parse_error}"}), 400
+            
+        session_id = session_store.resolve_session_id(user_id, data.get("session_id"))
+        logger.info(f"Storing batch of {len(entries)} speech entries for user {user_id}, session: {session_id}")
+        
+        # Batch samples add their durations to the session's running totals
+        speaking_time_inc = None
+        if speaking_time_entry:
+            speaking_time_inc = {
+                key: speaking_time_entry[key]
+                for key in ("timestamp", "speaking_duration", "total_duration")
+            }
+        flushed = write_buffer.add(
+            user_id, session_id, topic, speech=entries, speaking_time_inc=speaking_time_inc
+        )
+        
+        return jsonify({
+            "success": True,
+            "session_id": session_id,
+            "queued": flushed is None,
+            # Counts come from the bulk write result when writes are synchronous
+            "inserted_count": flushed["speech"] if flushed else 0,
+            "queued_count": len(entries) if flushed is None else 0,
+            "skipped_count": len(chunks) - len(entries),
+            "percentage": speaking_time_entry["percentage"] if speaking_time_entry else None
+        })
+        
+    except Exception as e:
+        logger.error(f"Error storing speech batch: {e}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @user_data_bp.route('/api/user/screenshot', methods=['POST'])
 def store_screenshot():
     """Store screenshot image in MongoDB."""
@@ -190,13 +247,6 @@ def store_screenshot():
         # Log the request
         logger.info("Screenshot upload request received")
         
-        try:
-            from auth import db
-            logger.info("Successfully imported db from auth")
-        except ImportError as ie:
-            logger.error(f"Failed to import db from auth: {ie}")
-            return jsonify({"success": False, "error": "Server configuration error"}), 500
-        
         data = request.get_json()
         user_id = data.get("user_id")
         image_data = data.get("image_data")  # Base64 encoded image
@@ -208,52 +258,40 @@ def store_screenshot():
         # Print the first 100 characters to debug (avoid logging entire image)
         print(f"Received image data from user {user_id}, length: {len(image_data)} chars")
         
-        # Check if image data is too large
-        if len(image_data) > 1024 * 1024 * 5:  # 5MB limit
-            print("Image data exceeds size limit, compressing...")
-            # We'll trim the data for now (in production you'd compress it instead)
-            image_data = image_data[:1024 * 1024 * 2]  # Trim to 2MB
+        # Store the raw image bytes in the blob store; the screenshot document
+        # only keeps small metadata
+        try:
+            image_bytes, content_type = decode_data_url(image_data)
+            blob_meta = get_blob_store().put(image_bytes, content_type)
+        except BlobTooLargeError as size_error:
+            print(f"Screenshot rejected: {size_error}")
+            return jsonify({"success": False, "error": str(size_error)}), 413
+        except ValueError as decode_error:
+            return jsonify({"success": False, "error": str(decode_error)}), 400
             
-        collection = get_user_speech_collection(db)
-        
-        # Find user's document or create a new one
-        user_speech_doc = collection.find_one({"user_id": user_id})
-        
         screenshot_entry = {
+            "screenshot_id": str(ObjectId()),
             "timestamp": datetime.utcnow(),
-            "image_data": image_data
+            **blob_meta
         }
         
         try:
-            if user_speech_doc:
-                # Update existing document - update topic and push to screenshots array
-                collection.update_one(
-                    {"user_id": user_id},
-                    {
-                        "$set": {"topic": topic},
-                        "$push": {"screenshots": screenshot_entry}
-                    }
-                )
-            else:
-                # Create new document with the desired structure
-                collection.insert_one({
-                    "user_id": user_id,
-                    "topic": topic,
-                    "speech_entries": [],
-                    "screenshots": [screenshot_entry]
-                })
+            session_id = session_store.resolve_session_id(user_id, data.get("session_id"))
+            write_buffer.add(user_id, session_id, topic, screenshots=[screenshot_entry])
+            
+            # Analyze the frame once, in the background, right after accepting it
+            frame_analysis.submit_frame(user_id, screenshot_entry["screenshot_id"], image_bytes)
                 
             print(f"Successfully stored screenshot for user {user_id}")
-            return jsonify({"success": True})
+            return jsonify({
+                "success": True,
+                "session_id": session_id,
+                "screenshot_id": screenshot_entry["screenshot_id"],
+                "size": screenshot_entry["size"]
+            })
             
         except Exception as db_error:
             print(f"Database error when storing screenshot: {db_error}")
-            if "document too large" in str(db_error).lower():
-                # MongoDB has a 16MB document size limit
-                return jsonify({
-                    "success": False, 
-                    "error": "Screenshot too large for database storage"
-                }), 413
             raise
             
     except Exception as e:
@@ -269,72 +307,44 @@ def test_endpoint():
         "message": "User data API is working correctly"
     })
 
+@user_data_bp.route('/api/user/ingest/stats', methods=['GET'])
+def ingest_stats():
+    """Expose write-behind buffer counters for monitoring."""
+    return jsonify({"success": True, "stats": write_buffer.stats()})
+
 @user_data_bp.route('/api/user/<user_id>/data', methods=['GET'])
 def get_user_data(user_id):
     """Get user's data including screenshots."""
     try:
-        from auth import db
-        
         if not user_id:
             return jsonify({"success": False, "error": "User ID required"}), 400
             
-        collection = get_user_speech_collection(db)
-        user_data = collection.find_one({"user_id": user_id})
-        
-        # Add debug logging
-        logger.info(f"Type of user_data: {type(user_data)}")
-        logger.info(f"Content of user_data: {user_data}")
+        session_id = session_store.read_session_id(user_id, request.args.get("session_id"))
+        user_data = session_store.get_session(user_id, session_id) if session_id else None
         
         if not user_data:
             return jsonify({"success": False, "error": "User not found"}), 404
             
-        # Ensure user_data is a dictionary
-        if not isinstance(user_data, dict):
-            logger.error(f"Invalid user_data type: {type(user_data)}")
-            return jsonify({"success": False, "error": "Invalid data format in database"}), 500
-            
-        # Extract all speech entries with safe access
-        try:
-            speech_entries = user_data.get("speech_entries", [])
-            if not isinstance(speech_entries, list):
-                logger.error(f"Invalid speech_entries type: {type(speech_entries)}")
-                return jsonify({"success": False, "error": "Invalid speech entries format"}), 500
-                
-            topic = user_data.get("topic")
-            if not isinstance(topic, str):
-                logger.error(f"Invalid topic type: {type(topic)}")
-                return jsonify({"success": False, "error": "Invalid topic format"}), 500
-        except Exception as e:
-            logger.error(f"Error accessing user_data fields: {e}")
-            return jsonify({"success": False, "error": "Error accessing user data"}), 500
-        
+        # Load the session's child entries
+        speech_entries = session_store.list_speech_entries(user_id, session_id)
         if not speech_entries:
             return jsonify({"success": False, "error": "No speech entries found"}), 404
-            
-        # Combine all speech entries into one text with validation
-        try:
-            full_speech = " ".join([entry.get("text", "") for entry in speech_entries if isinstance(entry, dict)])
-        except Exception as e:
-            logger.error(f"Error combining speech entries: {e}")
-            return jsonify({"success": False, "error": "Error processing speech entries"}), 500
+        user_data["speech_entries"] = speech_entries
+        user_data["screenshots"] = session_store.list_screenshots(user_id, session_id)
         
         # Convert MongoDB ObjectId to string
         user_data["_id"] = str(user_data["_id"])
         
         # Convert datetime objects to strings for JSON serialization
-        if "screenshots" in user_data:
-            for screenshot in user_data["screenshots"]:
-                if isinstance(screenshot, dict):  # Ensure screenshot is a dictionary
-                    if "timestamp" in screenshot:
-                        screenshot["timestamp"] = screenshot["timestamp"].isoformat()
-                    # Ensure image_data is a string
-                    if "image_data" in screenshot and not isinstance(screenshot["image_data"], str):
-                        screenshot["image_data"] = str(screenshot["image_data"])
-        
-        if "speech_entries" in user_data:
-            for entry in user_data["speech_entries"]:
-                if isinstance(entry, dict) and "timestamp" in entry:
-                    entry["timestamp"] = entry["timestamp"].isoformat()
+        for field in ("started_at", "updated_at"):
+            if isinstance(user_data.get(field), datetime):
+                user_data[field] = user_data[field].isoformat()
+        if "gd_evaluation" in user_data:
+            user_data["gd_evaluation"]["timestamp"] = user_data["gd_evaluation"]["timestamp"].isoformat()
+        
+        for entry in user_data["screenshots"] + user_data["speech_entries"]:
+            if "timestamp" in entry:
+                entry["timestamp"] = entry["timestamp"].isoformat()
         
         return jsonify({
             "success": True,
@@ -350,51 +360,22 @@ def get_user_data(user_id):
 def test_speech_storage():
     """Test speech storage API."""
     try:
-        from auth import db
-        
         # Test data
         test_user_id = "test_user_123"
         test_speech = "This is a test speech entry."
         test_topic = "Test Topic"
         
-        # Get collection
-        collection = get_user_speech_collection(db)
+        # Check if test user already has a session
+        operation = "updated" if session_store.latest_session(test_user_id) else "created"
         
-        # Create test entry
-        speech_entry = {
-            "timestamp": datetime.utcnow(),
-            "text": test_speech
-        }
-        
-        # Check if test user exists
-        test_user = collection.find_one({"user_id": test_user_id})
+        session_id = session_store.resolve_session_id(test_user_id)
+        test_user = session_store.add_speech_entry(test_user_id, session_id, test_speech, test_topic)
         
         if test_user is not None:  # Changed from if test_user:
-            # Update existing user
-            result = collection.update_one(
-                {"user_id": test_user_id},
-                {
-                    "$set": {"topic": test_topic},
-                    "$push": {"speech_entries": speech_entry}
-                }
-            )
-            operation = "updated"
-        else:
-            # Create new user
-            result = collection.insert_one({
-                "user_id": test_user_id,
-                "topic": test_topic,
-                "speech_entries": [speech_entry],
-                "screenshots": []
-            })
-            operation = "created"
-            
-        # Get the result
-        test_user = collection.find_one({"user_id": test_user_id})
-        
-        if test_user is not None:  # Changed from if test_user:
-            # Remove ObjectId for JSON serialization
+            # Remove ObjectId and datetimes for JSON serialization
             test_user["_id"] = str(test_user["_id"])
+            test_user["started_at"] = test_user["started_at"].isoformat()
+            test_user["updated_at"] = test_user["updated_at"].isoformat()
             
             return jsonify({
                 "success": True,
@@ -414,13 +395,15 @@ def test_speech_storage():
 
 @user_data_bp.route('/api/user/<user_id>/gd-evaluation', methods=['GET'])
 def evaluate_gd_performance(user_id):
-    """Fetch user's GD speech and evaluate topic coverage using Qwen."""
+    """
+    Fetch user's GD speech and evaluate topic coverage using Qwen.
+    With ?async=true the evaluation is queued as a job and 202 is returned.
+    """
+    if jobs.wants_async():
+        return jobs.submit_from_request("gd_evaluation", user_id)
     try:
         logger.info(f"Received GD evaluation request for user_id: {user_id}")
         
-        from auth import db
-        logger.info("Successfully imported db from auth")
-        
         if not user_id:
             logger.error("No user_id provided")
             return jsonify({"success": False, "error": "User ID required"}), 400
@@ -432,29 +415,18 @@ def evaluate_gd_performance(user_id):
                 "error": "OpenRouter API key not configured. Please check your environment variables."
             }), 500
             
-        collection = get_user_speech_collection(db)
-        logger.info(f"Retrieved collection: {collection.name}")
-        
         # Log the query we're about to make
-        logger.info(f"Querying MongoDB for user_id: {user_id}")
-        user_data = collection.find_one({"user_id": str(user_id)})
-        
-        # Detailed logging of the response
-        logger.info(f"Type of user_data: {type(user_data)}")
-        logger.info(f"Content of user_data: {user_data}")
+        logger.info(f"Querying latest session for user_id: {user_id}")
+        session_id = session_store.read_session_id(str(user_id), request.args.get("session_id"))
+        user_data = session_store.get_session(str(user_id), session_id, {"topic": 1}) if session_id else None
         
         if not user_data:
             logger.error(f"No data found for user_id: {user_id}")
             return jsonify({"success": False, "error": "User not found"}), 404
             
-        # Ensure user_data is a dictionary
-        if not isinstance(user_data, dict):
-            logger.error(f"Invalid user_data type: {type(user_data)}")
-            return jsonify({"success": False, "error": "Invalid data format in database"}), 500
-            
-        # Extract all speech entries with safe access
+        # Extract the session's speech entries with safe access
         try:
-            speech_entries = user_data.get("speech_entries", [])
+            speech_entries = session_store.list_speech_entries(str(user_id), session_id)
             logger.info(f"Type of speech_entries: {type(speech_entries)}")
             logger.info(f"Number of speech entries: {len(speech_entries)}")
             
@@ -618,21 +590,12 @@ Respond with this exact JSON structure (no other text):
                         if evaluation_result[section]["score"] < 0 or evaluation_result[section]["score"] > 1:
                             raise ValueError(f"Score must be between 0 and 1 in {section}")
                     
-                    # Store the evaluation result in MongoDB
-                    collection.update_one(
-                        {"user_id": user_id},
-                        {
-                            "$set": {
-                                "gd_evaluation": {
-                                    "timestamp": datetime.utcnow(),
-                                    "evaluation": evaluation_result
-                                }
-                            }
-                        }
-                    )
+                    # Store the evaluation result on the session document
+                    session_store.save_gd_evaluation(str(user_id), session_id, evaluation_result)
                     
                     return jsonify({
                         "success": True,
+                        "session_id": session_id,
                         "evaluation": evaluation_result
                     })
                     
@@ -679,52 +642,60 @@ def get_user_screenshots(user_id):
     try:
         logger.info(f"Fetching screenshots for user_id: {user_id}")
         
-        from auth import db
-        logger.info("Successfully imported db from auth")
-        
         if not user_id:
             logger.error("No user_id provided")
             return jsonify({"success": False, "error": "User ID required"}), 400
             
-        collection = get_user_speech_collection(db)
-        logger.info(f"Retrieved collection: {collection.name}")
-        
-        # Log the query we're about to make
-        query = {"user_id": str(user_id)}
-        logger.info(f"Querying MongoDB with: {query}")
-        
-        # Find user's document
-        user_data = collection.find_one(query)
+        # Optional filters so callers only pull the frames they need
+        include_data = request.args.get("include_data", "false").lower() == "true"
+        limit = request.args.get("limit", type=int)
+        since = request.args.get("since")
+        if since:
+            try:
+                since = datetime.fromisoformat(since)
+            except ValueError:
+                return jsonify({"success": False, "error": f"Invalid since timestamp: {since}"}), 400
         
-        # Log the result
-        logger.info(f"Query result: {user_data}")
+        session_id = session_store.read_session_id(str(user_id), request.args.get("session_id"))
+        logger.info(f"Querying screenshots for session: {session_id}")
         
-        if not user_data:
+        if not session_id:
             logger.error(f"No data found for user_id: {user_id}")
-            # Let's check if the user exists in any format
-            all_users = list(collection.find({}, {"user_id": 1}))
-            logger.info(f"Available users in database: {all_users}")
             return jsonify({
                 "success": False, 
                 "error": "User not found",
                 "debug_info": {
-                    "searched_user_id": user_id,
-                    "available_users": [user.get("user_id") for user in all_users]
+                    "searched_user_id": user_id
                 }
             }), 404
             
-        # Get screenshots array from user data
-        screenshots = user_data.get("screenshots", [])
+        # Screenshot metadata for the session only
+        screenshots = session_store.list_screenshots(
+            str(user_id), session_id,
+            since=since or None,
+            limit=limit
+        )
         logger.info(f"Found {len(screenshots)} screenshots for user")
         
-        # Convert datetime objects to ISO format strings for JSON serialization
         for screenshot in screenshots:
-            if isinstance(screenshot, dict) and "timestamp" in screenshot:
+            if not isinstance(screenshot, dict):
+                continue
+            if include_data:
+                # Fetch the image bytes only for the frames being returned
+                screenshot["image_data"] = encode_data_url(
+                    load_screenshot_bytes(screenshot),
+                    screenshot.get("content_type", "image/jpeg")
+                )
+            else:
+                screenshot.pop("image_data", None)
+            # Convert datetime objects to ISO format strings for JSON serialization
+            if "timestamp" in screenshot:
                 screenshot["timestamp"] = screenshot["timestamp"].isoformat()
         
         return jsonify({
             "success": True,
             "data": {
+                "session_id": session_id,
                 "screenshots": screenshots
             }
         })
@@ -734,19 +705,32 @@ def get_user_screenshots(user_id):
         logger.error(f"Full traceback: {traceback.format_exc()}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@user_data_bp.route('/api/user/<user_id>/screenshots/<screenshot_id>/image', methods=['GET'])
+def get_screenshot_image(user_id, screenshot_id):
+    """Serve the raw image bytes of a single screenshot from the blob store."""
+    try:
+        screenshot = session_store.find_screenshot(str(user_id), screenshot_id)
+        if not screenshot:
+            return jsonify({"success": False, "error": "Screenshot not found"}), 404
+            
+        image_bytes = load_screenshot_bytes(screenshot)
+        return send_file(
+            io.BytesIO(image_bytes),
+            mimetype=screenshot.get("content_type", "image/jpeg")
+        )
+        
+    except KeyError:
+        return jsonify({"success": False, "error": "Screenshot data missing from blob store"}), 404
+    except Exception as e:
+        logger.error(f"Error fetching screenshot image: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @user_data_bp.route('/api/user/speaking-time', methods=['POST'])
 def store_speaking_time():
     """Store user's speaking time data in MongoDB."""
     try:
         logger.info("Speaking time storage request received")
         
-        try:
-            from auth import db
-            logger.info("Successfully imported db from auth")
-        except ImportError as ie:
-            logger.error(f"Failed to import db from auth: {ie}")
-            return jsonify({"success": False, "error": "Server configuration error"}), 500
-        
         data = request.get_json()
         logger.info(f"Received data: {data}")
         
@@ -761,25 +745,11 @@ def store_speaking_time():
             logger.error("Missing required data")
             return jsonify({"success": False, "error": "Missing required data"}), 400
             
-        collection = get_user_speech_collection(db)
-        logger.info(f"Retrieved collection: {collection.name}")
-        
         # Create speaking time entry
-        speaking_time_entry = {
-            "timestamp": datetime.utcnow(),
-            "user_id": user_id,
-            "session_id": session_id,
-            "speaking_duration": speaking_duration,
-            "total_duration": total_duration,
-            "percentage": (speaking_duration / total_duration * 100) if total_duration > 0 else 0
-        }
+        speaking_time_entry = build_speaking_time_entry(speaking_duration, total_duration)
         
-        # Update or insert the speaking time entry
-        result = collection.update_one(
-            {"user_id": user_id, "session_id": session_id},
-            {"$set": speaking_time_entry},
-            upsert=True
-        )
+        # Queue the latest sample for the session document
+        write_buffer.add(user_id, str(session_id), speaking_time=speaking_time_entry)
         
         logger.info(f"Successfully stored speaking time entry")
         
@@ -794,25 +764,42 @@ def store_speaking_time():
         traceback.print_exc()
         return jsonify({"success": False, "error": str(e)}), 500
 
+@user_data_bp.route('/api/user/<user_id>/text-stats', methods=['GET'])
+def get_text_stats(user_id):
+    """
+    Readability and repetition from the running text statistics.
+    ?scope=user merges every session; otherwise the session in ?session_id
+    (or the latest one) is used.
+    """
+    try:
+        if request.args.get("scope") == "user":
+            session_id = None
+            stats = text_stats.get_stats(user_id)
+        else:
+            session_id = session_store.read_session_id(user_id, request.args.get("session_id"))
+            if not session_id:
+                return jsonify({"success": False, "error": "No session found for this user"}), 404
+            stats = text_stats.get_stats(user_id, session_id)
+        
+        return jsonify({
+            "success": True,
+            "session_id": session_id,
+            "stats": text_stats.scores(stats)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting text stats: {e}")
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @user_data_bp.route('/api/user/speaking-stats/<user_id>', methods=['GET'])
 def get_speaking_stats(user_id):
     """Get user's speaking time statistics."""
     try:
         logger.info(f"Getting speaking stats for user {user_id}")
         
-        try:
-            from auth import db
-        except ImportError as ie:
-            logger.error(f"Failed to import db from auth: {ie}")
-            return jsonify({"success": False, "error": "Server configuration error"}), 500
-        
-        collection = get_user_speech_collection(db)
-        
-        # Get all speaking time entries for the user
-        entries = list(collection.find(
-            {"user_id": user_id},
-            {"speaking_duration": 1, "total_duration": 1, "percentage": 1, "_id": 0}
-        ))
+        # Get the speaking time entry of every session of the user
+        entries = session_store.list_speaking_times(user_id)
         
         if not entries:
             return jsonify({
@@ -840,7 +827,7 @@ def get_speaking_stats(user_id):
 # def list_all_users():
     """List all users in the database."""
     try:
-        from auth import db
+        db = get_db()
         collection = get_user_speech_collection(db)
         
         # Get all users with their IDs
@@ -862,114 +849,37 @@ def get_speaking_stats(user_id):
         return jsonify({"success": False, "error": str(e)}), 500
     
 def evaluate_text_speech(text_list):
-    tool = language_tool_python.LanguageTool('en-US')
-    readability_scores = []
-    grammar_scores = []
-    repetitiveness_scores = []
-    
-    for text in text_list:
-        if not text.strip():  # Check for empty text
-            readability_scores.append(0)
-            grammar_scores.append(0)
-            repetitiveness_scores.append(0)
-            continue
-        
-        # Readability Score (Flesch-Kincaid Index)
-        readability = textstat.flesch_reading_ease(text)
-        if readability > 70:
-            readability_score = 100
-        elif 50 <= readability <= 70:
-            readability_score = 70
-        else:
-            readability_score = 40
-        readability_scores.append(readability_score)
-        
-        # Grammar & Spelling Check
-        matches = tool.check(text)
-        num_errors = len(matches)
-        if num_errors == 0:
-            grammar_score = 100
-        elif num_errors <= 5:
-            grammar_score = 80
-        elif num_errors <= 10:
-            grammar_score = 60
-        else:
-            grammar_score = 40
-        grammar_scores.append(grammar_score)
-        
-        # Repetitiveness Detection
-        words = text.lower().split()
-        word_counts = Counter(words)
-        repeated_words = {word: count for word, count in word_counts.items() if count > 3}
-        repetitiveness = len(repeated_words)
-        
-        if repetitiveness == 0:
-            repetitiveness_score = 100
-        elif repetitiveness <= 3:
-            repetitiveness_score = 80
-        elif repetitiveness <= 6:
-            repetitiveness_score = 60
-        else:
-            repetitiveness_score = 40
-        repetitiveness_scores.append(repetitiveness_score)
-    
-    # Final Percentage Scores
-    final_readability = sum(readability_scores) / len(text_list)
-    final_grammar = sum(grammar_scores) / len(text_list)
-    final_repetitiveness = sum(repetitiveness_scores) / len(text_list)
-    
-    return {
-        "final_readability_score": final_readability,
-        "final_grammar_score": final_grammar,
-        "final_repetitiveness_score": final_repetitiveness
-    }
+    """Score a list of texts from scratch (stored sessions use speech_scoring.session_scores)."""
+    return speech_scoring.aggregate_scores(speech_scoring.score_texts(text_list))
     
 @user_data_bp.route('/api/grammar/<user_id>', methods=['GET'])
 def get_grammar_scores(user_id):
+    if jobs.wants_async():
+        return jobs.submit_from_request("grammar", user_id)
     try:
         logger.info(f"Received request for grammar scores for user_id: {user_id}")
         
-        # Get user's text data from the database
-        from auth import db
-        logger.info("Successfully imported db from auth")
-
-        
-        collection = get_user_speech_collection(db)
-        logger.info(f"Querying speech collection for user_id: {user_id}")
-        
-        # Find the user document
-        user_doc = collection.find_one({"user_id": str(user_id)})
-        if not user_doc:
-            logger.info(f"No user document found for user_id: {user_id}")
-            return jsonify({
-                "final_readability_score": 0,
-                "final_grammar_score": 0,
-                "final_repetitiveness_score": 0
-            })
-        
-        # Extract texts from speech_entries
-        user_texts = []
-        if "speech_entries" in user_doc and isinstance(user_doc["speech_entries"], list):
-            for entry in user_doc["speech_entries"]:
-                if isinstance(entry, dict) and "text" in entry:
-                    user_texts.append(entry["text"])
-        
-        logger.info(f"Extracted {len(user_texts)} texts from speech entries")
+        # Get the session's text data from the database
+        session_id = session_store.read_session_id(str(user_id), request.args.get("session_id"))
+        logger.info(f"Querying speech entries for user_id: {user_id}, session: {session_id}")
         
-        if not user_texts:
-            logger.info(f"No speech texts found for user_id: {user_id}")
+        if not session_id:
+            logger.info(f"No session found for user_id: {user_id}")
             return jsonify({
                 "final_readability_score": 0,
                 "final_grammar_score": 0,
                 "final_repetitiveness_score": 0
             })
         
-        # Evaluate the texts
+        # Aggregate the stored per-entry scores, scoring only new entries
         logger.info("Starting text evaluation")
-        scores = evaluate_text_speech(user_texts)
+        scores = speech_scoring.session_scores(str(user_id), session_id)
         logger.info(f"Evaluation complete. Scores: {scores}")
         
         return jsonify(scores)
+    except GrammarEngineBusy as e:
+        logger.warning(f"Grammar engine busy: {e}")
+        return jsonify({"success": False, "error": str(e)}), 503
     except Exception as e:
         logger.error(f"Error in grammar evaluation: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
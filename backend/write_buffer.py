@@ -0,0 +1,356 @@
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
+import atexit
+import os
+import threading
+import time
+import logging
+from dotenv import load_dotenv
+from database import get_collection
+import session_store
+import text_stats
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# "async": requests only enqueue and a background thread flushes.
+# "sync":  write-through fallback, every enqueue is flushed before returning.
+WRITE_BUFFER_MODE = os.getenv("WRITE_BUFFER_MODE", "async")
+WRITE_BUFFER_MAX_BATCH = int(os.getenv("WRITE_BUFFER_MAX_BATCH", "200"))
+WRITE_BUFFER_FLUSH_MS = int(os.getenv("WRITE_BUFFER_FLUSH_MS", "500"))
+WRITE_BUFFER_MAX_RETRIES = int(os.getenv("WRITE_BUFFER_MAX_RETRIES", "3"))
+
+
+def _bulk_insert(collection_name, ops):
+    """
+    Unordered bulk insert that treats duplicate ids from a retried flush as written.
+
+    Returns:
+        Tuple[int, Set[int]]: Inserted count and the indexes of ops that were
+        already written by an earlier attempt
+    """
+    try:
+        return get_collection(collection_name, "ingest").bulk_write(ops, ordered=False).inserted_count, set()
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if all(error.get("code") == 11000 for error in errors):
+            return e.details.get("nInserted", 0), {error["index"] for error in errors}
+        raise
+
+
+class _PartialFlush(Exception):
+    """Some session updates of a flush failed; only their groups may be written again."""
+
+    def __init__(self, failed, summary, error):
+        super().__init__(str(error))
+        self.failed = failed
+        self.summary = summary
+        self.error = error
+
+
+class _PendingSession:
+    """Writes queued for one (user_id, session_id), merged until the next flush."""
+
+    def __init__(self):
+        self.topic = None
+        self.speech = []
+        self.screenshots = []
+        self.speaking_time = None       # last absolute sample wins
+        self.speaking_time_inc = {}     # summed batch durations since that sample
+        self.attempts = 0
+
+    @property
+    def op_count(self):
+        return len(self.speech) + len(self.screenshots) + (1 if self.speaking_time else 0) + \
+            (1 if self.speaking_time_inc else 0)
+
+    def merge(self, newer):
+        """Merge writes queued after this group, keeping arrival order."""
+        self.topic = newer.topic or self.topic
+        self.speech = self.speech + newer.speech
+        self.screenshots = self.screenshots + newer.screenshots
+        if newer.speaking_time:
+            self.set_speaking_time(newer.speaking_time)
+        self.add_speaking_time_inc(newer.speaking_time_inc)
+
+    def set_speaking_time(self, sample):
+        """Replace the totals with an absolute sample; earlier increments are superseded."""
+        self.speaking_time = sample
+        self.speaking_time_inc = {}
+
+    def speaking_time_fields(self):
+        """
+        The session update for the queued speaking time: ($set fields, $inc fields).
+        Increments that arrived after an absolute sample are added onto it.
+        """
+        if self.speaking_time:
+            speaking_time = dict(self.speaking_time)
+            if self.speaking_time_inc:
+                for key in ("speaking_duration", "total_duration"):
+                    speaking_time[key] = speaking_time.get(key, 0) + self.speaking_time_inc.get(key, 0)
+                speaking_time["timestamp"] = self.speaking_time_inc.get("timestamp", speaking_time.get("timestamp"))
+                total = speaking_time["total_duration"]
+                speaking_time["percentage"] = (speaking_time["speaking_duration"] / total * 100) if total > 0 else 0
+            return {"speaking_time": speaking_time}, {}
+        if self.speaking_time_inc:
+            return {"speaking_time.timestamp": self.speaking_time_inc.get("timestamp")}, {
+                "speaking_time.speaking_duration": self.speaking_time_inc.get("speaking_duration", 0),
+                "speaking_time.total_duration": self.speaking_time_inc.get("total_duration", 0),
+            }
+        return {}, {}
+
+    def add_speaking_time_inc(self, sample):
+        """Add a batch speaking-time sample's durations to the running totals."""
+        for key, value in (sample or {}).items():
+            if key == "timestamp":
+                self.speaking_time_inc[key] = value
+            else:
+                self.speaking_time_inc[key] = self.speaking_time_inc.get(key, 0) + value
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces high-frequency ingestion writes (speech fragments, screenshot
+    metadata, speaking time) per user/session and flushes them with bulk
+    writes when the batch size or flush interval is reached, and on shutdown.
+    """
+
+    def __init__(self, mode=WRITE_BUFFER_MODE, max_batch=WRITE_BUFFER_MAX_BATCH,
+                 flush_interval=WRITE_BUFFER_FLUSH_MS / 1000.0, max_retries=WRITE_BUFFER_MAX_RETRIES):
+        if mode not in ("async", "sync"):
+            raise ValueError(f"Unknown write buffer mode: {mode}")
+        self.mode = mode
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._pending = {}
+        self._pending_ops = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self._stats = {
+            "enqueued": 0,
+            "flushes": 0,
+            "written_speech": 0,
+            "written_screenshots": 0,
+            "written_sessions": 0,
+            "failed_flushes": 0,
+            "dropped": 0,
+        }
+
+    def add(self, user_id, session_id, topic=None, speech=(), screenshots=(),
+            speaking_time=None, speaking_time_inc=None):
+        """
+        Queue writes for one session.
+
+        Returns:
+            Optional[Dict]: The flush summary in sync mode, None in async mode
+        """
+        with self._lock:
+            group = self._pending.setdefault((user_id, session_id), _PendingSession())
+            before = group.op_count
+            group.topic = topic or group.topic
+            # Ids are assigned at enqueue time so a retried flush can't insert twice
+            group.speech.extend({"_id": ObjectId(), **entry} for entry in speech)
+            group.screenshots.extend({"_id": ObjectId(), **entry} for entry in screenshots)
+            if speaking_time:
+                group.set_speaking_time(speaking_time)
+            group.add_speaking_time_inc(speaking_time_inc)
+            added = group.op_count - before
+            self._pending_ops += added
+            self._stats["enqueued"] += max(added, 0)
+            should_flush = self._pending_ops >= self.max_batch
+            if self.mode == "async" and should_flush:
+                self._wakeup.notify()
+
+        if self.mode == "sync" or self._closed:
+            return self.flush()
+        self._ensure_thread()
+        return None
+
+    def flush(self, user_id=None, session_id=None):
+        """
+        Write everything queued so far, or only the writes of one session when
+        user_id and session_id are given. Returns a summary of the write results.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if user_id is None:
+                    groups, self._pending = self._pending, {}
+                    self._pending_ops = 0
+                else:
+                    groups = {
+                        key: self._pending.pop(key) for key in list(self._pending)
+                        if (str(key[0]), str(key[1])) == (str(user_id), str(session_id))
+                    }
+                    self._pending_ops -= sum(group.op_count for group in groups.values())
+            if not groups:
+                return {"speech": 0, "screenshots": 0, "sessions": 0}
+            try:
+                summary = self._write(groups)
+            except _PartialFlush as e:
+                # The other groups' counters were applied; retrying them would add them twice
+                logger.error(f"Write-behind flush failed for {len(e.failed)} of {len(groups)} sessions: {e.error}")
+                with self._lock:
+                    self._stats["failed_flushes"] += 1
+                    self._stats["written_speech"] += e.summary["speech"]
+                    self._stats["written_screenshots"] += e.summary["screenshots"]
+                    self._stats["written_sessions"] += e.summary["sessions"]
+                if self.mode == "sync":
+                    raise e.error
+                self._requeue({key: groups[key] for key in e.failed})
+                return None
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+                with self._lock:
+                    self._stats["failed_flushes"] += 1
+                if self.mode == "sync":
+                    # The caller sees the error and can retry; don't write it twice
+                    raise
+                self._requeue(groups)
+                return None
+            with self._lock:
+                self._stats["flushes"] += 1
+                self._stats["written_speech"] += summary["speech"]
+                self._stats["written_screenshots"] += summary["screenshots"]
+                self._stats["written_sessions"] += summary["sessions"]
+            return summary
+
+    def _write(self, groups):
+        speech_ops, screenshot_ops, session_ops = [], [], []
+        speech_owners, session_keys = [], []
+        for (user_id, session_id), group in groups.items():
+            owner = {"user_id": user_id, "session_id": session_id}
+            speech_ops.extend(InsertOne({**owner, **entry}) for entry in group.speech)
+            speech_owners.extend((user_id, session_id, entry.get("text", "")) for entry in group.speech)
+            # Screenshots upsert on (user_id, screenshot_id) because background
+            # analysis may already have written the frame's analysis result
+            screenshot_ops.extend(
+                UpdateOne(
+                    {"user_id": user_id, "screenshot_id": entry["screenshot_id"]},
+                    {
+                        "$set": {"session_id": session_id, **{k: v for k, v in entry.items() if k != "_id"}},
+                        "$setOnInsert": {"_id": entry["_id"]},
+                    },
+                    upsert=True
+                )
+                for entry in group.screenshots
+            )
+
+            inc = {}
+            if group.speech:
+                inc["speech_count"] = len(group.speech)
+            if group.screenshots:
+                inc["screenshot_count"] = len(group.screenshots)
+            set_fields, speaking_time_inc = group.speaking_time_fields()
+            inc.update(speaking_time_inc)
+            session_ops.append(UpdateOne(
+                owner, session_store.session_update(group.topic, inc, set_fields), upsert=True
+            ))
+            session_keys.append((user_id, session_id))
+
+        summary = {"speech": 0, "screenshots": 0, "sessions": 0}
+        # Child entries first so a session counter never runs ahead of its entries
+        if speech_ops:
+            summary["speech"], already_written = _bulk_insert(session_store.SPEECH_ENTRIES, speech_ops)
+            self._record_text_stats(
+                owner for index, owner in enumerate(speech_owners) if index not in already_written
+            )
+        if screenshot_ops:
+            result = get_collection(session_store.SCREENSHOTS, "ingest").bulk_write(screenshot_ops, ordered=False)
+            summary["screenshots"] = result.upserted_count + result.matched_count
+        if session_ops:
+            try:
+                result = get_collection(session_store.SESSIONS, "ingest").bulk_write(session_ops, ordered=False)
+            except BulkWriteError as e:
+                # Counters are $inc'ed, so only the sessions whose update failed are retried
+                failed = {session_keys[error["index"]] for error in e.details.get("writeErrors", [])}
+                summary["sessions"] = e.details.get("nUpserted", 0) + e.details.get("nModified", 0)
+                raise _PartialFlush(failed, summary, e)
+            summary["sessions"] = result.upserted_count + result.modified_count
+        return summary
+
+    @staticmethod
+    def _record_text_stats(inserted):
+        """
+        Add newly inserted entries to the running text statistics. Entries a
+        retried flush finds already written are skipped so nothing is counted
+        twice; a failure here is logged rather than retried for the same reason.
+        """
+        texts = {}
+        for user_id, session_id, text in inserted:
+            texts.setdefault((user_id, session_id), []).append(text)
+        ops = [op for (user_id, session_id), session_texts in texts.items()
+               for op in text_stats.record_ops(user_id, session_id, session_texts)]
+        if not ops:
+            return
+        try:
+            get_collection(text_stats.TEXT_STATS, "ingest").bulk_write(ops, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to update text statistics: {e}")
+
+    def _requeue(self, groups):
+        """Put failed groups back in front of newer writes, up to max_retries."""
+        with self._lock:
+            for key, group in groups.items():
+                group.attempts += 1
+                if group.attempts > self.max_retries:
+                    logger.error(f"Dropping {group.op_count} buffered writes for {key} after {group.attempts} attempts")
+                    self._stats["dropped"] += group.op_count
+                    continue
+                if key in self._pending:
+                    group.merge(self._pending.pop(key))
+                self._pending[key] = group
+            self._pending_ops = sum(g.op_count for g in self._pending.values())
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._closed:
+            with self._lock:
+                if self._pending_ops < self.max_batch:
+                    self._wakeup.wait(self.flush_interval)
+                pending_ops = self._pending_ops
+            if pending_ops and self.flush() is None:
+                # Back off briefly after a failed flush before retrying
+                time.sleep(self.flush_interval)
+
+    def close(self):
+        """Stop the flusher thread and write everything still queued."""
+        self._closed = True
+        with self._lock:
+            self._wakeup.notify_all()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout=self.flush_interval * 4)
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "pending_ops": self._pending_ops,
+                "pending_sessions": len(self._pending),
+                **self._stats,
+            }
+
+
+# Process-wide buffer shared by the ingestion endpoints
+write_buffer = WriteBehindBuffer()
+atexit.register(write_buffer.close)
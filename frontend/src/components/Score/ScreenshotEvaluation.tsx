@@ -1,5 +1,4 @@
 import React, { useEffect, useState } from 'react';
-import axios from 'axios';
 
 interface AttentionMetrics {
   eyes_closed_count: number;
@@ -20,13 +19,37 @@ interface ScreenshotSummary {
   total_screenshots: number;
   valid_screenshots: number;
   attention_metrics: AttentionMetrics;
-  attention_score: AttentionScore;
+  attention_score?: AttentionScore;
 }
 
+interface FrameEvent {
+  type: 'frame';
+  index: number;
+}
+
+interface SummaryEvent {
+  type: 'summary';
+  summary: ScreenshotSummary;
+}
+
+interface ResultEvent {
+  type: 'result';
+  user_id: string;
+  session_id: string;
+  summary: ScreenshotSummary;
+}
+
+interface ErrorEvent {
+  type: 'error';
+  error: string;
+}
+
+type EvaluationEvent = FrameEvent | SummaryEvent | ResultEvent | ErrorEvent;
+
 interface EvaluationData {
   _id: string;
   user_id: string;
-  screenshots: Array<{
+  screenshots?: Array<{
     analysis?: {
       face_detection: FaceDetection;
       "Left Eye Status": string;
@@ -52,24 +75,75 @@ const ScreenshotEvaluation: React.FC<{ userId: string }> = ({ userId }) => {
   const [evaluationData, setEvaluationData] = useState<EvaluationData | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [framesAnalyzed, setFramesAnalyzed] = useState(0);
+  const [streaming, setStreaming] = useState(true);
 
   useEffect(() => {
+    const controller = new AbortController();
+
+    // Frames and running summaries arrive as NDJSON lines while the session is analyzed
+    const handleEvent = (event: EvaluationEvent) => {
+      if (event.type === 'frame') {
+        setFramesAnalyzed(event.index + 1);
+      } else if (event.type === 'summary') {
+        setEvaluationData((previous) => ({
+          _id: '',
+          user_id: userId,
+          ...previous,
+          summary: event.summary,
+        }));
+        setLoading(false);
+      } else if (event.type === 'result') {
+        setEvaluationData({ _id: '', user_id: event.user_id, summary: event.summary });
+        setStreaming(false);
+        setLoading(false);
+      } else if (event.type === 'error') {
+        setError('Failed to fetch evaluation data');
+        setLoading(false);
+      }
+    };
+
     const fetchEvaluation = async () => {
       try {
-        const response = await axios.get(`/api/screenshots/evaluate/${userId}`);
-        setEvaluationData(response.data);
+        const response = await fetch(`/api/screenshots/evaluate/${userId}?stream=ndjson`, {
+          headers: { Accept: 'application/x-ndjson' },
+          signal: controller.signal,
+        });
+        if (!response.ok || !response.body) {
+          throw new Error(`HTTP ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffered += decoder.decode(value, { stream: true });
+          const lines = buffered.split('\n');
+          buffered = lines.pop() ?? '';
+          lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+        }
+        if (buffered.trim()) {
+          handleEvent(JSON.parse(buffered));
+        }
+        setStreaming(false);
         setLoading(false);
       } catch (err) {
+        if (controller.signal.aborted) return;
         setError('Failed to fetch evaluation data');
         setLoading(false);
       }
     };
 
     fetchEvaluation();
+    return () => controller.abort();
   }, [userId]);
 
   const calculateScores = () => {
-    if (!evaluationData) return { eyeScore: 0, faceScore: 0, averageScore: 0 };
+    if (!evaluationData || evaluationData.summary.total_screenshots === 0) {
+      return { eyeScore: 0, faceScore: 0, averageScore: 0 };
+    }
 
     const totalScreenshots = evaluationData.summary.total_screenshots;
     const eyesClosedCount = evaluationData.summary.attention_metrics.eyes_closed_count;
@@ -116,6 +190,9 @@ const ScreenshotEvaluation: React.FC<{ userId: string }> = ({ userId }) => {
       <h2 className="text-3xl font-bold text-gray-800 mb-8 text-center">
         Screenshot Evaluation Results
       </h2>
+      {streaming && (
+        <p className="text-gray-500 text-center mb-6">Analyzing screenshots... {framesAnalyzed} processed</p>
+      )}
       
       <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
         <div className="bg-white p-6 rounded-xl shadow-md border border-gray-100 hover:shadow-lg transition-shadow duration-300">
@@ -12,6 +12,9 @@ declare global {
 import React, { useState, useEffect, useCallback, useRef } from "react";
 import { Mic, MicOff, Save, AlertCircle, Hand } from "lucide-react";
 
+// A spoken turn falls back to /llm + /tts when no audio arrives within this long
+const SPOKEN_TURN_TIMEOUT_MS = 15000;
+
 interface SpeechToTextProps {
   sessionId?: string;
   participantId?: string;
@@ -294,45 +297,35 @@ const SpeechToText: React.FC<SpeechToTextProps> = ({
             console.log('Speaking time before saving:', totalSpeakingTimeRef.current);
             console.log('Total duration:', totalDuration);
 
-            // Store speech text
-            const speechResponse = await fetch('http://localhost:8080/api/user/speech', {
+            // Store speech text and speaking time in a single batch request
+            const batchResponse = await fetch('http://localhost:8080/api/user/speech/batch', {
               method: 'POST',
               headers: {
                 'Content-Type': 'application/json',
               },
               body: JSON.stringify({
                 user_id: user.user_id,
-                text: speechText.trim(),
-                topic: topic
+                session_id: sessionId,
+                topic: topic,
+                entries: [
+                  {
+                    text: speechText.trim(),
+                    timestamp: new Date().toISOString()
+                  }
+                ],
+                speaking_time: {
+                  speaking_duration: totalSpeakingTimeRef.current,
+                  total_duration: totalDuration
+                }
               }),
             });
 
-            if (!speechResponse.ok) {
-              const errorData = await speechResponse.json();
+            if (!batchResponse.ok) {
+              const errorData = await batchResponse.json();
               console.error('Error saving speech to database:', errorData);
               setError('Failed to save speech to database');
             }
 
-            // Store speaking time
-            const speakingTimeResponse = await fetch('http://localhost:8080/api/user/speaking-time', {
-              method: 'POST',
-              headers: {
-                'Content-Type': 'application/json',
-              },
-              body: JSON.stringify({
-                user_id: user.user_id,
-                session_id: sessionId || Date.now().toString(),
-                speaking_duration: totalSpeakingTimeRef.current,
-                total_duration: totalDuration
-              }),
-            });
-
-            if (!speakingTimeResponse.ok) {
-              const errorData = await speakingTimeResponse.json();
-              console.error('Error saving speaking time to database:', errorData);
-              setError('Failed to save speaking time to database');
-            }
-
             console.log('Successfully saved speech and speaking time to database');
           } catch (dbError) {
             console.error('Error saving to database:', dbError);
@@ -356,6 +349,135 @@ const SpeechToText: React.FC<SpeechToTextProps> = ({
     }
   };
 
+  // Fetch a pre-generated opener for the topic; null when none is ready yet
+  const fetchOpener = async (endpoint: 'llm1' | 'llm2') => {
+    try {
+      const response = await fetch(
+        `http://localhost:8080/api/openers/${endpoint}?topic=${encodeURIComponent(topic)}`
+      );
+      if (!response.ok) {
+        return null;
+      }
+      const opener = await response.json();
+      return opener.success ? opener : null;
+    } catch (error) {
+      console.warn('Could not fetch a ready opener, generating one instead:', error);
+      return null;
+    }
+  };
+
+  const canStreamSpeech = () =>
+    typeof MediaSource !== 'undefined' && MediaSource.isTypeSupported('audio/mpeg');
+
+  // Start a spoken turn via /speak, which streams one MP3 segment per
+  // sentence as soon as it is synthesized. Segments are appended to a
+  // MediaSource, so playback can start after the first sentence. Resolves
+  // once the first segment has arrived; `reply` resolves with the full text.
+  // The stream is read right away and segments wait for the MediaSource to
+  // open, which only happens once the caller attaches `audioUrl` to an audio
+  // element. Rejects if no segment arrives within SPOKEN_TURN_TIMEOUT_MS.
+  const startSpokenTurn = (endpoint: 'llm1' | 'llm2', body: object) =>
+    new Promise<{ audioUrl: string; firstSentence: string; reply: Promise<string> }>((resolve, reject) => {
+      const mediaSource = new MediaSource();
+      const audioUrl = URL.createObjectURL(mediaSource);
+      const controller = new AbortController();
+      let resolveReply: (reply: string) => void = () => {};
+      let rejectReply: (error: unknown) => void = () => {};
+      const reply = new Promise<string>((res, rej) => {
+        resolveReply = res;
+        rejectReply = rej;
+      });
+
+      const segments: Uint8Array[] = [];
+      let sourceBuffer: SourceBuffer | null = null;
+      let finished = false;
+      let started = false;
+
+      const appendNext = () => {
+        if (!sourceBuffer || sourceBuffer.updating) return;
+        const segment = segments.shift();
+        if (segment) {
+          sourceBuffer.appendBuffer(segment);
+        } else if (finished && mediaSource.readyState === 'open') {
+          mediaSource.endOfStream();
+        }
+      };
+
+      mediaSource.addEventListener('sourceopen', () => {
+        sourceBuffer = mediaSource.addSourceBuffer('audio/mpeg');
+        sourceBuffer.mode = 'sequence';
+        sourceBuffer.addEventListener('updateend', appendNext);
+        appendNext();
+      });
+
+      const firstSegmentTimeout = setTimeout(() => {
+        controller.abort(new Error(`No audio within ${SPOKEN_TURN_TIMEOUT_MS}ms`));
+      }, SPOKEN_TURN_TIMEOUT_MS);
+
+      (async () => {
+        try {
+          const response = await fetch(`http://localhost:8080/api/${endpoint}/speak`, {
+            method: 'POST',
+            headers: {
+              'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(body),
+            signal: controller.signal,
+          });
+          if (!response.ok || !response.body) {
+            throw new Error(`Speech stream error: ${response.status}`);
+          }
+
+          const reader = response.body.getReader();
+          const decoder = new TextDecoder();
+          let buffered = '';
+          while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop() || '';
+            for (const line of lines) {
+              if (!line.trim()) continue;
+              const event = JSON.parse(line);
+              if (event.type === 'audio' && !['audio/mp3', 'audio/mpeg'].includes(event.mimetype)) {
+                // Offline-voice (WAV) segments can't join an MP3 MediaSource
+                console.warn(`Skipping ${event.mimetype} segment: ${event.text}`);
+              } else if (event.type === 'audio') {
+                segments.push(Uint8Array.from(atob(event.audio), (c) => c.charCodeAt(0)));
+                appendNext();
+                if (!started) {
+                  started = true;
+                  clearTimeout(firstSegmentTimeout);
+                  resolve({ audioUrl, firstSentence: event.text, reply });
+                }
+              } else if (event.type === 'audio_error') {
+                console.warn(`Skipping sentence without audio: ${event.text}`);
+              } else if (event.type === 'done') {
+                resolveReply(event.response);
+              } else if (event.type === 'error') {
+                throw new Error(event.error);
+              }
+            }
+          }
+          if (!started) {
+            throw new Error('No audio received');
+          }
+        } catch (error) {
+          if (started) {
+            rejectReply(error);
+          } else {
+            clearTimeout(firstSegmentTimeout);
+            URL.revokeObjectURL(audioUrl);
+            reject(controller.signal.aborted ? controller.signal.reason ?? error : error);
+          }
+        } finally {
+          finished = true;
+          appendNext();
+        }
+      })();
+    });
+
   const sendToLLM = async (text: string) => {
     try {
       // If user has raised hand or is currently speaking, don't allow LLM to speak
@@ -389,34 +511,56 @@ const SpeechToText: React.FC<SpeechToTextProps> = ({
         conversation_history: conversationHistoryRef.current 
       });
 
-      const response = await fetch(`http://localhost:8080/api/${endpoint}/llm`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ 
-          text,
-          topic,
-          is_initial_message: text.includes("Let's begin the discussion"),
-          is_user_message: isHandRaised,
-          from_llm1: endpoint === 'llm2'
-        }),
-      });
+      const isInitialMessage = text.includes("Let's begin the discussion");
 
-      const responseText = await response.text();
-      console.log('Raw response:', response);
+      const requestBody = { 
+        text,
+        topic,
+        is_initial_message: isInitialMessage,
+        is_user_message: isHandRaised,
+        from_llm1: endpoint === 'llm2'
+      };
 
-      let data;
-      try {
-        data = JSON.parse(responseText);
-      } catch (e) {
-        console.error('Failed to parse response as JSON:', e);
-        throw new Error(`Invalid JSON response: ${responseText}`);
+      // The opening turn is usually pre-generated, audio included
+      let data = isInitialMessage ? await fetchOpener(endpoint) : null;
+
+      // Otherwise speak the reply sentence by sentence while it is generated
+      let streamedAudioUrl: string | null = null;
+      let streamedReply: Promise<string> | null = null;
+      if (!data && canStreamSpeech()) {
+        try {
+          const turn = await startSpokenTurn(endpoint, requestBody);
+          streamedAudioUrl = turn.audioUrl;
+          streamedReply = turn.reply;
+          data = { success: true, response: turn.firstSentence };
+        } catch (streamError) {
+          console.warn('Streamed speech failed, falling back to a full reply:', streamError);
+        }
       }
 
-      if (!response.ok) {
-        console.error(`LLM API error response:`, data);
-        throw new Error(`LLM API error: ${response.status} - ${data.error || responseText}`);
+      if (!data) {
+        const response = await fetch(`http://localhost:8080/api/${endpoint}/llm`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify(requestBody),
+        });
+
+        const responseText = await response.text();
+        console.log('Raw response:', response);
+
+        try {
+          data = JSON.parse(responseText);
+        } catch (e) {
+          console.error('Failed to parse response as JSON:', e);
+          throw new Error(`Invalid JSON response: ${responseText}`);
+        }
+
+        if (!response.ok) {
+          console.error(`LLM API error response:`, data);
+          throw new Error(`LLM API error: ${response.status} - ${data.error || responseText}`);
+        }
       }
       
       if (!data.success) {
@@ -442,28 +586,38 @@ const SpeechToText: React.FC<SpeechToTextProps> = ({
       console.log(`Successfully received response from ${endpoint}:`, data.response);
 
       // Update conversation history with AI response
-      updateConversationHistory("assistant", data.response);
+      if (streamedReply) {
+        streamedReply
+          .then((reply) => updateConversationHistory("assistant", reply))
+          .catch((replyError) => console.error('Streamed reply failed:', replyError));
+      } else {
+        updateConversationHistory("assistant", data.response);
+      }
 
       // Get and play the TTS audio
       try {
-        console.log(`Requesting TTS from ${endpoint}`);
-        const audioResponse = await fetch(`http://localhost:8080/api/${endpoint}/tts`, {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify({ text: data.response }),
-        });
-        
-        if (!audioResponse.ok) {
-          const errorText = await audioResponse.text();
-          console.error(`TTS API error response: ${errorText}`);
-          throw new Error('Failed to get TTS audio');
+        let audioUrl: string;
+        if (streamedAudioUrl) {
+          audioUrl = streamedAudioUrl;
+        } else {
+          console.log(`Requesting TTS from ${endpoint}`);
+          // GET so the browser's HTTP cache can reuse audio for repeated text
+          const audioResponse = data.audio_url
+            ? await fetch(`http://localhost:8080${data.audio_url}`)
+            : await fetch(
+                `http://localhost:8080/api/${endpoint}/tts?text=${encodeURIComponent(data.response)}`
+              );
+          
+          if (!audioResponse.ok) {
+            const errorText = await audioResponse.text();
+            console.error(`TTS API error response: ${errorText}`);
+            throw new Error('Failed to get TTS audio');
+          }
+          
+          const audioBlob = await audioResponse.blob();
+          audioUrl = URL.createObjectURL(audioBlob);
         }
         
-        const audioBlob = await audioResponse.blob();
-        const audioUrl = URL.createObjectURL(audioBlob);
-        
         // Notify parent component about audio URL
         window.postMessage({
           type: 'participant_speaking',
@@ -14,7 +14,7 @@ export const fetchUserScreenshots = async (
 ): Promise<Screenshot[]> => {
   try {
     const response = await fetch(
-      `http://localhost:8080/api/user/${userId}/screenshots`,
+      `http://localhost:8080/api/user/${userId}/screenshots?include_data=true`,
       {
         method: "GET",
         headers: {